@@ -3,6 +3,16 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with uvicorn workers under gunicorn:
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Views that wait on the network (Google sign-in in auth_receiver, the
+analytics SSE stream) are async and hold no worker while they wait; the
+rest are sync views Django runs on a thread per request. `manage.py
+loadtest` compares this with the WSGI mode (config.wsgi) at the same worker
+count.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -39,7 +39,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -90,7 +93,10 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+}
 
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
@@ -103,11 +109,22 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# FileBasedCache lists its whole directory on every set and, past
+# MAX_ENTRIES, deletes a random third of the entries. Rendered item cards
+# (one per listing per card template) get their own directory so culling
+# them never evicts pages or the version counters kept in 'default'.
+CARD_CACHE_LISTINGS = int(os.getenv('CARD_CACHE_LISTINGS', '10000'))
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
         'LOCATION': str(BASE_DIR / '.cache'),
-    }
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'cards': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(BASE_DIR / '.cache' / 'cards'),
+        'OPTIONS': {'MAX_ENTRIES': CARD_CACHE_LISTINGS * 3},  # three card templates
+    },
 }
 
 SILENCED_SYSTEM_CHECKS = ['django_ratelimit.E003', 'django_ratelimit.W001']
@@ -124,6 +141,28 @@ GOOGLE_OAUTH_CLIENT_SECRET = os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
 
 SECURE_REFERRER_POLICY = 'no-referrer-when-downgrade'
 
+# Response compression (core.middleware.CompressionMiddleware). Static files
+# are pre-compressed by `manage.py build_assets` and served by nginx instead.
+COMPRESSION_MIN_SIZE = 512
+BROTLI_RESPONSES = os.getenv('BROTLI_RESPONSES', 'True') == 'True'
+
+# Share of requests profiled into the staff-only /admin/profiling/ panel.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.05'))
+
+# /metrics (core.metrics): each worker's snapshot lives in METRICS_DIR; a
+# scraper authenticates with `Authorization: Bearer <METRICS_TOKEN>`.
+METRICS_DIR = BASE_DIR / '.cache' / 'metrics'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# PageView retention (core.analytics.retention): rows older than this many
+# days are rolled up per day, archived as gzip JSONL and deleted.
+PAGEVIEW_RETENTION_DAYS = int(os.getenv('PAGEVIEW_RETENTION_DAYS', '90'))
+PAGEVIEW_ARCHIVE_DIR = BASE_DIR / 'archive' / 'pageviews'
+
+# Send the home feed as a streaming response so the header, tabs and
+# category pills reach the browser before the cards are rendered.
+STREAM_FEED = os.getenv('STREAM_FEED') == 'True'
+
 # Access logging
 _LOGS_DIR = BASE_DIR / 'logs'
 os.makedirs(_LOGS_DIR, exist_ok=True)
@@ -2,12 +2,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from core.admin import swd_admin_site
+from core.metrics import metrics_view
 from core.views import manifest_json, service_worker, favicon_redirect
 
 urlpatterns = [
     path('manifest.json', manifest_json),
     path('sw.js', service_worker),
     path('favicon.ico', favicon_redirect),
+    path('metrics', metrics_view),
     path('admin/', swd_admin_site.urls),
     path('', include('core.urls')),
 ]
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
 from django.contrib.auth.models import User, Group
 from django.urls import path, reverse
@@ -8,8 +9,23 @@ from django.utils.html import format_html
 from .models import (
     Person, Hostel, Category, Item, Image,
     Feedback, FeedbackImage, Reaction,
-    PageView, LogIngestState,
+    PageView, PageViewRollup, LogIngestState,
 )
+from . import caching, search
+
+
+class CachedAutocompleteJsonView(AutocompleteJsonView):
+    """Autocomplete that answers hostel lookups from the hostel choice cache."""
+
+    def get_queryset(self):
+        if self.model_admin.model is Hostel:
+            term = self.term.lower()
+            return [
+                Hostel(name=name)
+                for name, _ in caching.hostel_choices()
+                if term in name.lower()
+            ]
+        return super().get_queryset()
 
 
 class SWDAdminSite(admin.AdminSite):
@@ -18,18 +34,27 @@ class SWDAdminSite(admin.AdminSite):
     index_title = "Control Panel"
 
     def get_urls(self):
-        from core.analytics.views import analytics_view, analytics_recent_json
+        from core.analytics.views import analytics_view, analytics_recent_json, analytics_stream
+        from core.profiling import profiling_view
         custom = [
             path('analytics/', self.admin_view(analytics_view), name='analytics'),
-            path('analytics/recent.json', self.admin_view(analytics_recent_json), name='analytics_recent'),
+            # admin_view() only wraps sync views; these async ones check
+            # staff access themselves.
+            path('analytics/recent.json', analytics_recent_json, name='analytics_recent'),
+            path('analytics/stream', analytics_stream, name='analytics_stream'),
+            path('profiling/', self.admin_view(profiling_view), name='profiling'),
         ]
         return custom + super().get_urls()
 
+    def autocomplete_view(self, request):
+        return CachedAutocompleteJsonView.as_view(admin_site=self)(request)
+
     def get_app_list(self, request, app_label=None):
         app_list = super().get_app_list(request, app_label)
         if app_label is None:
             try:
                 url = reverse(f'{self.name}:analytics')
+                profiling_url = reverse(f'{self.name}:profiling')
             except Exception:
                 return app_list
             app_list.insert(0, {
@@ -43,6 +68,12 @@ class SWDAdminSite(admin.AdminSite):
                     'admin_url': url,
                     'view_only': True,
                     'perms': {'view': True, 'add': False, 'change': False, 'delete': False},
+                }, {
+                    'name': 'Request profile',
+                    'object_name': 'Profiling',
+                    'admin_url': profiling_url,
+                    'view_only': True,
+                    'perms': {'view': True, 'add': False, 'change': False, 'delete': False},
                 }],
             })
         return app_list
@@ -177,21 +208,29 @@ class ItemAdmin(admin.ModelAdmin):
     @admin.action(description='Mark selected as sold')
     def mark_sold(self, request, queryset):
         updated = queryset.update(is_sold=True)
+        caching.bump_listings_version()
         self.message_user(request, f"{updated} item(s) marked sold.")
 
     @admin.action(description='Mark selected as unsold')
     def mark_unsold(self, request, queryset):
         updated = queryset.update(is_sold=False)
+        caching.bump_listings_version()
         self.message_user(request, f"{updated} item(s) marked unsold.")
 
     @admin.action(description='Soft delete (hide from marketplace)')
     def soft_delete(self, request, queryset):
+        item_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_deleted=True)
+        search.reindex_items(item_ids)
+        caching.bump_listings_version()
         self.message_user(request, f"{updated} item(s) hidden.")
 
     @admin.action(description='Restore (unhide)')
     def restore(self, request, queryset):
+        item_ids = list(queryset.values_list('id', flat=True))
         updated = queryset.update(is_deleted=False)
+        search.reindex_items(item_ids)
+        caching.bump_listings_version()
         self.message_user(request, f"{updated} item(s) restored.")
 
     @admin.action(description='Repost (bump updated_at to now, mark unsold)')
@@ -202,6 +241,7 @@ class ItemAdmin(admin.ModelAdmin):
             is_sold=False,
             repost_count=F('repost_count') + 1,
         )
+        caching.bump_listings_version()
         self.message_user(request, f"{updated} item(s) reposted.")
 
 
@@ -263,6 +303,18 @@ class PageViewAdmin(admin.ModelAdmin):
         return False
 
 
+class PageViewRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'dimension', 'value', 'views', 'authed', 'uniques')
+    list_filter = ('dimension',)
+    search_fields = ('value',)
+    readonly_fields = tuple(f.name for f in PageViewRollup._meta.fields)
+    date_hierarchy = 'day'
+    ordering = ('-day', 'dimension', '-views')
+
+    def has_add_permission(self, request):
+        return False
+
+
 class LogIngestStateAdmin(admin.ModelAdmin):
     list_display = ('filename', 'signature', 'byte_offset', 'last_ingested')
     readonly_fields = ('signature', 'filename', 'byte_offset', 'last_ingested')
@@ -280,6 +332,7 @@ swd_admin_site.register(Image, ImageAdmin)
 swd_admin_site.register(Feedback, FeedbackAdmin)
 swd_admin_site.register(Reaction, ReactionAdmin)
 swd_admin_site.register(PageView, PageViewAdmin)
+swd_admin_site.register(PageViewRollup, PageViewRollupAdmin)
 swd_admin_site.register(LogIngestState, LogIngestStateAdmin)
 swd_admin_site.register(User, UserAdmin)
 swd_admin_site.register(Group, GroupAdmin)
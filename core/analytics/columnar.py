@@ -0,0 +1,292 @@
+"""In-memory columnar engine for ad-hoc page view questions.
+
+load() reads PageView rows (and, for days already archived, the gzip JSONL
+archives) into typed column arrays: numbers in `array('q')`, strings
+dictionary-encoded as `array('I')` codes plus a list of distinct values.
+Queries then run over whole columns: filters are resolved against the small
+dictionaries and turned into byte masks that are AND-ed as big integers,
+and group-bys count key tuples with collections.Counter, which does the
+counting in C. Loading costs about one ORM pass over the rows; after that
+each question ("views per hostel per hour last semester") takes a fraction
+of a second per million rows, with no new ORM code.
+
+    table = columnar.load(since=date(2025, 1, 1), until=date(2025, 5, 1))
+    table.query().where(status__lt=400).group_by('hostel', 'hour').count(distinct='email')
+
+`manage.py analytics_query` exposes the same thing on the command line.
+"""
+import datetime
+import gzip
+import json
+from array import array
+from collections import Counter
+from itertools import compress, repeat
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import PageView, Person
+
+from . import retention
+
+# Columns read from each row, and columns derived from them at load time.
+STRING_COLUMNS = ('method', 'path', 'email', 'campus', 'browser', 'os', 'device', 'ip', 'source_file')
+NUMBER_COLUMNS = ('status', 'person_id_ref', 'item_id_ref')
+DERIVED_STRING_COLUMNS = ('date', 'month', 'weekday', 'hostel')
+DERIVED_NUMBER_COLUMNS = ('timestamp', 'hour')
+LOAD_FIELDS = ('timestamp',) + STRING_COLUMNS + NUMBER_COLUMNS
+LOAD_CHUNK = 5000
+MISSING = -1  # stands in for NULL in number columns
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+OPERATORS = ('in', 'gte', 'gt', 'lte', 'lt', 'startswith', 'contains')
+
+
+class QueryError(ValueError):
+    pass
+
+
+class _Encoded:
+    """A dictionary-encoded string column."""
+    __slots__ = ('codes', 'values', 'index')
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values = []
+        self.index = {}
+
+    def extend(self, values):
+        index = self.index
+        before = len(index)
+        self.codes.extend(array('I', [index.setdefault(v, len(index)) for v in values]))
+        if len(index) > before:
+            self.values.extend(list(index)[before:])
+
+
+class Table:
+    def __init__(self):
+        self.strings = {name: _Encoded() for name in STRING_COLUMNS + DERIVED_STRING_COLUMNS}
+        self.numbers = {name: array('q') for name in NUMBER_COLUMNS + DERIVED_NUMBER_COLUMNS}
+        self.rows = 0
+        self._local_cache = {}
+
+    @property
+    def columns(self):
+        return sorted(self.strings) + sorted(self.numbers)
+
+    def extend(self, rows, hostel_by_person):
+        """Append a chunk of tuples in LOAD_FIELDS order, a column at a time."""
+        if not rows:
+            return
+        columns = dict(zip(LOAD_FIELDS, zip(*rows)))
+        epochs = [int(ts.timestamp()) for ts in columns['timestamp']]
+        local = [self._local(epoch, ts) for epoch, ts in zip(epochs, columns['timestamp'])]
+        for name in STRING_COLUMNS:
+            self.strings[name].extend([v or '' for v in columns[name]])
+        for name in NUMBER_COLUMNS:
+            self.numbers[name].extend([MISSING if v is None else v for v in columns[name]])
+        for i, name in enumerate(('date', 'month', 'weekday')):
+            self.strings[name].extend([fields[i] for fields in local])
+        self.strings['hostel'].extend([hostel_by_person.get(p) or '' for p in columns['person_id_ref']])
+        self.numbers['timestamp'].extend(epochs)
+        self.numbers['hour'].extend([fields[3] for fields in local])
+        self.rows += len(rows)
+
+    def _local(self, epoch, ts):
+        bucket = epoch // 900
+        local = self._local_cache.get(bucket)
+        if local is None:
+            # Every time zone offset (and DST change) is a whole number of
+            # quarter hours, so the local date fields only need working out
+            # once per 15 minutes of data.
+            ts = timezone.localtime(ts)
+            local = self._local_cache[bucket] = (
+                ts.date().isoformat(), ts.strftime('%Y-%m'), WEEKDAYS[ts.weekday()], ts.hour,
+            )
+        return local
+
+    def query(self):
+        return Query(self)
+
+
+class Query:
+    def __init__(self, table):
+        self.table = table
+        self.mask = None  # None means every row
+        self.keys = ()
+
+    def where(self, **conditions):
+        """Keep rows matching every condition: `field=value`, or
+        `field__<op>=value` with op one of in, gte, gt, lte, lt, startswith,
+        contains."""
+        for lookup, value in conditions.items():
+            field, _, op = lookup.partition('__')
+            self._and(self._mask(field, op or 'exact', value))
+        return self
+
+    def group_by(self, *fields):
+        for field in fields:
+            self._column(field)
+        self.keys = fields
+        return self
+
+    def count(self, distinct=None, limit=None):
+        """[{**group_keys, 'views': n, 'distinct_<field>': m}], largest first."""
+        key_columns = [self._column(f) for f in self.keys]
+        keys = zip(*key_columns) if key_columns else repeat((), self.table.rows)
+        counts = Counter(self._selected(keys))
+        uniques = None
+        if distinct:
+            empty = self._empty_code(distinct)
+            seen = set(self._selected(zip(*key_columns, self._column(distinct))))
+            # A blank email or missing id isn't a distinct visitor.
+            uniques = Counter(pair[:-1] for pair in seen if pair[-1] != empty)
+
+        rows = []
+        for key, views in counts.most_common(limit):
+            row = {field: self._decode(field, code) for field, code in zip(self.keys, key)}
+            row['views'] = views
+            if uniques is not None:
+                row[f'distinct_{distinct}'] = uniques.get(key, 0)
+            rows.append(row)
+        return rows
+
+    # ── Internals ───────────────────────────────────────────
+
+    def _selected(self, rows):
+        return rows if self.mask is None else compress(rows, self.mask)
+
+    def _column(self, field):
+        if field in self.table.strings:
+            return self.table.strings[field].codes
+        if field in self.table.numbers:
+            return self.table.numbers[field]
+        raise QueryError(f"Unknown column {field!r}; columns are {', '.join(self.table.columns)}")
+
+    def _decode(self, field, code):
+        encoded = self.table.strings.get(field)
+        return encoded.values[code] if encoded is not None else code
+
+    def _empty_code(self, field):
+        encoded = self.table.strings.get(field)
+        if encoded is None:
+            return MISSING
+        return encoded.index.get('', -1)
+
+    def _and(self, mask):
+        if self.mask is None:
+            self.mask = mask
+            return
+        n = len(mask)
+        # Bytes are 0 or 1, so one big-integer AND combines the masks at C speed.
+        combined = int.from_bytes(self.mask, 'little') & int.from_bytes(mask, 'little')
+        self.mask = combined.to_bytes(n, 'little')
+
+    def _mask(self, field, op, value):
+        if op not in OPERATORS and op != 'exact':
+            raise QueryError(f"Unknown operator {op!r} in {field}__{op}")
+        column = self._column(field)
+        encoded = self.table.strings.get(field)
+        if encoded is not None:
+            # Decide per distinct value, then look codes up per row.
+            match = _string_test(op, value)
+            wanted = {code for code, v in enumerate(encoded.values) if match(v)}
+            return bytes(map(wanted.__contains__, column))
+        return bytes(map(_number_test(field, op, value), column))
+
+
+def _string_test(op, value):
+    if op == 'exact':
+        return lambda v: v == value
+    if op == 'in':
+        values = set(value)
+        return values.__contains__
+    if op == 'startswith':
+        return lambda v: v.startswith(value)
+    if op == 'contains':
+        return lambda v: value in v
+    if op == 'gte':
+        return lambda v: v >= value
+    if op == 'gt':
+        return lambda v: v > value
+    if op == 'lte':
+        return lambda v: v <= value
+    return lambda v: v < value
+
+
+def _number_test(field, op, value):
+    if op not in ('exact', 'in', 'gte', 'gt', 'lte', 'lt'):
+        raise QueryError(f"{op} only applies to text columns")
+    try:
+        value = [int(v) for v in value] if op == 'in' else int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"{field} expects an integer") from None
+    if op == 'exact':
+        return value.__eq__
+    if op == 'in':
+        return set(value).__contains__
+    if op == 'gte':
+        return value.__le__
+    if op == 'gt':
+        return value.__lt__
+    if op == 'lte':
+        return value.__ge__
+    return value.__gt__
+
+
+def _bounds(since, until):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(since, datetime.time.min), tz) if since else None
+    end = timezone.make_aware(datetime.datetime.combine(until, datetime.time.min), tz) if until else None
+    return start, end
+
+
+def _archived_rows(start, end):
+    directory = retention.archive_dir()
+    if not directory.is_dir():
+        return
+    for path in sorted(directory.glob('*/*.jsonl.gz')):
+        day = datetime.date.fromisoformat(path.name.split('.')[0])
+        if (start and day < timezone.localdate(start)) or (end and day >= timezone.localdate(end)):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                row['timestamp'] = parse_datetime(row['timestamp'])
+                yield tuple(row[f] for f in LOAD_FIELDS)
+
+
+def load(since=None, until=None, include_archive=True):
+    """Load page views with since <= local date < until into a Table.
+
+    Days already archived are read from their archive files and the rest
+    from PageView, so restored rows aren't counted twice.
+    """
+    start, end = _bounds(since, until)
+    hostel_by_person = dict(Person.objects.exclude(hostel=None).values_list('id', 'hostel_id'))
+    table = Table()
+
+    live = PageView.objects.all()
+    raw_since = retention.raw_since()
+    if include_archive and raw_since is not None:
+        chunk = []
+        for row in _archived_rows(start, end):
+            if row[0] < raw_since:
+                chunk.append(row)
+            if len(chunk) >= LOAD_CHUNK:
+                table.extend(chunk, hostel_by_person)
+                chunk = []
+        table.extend(chunk, hostel_by_person)
+        live = live.filter(timestamp__gte=raw_since)
+    if start:
+        live = live.filter(timestamp__gte=start)
+    if end:
+        live = live.filter(timestamp__lt=end)
+    chunk = []
+    for row in live.values_list(*LOAD_FIELDS).iterator(chunk_size=LOAD_CHUNK):
+        chunk.append(row)
+        if len(chunk) >= LOAD_CHUNK:
+            table.extend(chunk, hostel_by_person)
+            chunk = []
+    table.extend(chunk, hostel_by_person)
+    return table
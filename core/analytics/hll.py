@@ -0,0 +1,72 @@
+"""HyperLogLog distinct-value sketches.
+
+A sketch is 2**p one-byte registers; adding a value sets the register its
+hash picks to the longest run of leading zeros seen there. Two sketches
+merge by taking the larger register each, so per-day sketches add up to any
+range, and the estimate's standard error is about 1.04 / sqrt(2**p) (1.6%
+at the default p=12) no matter how many values went in.
+"""
+import hashlib
+import math
+import re
+import zlib
+
+PRECISION = 12
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+_NONZERO = re.compile(b'[^\x00]')
+
+
+def hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    __slots__ = ('p', 'registers')
+
+    def __init__(self, p=PRECISION, registers=None):
+        self.p = p
+        self.registers = registers if registers is not None else bytearray(1 << p)
+
+    def add(self, value):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, h):
+        bits = 64 - self.p
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Can't merge sketches of different precision")
+        theirs = other.registers
+        if len(theirs) - theirs.count(0) > len(theirs) // 8:
+            self.registers = bytearray(map(max, self.registers, theirs))
+            return self
+        # Sketches of a page or a quiet day are mostly empty registers: only
+        # visit the set ones (found by the regex engine, not a Python loop).
+        mine = self.registers
+        for match in _NONZERO.finditer(theirs):
+            i = match.start()
+            if theirs[i] > mine[i]:
+                mine[i] = theirs[i]
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting over the empty registers.
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self):
+        # Mostly-empty registers compress to a few dozen bytes.
+        return bytes([self.p]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(p=data[0], registers=bytearray(zlib.decompress(data[1:])))
@@ -1,124 +1,314 @@
+"""Access log → PageView ingestion.
+
+Runs outside the web workers: `manage.py ingest_access_logs` once from cron,
+or with --follow as a long-running process that tails the logs and writes
+new lines within a second or two. LOCK_FILE keeps two ingesters (on any number of hosts sharing the
+logs directory) from reading the same bytes at once.
+"""
 import hashlib
 import os
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core import caching
 
 from .parser import parse_line
 
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
 LOGS_DIR = Path(settings.BASE_DIR) / 'logs'
 LOCK_FILE = Path(settings.BASE_DIR) / '.cache' / 'ingest.lock'
-BATCH_SIZE = 1000
+BATCH_SIZE = getattr(settings, 'INGEST_BATCH_SIZE', 1000)
+FOLLOW_INTERVAL = getattr(settings, 'INGEST_FOLLOW_INTERVAL', 1.0)
+FLUSH_INTERVAL = getattr(settings, 'INGEST_FLUSH_INTERVAL', 1.0)
+READ_CHUNK = 1024 * 1024
+FIRST_LINE_MAX = 4096
+
+
+class IngestBusy(Exception):
+    """Another process holds the ingest lock."""
+
 
-_ingest_lock = threading.Lock()
-_ingest_running = False
+@contextmanager
+def ingest_lock(path=LOCK_FILE):
+    """Hold an exclusive, non-blocking flock on `path` for the block.
+
+    The lock is released by the kernel if the holder dies, so a crashed
+    ingester never leaves a stale lock behind.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise IngestBusy(str(path)) from None
+        f.seek(0)
+        f.truncate()
+        f.write(str(os.getpid()))
+        f.flush()
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
 
 
 def _file_signature(path):
+    """Identity of a log file that survives renames: inode plus a hash of its
+    first line, which never changes once written (and tells a recycled inode
+    apart). None while the first line is still incomplete."""
     st = os.stat(path)
+    with open(path, 'rb') as f:
+        first = f.readline(FIRST_LINE_MAX)
+    if not first.endswith(b'\n') and len(first) < FIRST_LINE_MAX:
+        return None
+    return f"{st.st_ino}:{hashlib.md5(first).hexdigest()}"[:64]
+
+
+def _legacy_signature(path):
+    """The signature LogIngestState rows were keyed by before the first-line
+    hash: inode plus a hash of the first 1 KB."""
     with open(path, 'rb') as f:
         head = f.read(1024)
-    head_hash = hashlib.md5(head).hexdigest() if head else 'empty'
-    try:
-        inode = st.st_ino
-    except AttributeError:
-        inode = 0
-    return f"{inode}:{head_hash}"[:64]
+    return f"{os.stat(path).st_ino}:{hashlib.md5(head).hexdigest() if head else 'empty'}"[:64]
 
 
-def _iter_log_files():
-    if not LOGS_DIR.exists():
+def _ingest_state(path, signature):
+    """The LogIngestState row for `path`, created at byte 0 if it is new.
+
+    A file last ingested under the legacy signature keeps its offset: the
+    row is re-keyed to the new signature the first time it is seen, rather
+    than re-reading the file (and re-inserting lines since archived).
+    """
+    from core.models import LogIngestState
+
+    with transaction.atomic():
+        if not LogIngestState.objects.filter(signature=signature).exists():
+            LogIngestState.objects.filter(signature=_legacy_signature(path)).update(signature=signature)
+        state, _ = LogIngestState.objects.get_or_create(
+            signature=signature,
+            defaults={'filename': path.name, 'byte_offset': 0},
+        )
+    return state
+
+
+def _iter_log_files(logs_dir=None):
+    logs_dir = Path(logs_dir) if logs_dir else LOGS_DIR
+    if not logs_dir.exists():
         return
-    for p in sorted(LOGS_DIR.glob('access.log*')):
+    for p in sorted(logs_dir.glob('access.log*')):
         if p.is_file():
             yield p
 
 
-def ingest_all():
-    from core.models import PageView, LogIngestState
+class _Tail:
+    """One open log file. `offset` is what the database has; `position` is
+    how far we have read (up to the end of the last complete line)."""
 
-    created_total = 0
-    for path in _iter_log_files():
-        try:
-            sig = _file_signature(path)
-        except OSError:
-            continue
+    def __init__(self, f, path, inode, signature, offset):
+        self.f = f
+        self.path = path
+        self.inode = inode
+        self.signature = signature
+        self.offset = offset
+        self.position = offset
+        self.partial = b''
+
+
+class LogTailer:
+    """Reads appended access log lines through file handles kept open
+    between polls.
+
+    Rotation (RotatingFileHandler renaming access.log to access.log.1) is
+    followed by inode: the renamed file's handle keeps reading until it is
+    drained, and the new access.log is picked up from byte 0. Rows are
+    written in batches, each in one transaction with the byte offsets they
+    cover, so a crash mid-batch neither loses nor re-reads lines.
+    """
+
+    def __init__(self, logs_dir=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.logs_dir = logs_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.tails = {}
+        self.rows = []
+        self.first_buffered = None
+
+    def poll(self):
+        """Read whatever was appended since the last poll; returns rows written."""
+        seen = self._discover()
+        written = 0
+        for inode, tail in list(self.tails.items()):
+            written += self._read(tail)
+            if inode not in seen:
+                # Rotated past backupCount (or deleted) and now fully read.
+                written += self._retire(tail)
+        if self.rows and time.monotonic() - self.first_buffered >= self.flush_interval:
+            written += self.flush()
+        return written
+
+    def _retire(self, tail):
+        written = self.flush()
+        tail.f.close()
+        del self.tails[tail.inode]
+        return written
+
+    def close(self):
+        written = self.flush()
+        for tail in self.tails.values():
+            tail.f.close()
+        self.tails = {}
+        return written
+
+    def _discover(self):
+        """Open files we aren't following yet; returns the inodes present now."""
+        seen = set()
+        for path in _iter_log_files(self.logs_dir):
+            try:
+                inode = path.stat().st_ino
+            except OSError:
+                continue
+            seen.add(inode)
+            tail = self.tails.get(inode)
+            if tail is not None and os.fstat(tail.f.fileno()).st_nlink == 0:
+                # Our file was deleted and its inode number handed to a new one.
+                self._read(tail)
+                self._retire(tail)
+                tail = None
+            if tail is not None:
+                tail.path = path
+                continue
+            try:
+                signature = _file_signature(path)
+                if signature is None:
+                    continue
+                state = _ingest_state(path, signature)
+                f = open(path, 'rb')
+            except OSError:
+                continue
+            f.seek(state.byte_offset)
+            self.tails[inode] = _Tail(f, path, inode, signature, state.byte_offset)
+        return seen
+
+    def _read(self, tail):
+        from core.models import PageView
 
-        state, _ = LogIngestState.objects.get_or_create(
-            signature=sig,
-            defaults={'filename': path.name, 'byte_offset': 0},
-        )
         try:
-            size = path.stat().st_size
+            size = os.fstat(tail.f.fileno()).st_size
         except OSError:
-            continue
+            return 0
+        if size < tail.position:
+            # Truncated in place (copytruncate): start over.
+            tail.f.seek(0)
+            tail.position = tail.offset = 0
+            tail.partial = b''
+        written = 0
+        while True:
+            chunk = tail.f.read(READ_CHUNK)
+            if not chunk:
+                return written
+            lines = (tail.partial + chunk).split(b'\n')
+            tail.partial = lines.pop()
+            for raw in lines:
+                tail.position += len(raw) + 1
+                line = raw.decode('utf-8', errors='replace')
+                parsed = parse_line(line)
+                if not parsed:
+                    continue
+                line_hash = hashlib.md5(line.strip().encode('utf-8')).hexdigest()
+                if not self.rows:
+                    self.first_buffered = time.monotonic()
+                self.rows.append(PageView(source_file=tail.path.name[:64], line_hash=line_hash, **parsed))
+                if len(self.rows) >= self.batch_size:
+                    written += self.flush()
+            if tail.position != tail.offset and not self.rows:
+                # Only unparseable lines since the last flush; still move on.
+                written += self.flush()
 
-        if state.byte_offset > size:
-            state.byte_offset = 0
+    def flush(self):
+        """Write buffered rows and advance offsets, atomically."""
+        from core.models import PageView, LogIngestState
+        from . import sketches
 
-        if state.byte_offset >= size:
-            if state.filename != path.name:
-                state.filename = path.name
-                state.save(update_fields=['filename'])
-            continue
+        moved = [t for t in self.tails.values() if t.position != t.offset]
+        if not self.rows and not moved:
+            return 0
+        rows, self.rows = self.rows, []
+        now = timezone.now()
+        with transaction.atomic():
+            PageView.objects.bulk_create(rows, ignore_conflicts=True, batch_size=self.batch_size)
+            sketches.record(rows)
+            for tail in moved:
+                LogIngestState.objects.filter(signature=tail.signature).update(
+                    byte_offset=tail.position, filename=tail.path.name, last_ingested=now,
+                )
+        for tail in moved:
+            tail.offset = tail.position
+        if rows:
+            caching.bump_analytics_version()
+        return len(rows)
+
+
+def ingest_all(logs_dir=None, batch_size=BATCH_SIZE):
+    """Ingest every complete line appended to the access logs since the last run.
+
+    Returns the number of rows offered to the database (duplicates of
+    already-ingested lines are ignored by the line_hash unique key).
+    """
+    tailer = LogTailer(logs_dir, batch_size=batch_size)
+    try:
+        written = tailer.poll()
+    finally:
+        written += tailer.close()
+    return written
 
-        buffer = []
-        new_offset = state.byte_offset
+
+def pending_bytes():
+    """Bytes of each access log not yet ingested, keyed by file name."""
+    from core.models import LogIngestState
+
+    files = {}
+    for path in _iter_log_files():
         try:
-            with open(path, 'rb') as f:
-                f.seek(state.byte_offset)
-                for raw in f:
-                    new_offset += len(raw)
-                    try:
-                        line = raw.decode('utf-8', errors='replace')
-                    except Exception:
-                        continue
-                    parsed = parse_line(line)
-                    if not parsed:
-                        continue
-                    line_hash = hashlib.md5(line.strip().encode('utf-8')).hexdigest()
-                    buffer.append(PageView(
-                        source_file=path.name[:64],
-                        line_hash=line_hash,
-                        **parsed,
-                    ))
-                    if len(buffer) >= BATCH_SIZE:
-                        PageView.objects.bulk_create(buffer, ignore_conflicts=True, batch_size=BATCH_SIZE)
-                        created_total += len(buffer)
-                        buffer = []
+            # A file without a complete first line has nothing ingested yet.
+            files[_file_signature(path) or path.name] = (path.name, path.stat().st_size)
         except OSError:
             continue
+    offsets = dict(
+        LogIngestState.objects.filter(signature__in=files).values_list('signature', 'byte_offset')
+    )
+    return {name: max(size - offsets.get(sig, 0), 0) for sig, (name, size) in files.items()}
 
-        if buffer:
-            PageView.objects.bulk_create(buffer, ignore_conflicts=True, batch_size=BATCH_SIZE)
-            created_total += len(buffer)
-
-        state.filename = path.name
-        state.byte_offset = new_offset
-        state.save(update_fields=['filename', 'byte_offset', 'last_ingested'])
-
-    return created_total
 
+def follow(interval=FOLLOW_INTERVAL, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+           logs_dir=None, stop=None, on_poll=None):
+    """Tail the access logs until `stop` (a threading.Event) is set.
 
-def _background_runner():
-    global _ingest_running
-    import django.db
+    Each tick costs a directory listing, a stat() per file and a read() on
+    each open handle, so an idle site is nearly free. Rows reach the
+    database within about `interval` + `flush_interval` seconds of being
+    logged, or as soon as `batch_size` of them are waiting.
+    `on_poll(written)` is called after every poll, with the rows it wrote.
+    """
+    stop = stop or threading.Event()
+    tailer = LogTailer(logs_dir, batch_size=batch_size, flush_interval=flush_interval)
     try:
-        ingest_all()
-    except Exception:
-        pass
+        while not stop.is_set():
+            # Long-lived process: drop connections the database has timed out.
+            close_old_connections()
+            written = tailer.poll()
+            if on_poll:
+                on_poll(written)
+            stop.wait(interval)
     finally:
-        django.db.connection.close()
-        with _ingest_lock:
-            _ingest_running = False
-
-
-def run_ingest_in_background():
-    global _ingest_running
-    with _ingest_lock:
-        if _ingest_running:
-            return False
-        _ingest_running = True
-    threading.Thread(target=_background_runner, daemon=True).start()
-    return True
+        tailer.close()
@@ -0,0 +1,188 @@
+"""The latest page views, straight from the access log.
+
+RecentPageViews keeps the newest RING_SIZE parsed log lines in memory. It
+holds access.log open and, when asked, reads only what was appended since
+the last read, so every web worker sees every worker's traffic without
+touching the database. Rotation is detected by inode.
+
+LiveFeed pushes the same events to connected dashboards (the SSE stream in
+views.analytics_stream). One poller per worker reads the log for every
+connection, and only runs while somebody is connected.
+"""
+import asyncio
+import itertools
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from .ingest import LOGS_DIR
+from .parser import parse_line
+
+RING_SIZE = 500
+# On first open, or after falling this far behind, start near the end of
+# the file instead of parsing everything before it.
+TAIL_BYTES = 256 * 1024
+LIVE_POLL_INTERVAL = getattr(settings, 'ANALYTICS_LIVE_POLL_INTERVAL', 1.0)
+# Events held for a connection that isn't reading fast enough; past this it
+# gets a fresh snapshot instead of the backlog.
+SUBSCRIBER_BUFFER = 200
+
+
+def _event(parsed, seq):
+    return {
+        'seq': seq,
+        'timestamp': parsed['timestamp'].isoformat(),
+        'method': parsed['method'],
+        'path': parsed['path'],
+        'status': parsed['status'],
+        'name': parsed['name'],
+        'email': parsed['email'],
+        'campus': parsed['campus'],
+        'ip': parsed['ip'],
+    }
+
+
+class RecentPageViews:
+    def __init__(self, path=None, size=RING_SIZE):
+        self.path = path or LOGS_DIR / 'access.log'
+        self.rows = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+        self.f = None
+        self.inode = None
+        self.partial = b''
+
+    def poll(self):
+        """Read newly logged lines into the ring; returns the new events."""
+        with self.lock:
+            events = []
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                return events
+            if self.f is not None and inode != self.inode:
+                # Rotated: finish the old file, then start the new one from 0.
+                events += self._read()
+                self.f.close()
+                self.f = None
+                self._open(inode, start=0)
+            elif self.f is None:
+                self._open(inode, start=None)
+            events += self._read()
+            return events
+
+    def latest(self, n=50):
+        self.poll()
+        with self.lock:
+            return list(itertools.islice(reversed(self.rows), n))
+
+    def since(self, seq):
+        """Events after `seq`, oldest first; at most the whole ring."""
+        self.poll()
+        with self.lock:
+            newer = itertools.takewhile(lambda event: event['seq'] > seq, reversed(self.rows))
+            return list(newer)[::-1]
+
+    def last_seq(self):
+        with self.lock:
+            return self.rows[-1]['seq'] if self.rows else 0
+
+    def _open(self, inode, start):
+        try:
+            self.f = open(self.path, 'rb')
+        except OSError:
+            return
+        self.inode = inode
+        self.partial = b''
+        size = os.fstat(self.f.fileno()).st_size
+        if start is None and size > TAIL_BYTES:
+            self.f.seek(size - TAIL_BYTES)
+            self.f.readline()  # skip the line we landed in the middle of
+
+    def _read(self):
+        if self.f is None:
+            return []
+        position = self.f.tell()
+        size = os.fstat(self.f.fileno()).st_size
+        if size < position:
+            self.f.seek(0)  # truncated
+        elif size - position > TAIL_BYTES:
+            self.f.seek(size - TAIL_BYTES)
+            self.f.readline()
+            self.partial = b''
+        data = self.f.read()
+        if not data:
+            return []
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        events = []
+        for raw in lines:
+            parsed = parse_line(raw.decode('utf-8', errors='replace'))
+            if parsed:
+                event = _event(parsed, next(self.seq))
+                self.rows.append(event)
+                events.append(event)
+        return events
+
+
+class Subscription:
+    """One connection's bounded queue of events."""
+
+    def __init__(self, size=SUBSCRIBER_BUFFER):
+        self.events = deque(maxlen=size)
+        self.overflowed = False
+        self.ready = asyncio.Event()
+
+    def put(self, events, gap=False):
+        if gap or len(self.events) + len(events) > self.events.maxlen:
+            self.overflowed = True
+        self.events.extend(events)
+        self.ready.set()
+
+    def take(self):
+        """(overflowed, events) queued since the last take."""
+        self.ready.clear()
+        overflowed, self.overflowed = self.overflowed, False
+        events = list(self.events)
+        self.events.clear()
+        return overflowed, events
+
+
+class LiveFeed:
+    def __init__(self, source, interval=LIVE_POLL_INTERVAL):
+        self.source = source
+        self.interval = interval
+        self.subscriptions = set()
+        self.task = None
+        self.last_seq = 0
+
+    def subscribe(self, size=SUBSCRIBER_BUFFER):
+        subscription = Subscription(size)
+        self.subscriptions.add(subscription)
+        if self.task is None or self.task.done():
+            self.last_seq = self.source.last_seq()
+            self.task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    async def _run(self):
+        while self.subscriptions:
+            # File reads stay off the event loop. Reading by sequence number
+            # rather than taking poll()'s return value means lines another
+            # caller (the recent.json view) polled first aren't lost.
+            events = await asyncio.to_thread(self.source.since, self.last_seq)
+            if events:
+                # More lines than the ring holds arrived since the last poll.
+                gap = events[0]['seq'] > self.last_seq + 1
+                self.last_seq = events[-1]['seq']
+                for subscription in self.subscriptions:
+                    subscription.put(events, gap)
+            await asyncio.sleep(self.interval)
+
+
+recent = RecentPageViews()
+feed = LiveFeed(recent)
@@ -0,0 +1,230 @@
+"""PageView retention: roll up, archive, delete, and reload on demand.
+
+`manage.py archive_pageviews` works through every whole day older than
+PAGEVIEW_RETENTION_DAYS, oldest first. For each day it
+
+1. writes the raw rows to PAGEVIEW_ARCHIVE_DIR/YYYY-MM/YYYY-MM-DD.jsonl.gz,
+2. replaces that day's PageViewRollup rows with fresh per-dimension counts,
+3. deletes the rows from PageView in small batches.
+
+Every step is idempotent, so an interrupted run is finished by the next one.
+The dashboard reads rollups for days up to `rolled_through()` and raw rows
+after it. `manage.py restore_pageviews YYYY-MM` loads a month back into
+PageView for ad-hoc digging; the next archive run removes it again.
+"""
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import PageView, PageViewRollup
+
+DELETE_BATCH = 5000
+LOAD_BATCH = 2000
+
+# Dashboard dimensions kept per day: rollup dimension -> PageView field.
+DIMENSIONS = {
+    'campus': 'campus',
+    'browser': 'browser',
+    'os': 'os',
+    'device': 'device',
+    'path': 'path',
+    'item': 'item_id_ref',
+    'status': 'status',
+}
+ARCHIVE_FIELDS = [
+    'timestamp', 'status', 'method', 'path', 'email', 'name', 'person_id_ref', 'campus',
+    'browser', 'os', 'device', 'ip', 'item_id_ref', 'source_file', 'line_hash',
+]
+
+
+def archive_dir():
+    return Path(getattr(settings, 'PAGEVIEW_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'pageviews'))
+
+
+def archive_path(day):
+    return archive_dir() / day.strftime('%Y-%m') / f'{day.isoformat()}.jsonl.gz'
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min), tz)
+    end = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min), tz)
+    return start, end
+
+
+def _day_rows(day):
+    start, end = _day_bounds(day)
+    return PageView.objects.filter(timestamp__gte=start, timestamp__lt=end)
+
+
+def write_archive(day):
+    """Write `day`'s raw rows to its archive file; returns the row count.
+
+    Days without rows (expired_days includes every day up to the cutoff)
+    get no file, so the archive holds no empty ones.
+    """
+    rows = _day_rows(day)
+    if not rows.exists():
+        return 0
+    path = archive_path(day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    count = 0
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        for row in rows.order_by('timestamp', 'id').values(*ARCHIVE_FIELDS).iterator(chunk_size=LOAD_BATCH):
+            row['timestamp'] = row['timestamp'].isoformat()
+            f.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    os.replace(tmp, path)
+    return count
+
+
+def rollup_day(day):
+    """Recompute `day`'s PageViewRollup rows from its raw rows."""
+    qs = _day_rows(day)
+    authed = ~Q(email='')
+    counts = {
+        'views': Count('id'),
+        'authed': Count('id', filter=authed),
+        'uniques': Count('email', filter=authed, distinct=True),
+    }
+    rows = [PageViewRollup(day=day, dimension='total', value='', **qs.aggregate(**counts))]
+    for dimension, field in DIMENSIONS.items():
+        for r in qs.values(field).annotate(**counts):
+            value = '' if r[field] is None else str(r[field])[:500]
+            rows.append(PageViewRollup(
+                day=day, dimension=dimension, value=value,
+                views=r['views'], authed=r['authed'], uniques=r['uniques'],
+            ))
+    with transaction.atomic():
+        PageViewRollup.objects.filter(day=day).delete()
+        PageViewRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def delete_day(day):
+    """Delete `day`'s raw rows a batch at a time, so no transaction holds the
+    table for long. Returns the number deleted."""
+    qs = _day_rows(day)
+    deleted = 0
+    while True:
+        ids = list(qs.values_list('id', flat=True)[:DELETE_BATCH])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += PageView.objects.filter(id__in=ids).delete()[0]
+
+
+def expired_days(retention_days=None):
+    """Local dates of every whole day from the oldest raw row up to the
+    retention window, including days that have no rows."""
+    if retention_days is None:
+        retention_days = settings.PAGEVIEW_RETENTION_DAYS
+    cutoff_day = timezone.localdate() - datetime.timedelta(days=retention_days)
+    cutoff, _ = _day_bounds(cutoff_day)
+    oldest = PageView.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list('timestamp', flat=True).first()
+    if oldest is None:
+        return []
+    day = timezone.localdate(oldest)
+    days = []
+    while day < cutoff_day:
+        days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def archive_expired(retention_days=None, dry_run=False, on_day=None):
+    """Archive, roll up and delete every expired day. Returns rows removed."""
+    removed = 0
+    for day in expired_days(retention_days):
+        if dry_run:
+            count = _day_rows(day).count()
+        else:
+            if archive_path(day).exists():
+                # Late rows for a day archived before (a re-read log, a
+                # restore): merge with what was archived so nothing is lost.
+                load_archive(archive_path(day))
+            count = write_archive(day)
+            if count:
+                rollup_day(day)
+                delete_day(day)
+        removed += count
+        if on_day and count:
+            on_day(day, count)
+    return removed
+
+
+def restore_month(month):
+    """Load every archived day of `month` ('YYYY-MM') back into PageView.
+
+    Returns the rows offered; lines already present are skipped by line_hash.
+    """
+    directory = archive_dir() / month
+    if not directory.is_dir():
+        raise FileNotFoundError(f'No archive for {month} in {archive_dir()}')
+    return sum(load_archive(path) for path in sorted(directory.glob('*.jsonl.gz')))
+
+
+def load_archive(path):
+    loaded = 0
+    for batch in read_archive(path):
+        PageView.objects.bulk_create(batch, ignore_conflicts=True, batch_size=LOAD_BATCH)
+        loaded += len(batch)
+    return loaded
+
+
+def read_archive(path):
+    batch = []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            row = json.loads(line)
+            row['timestamp'] = parse_datetime(row['timestamp'])
+            batch.append(PageView(**row))
+            if len(batch) >= LOAD_BATCH:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def rolled_through():
+    """The last day whose counts live in PageViewRollup, or None."""
+    return PageViewRollup.objects.filter(dimension='total').order_by('-day').values_list('day', flat=True).first()
+
+
+def raw_since():
+    """Start of the first day the dashboard should count from raw rows."""
+    last = rolled_through()
+    if last is None:
+        return None
+    return _day_bounds(last + datetime.timedelta(days=1))[0]
+
+
+def rollup_counts(dimension, since, field='views'):
+    """{value: summed `field`} for rolled-up days from `since` (a datetime) on."""
+    rows = (
+        PageViewRollup.objects
+        .filter(dimension=dimension, day__gte=timezone.localdate(since))
+        .values('value')
+        .annotate(n=Sum(field))
+    )
+    return {r['value']: r['n'] for r in rows}
+
+
+def rollup_daily(since):
+    """[{'day', 'views', 'authed', 'uniques'}] for rolled-up days from `since` on."""
+    return list(
+        PageViewRollup.objects
+        .filter(dimension='total', day__gte=timezone.localdate(since))
+        .order_by('day')
+        .values('day', 'views', 'authed', 'uniques')
+    )
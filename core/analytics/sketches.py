@@ -0,0 +1,103 @@
+"""Per-day distinct-visitor sketches for the analytics dashboard.
+
+record(rows) folds each batch of new PageView rows into UniqueSketch rows:
+one HyperLogLog per local day × (total, campus, path) for emails, and per
+day × (total, campus) for IPs.
+unique_count() and daily_uniques() merge them over any date range, so the
+cost depends on the number of days, not page views. Ranges of up to
+EXACT_UNIQUES_DAYS days that are still in PageView are counted exactly by
+the dashboard instead.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import UniqueSketch
+
+from .hll import HyperLogLog, hash64
+
+EXACT_UNIQUES_DAYS = getattr(settings, 'ANALYTICS_EXACT_UNIQUES_DAYS', 7)
+# Which dimensions each kind is sketched by. Per-page unique IPs are never
+# shown, and would double the rows written per batch.
+DIMENSIONS = {
+    'email': ('total', 'campus', 'path'),
+    'ip': ('total', 'campus'),
+}
+
+
+def record(rows):
+    """Add PageView objects (saved or not) to their day's sketches."""
+    pending = defaultdict(HyperLogLog)
+    for row in rows:
+        day = timezone.localdate(row.timestamp)
+        keys = {'total': '', 'campus': row.campus, 'path': row.path}
+        for kind, dimensions in DIMENSIONS.items():
+            value = getattr(row, kind)
+            if not value:
+                continue
+            h = hash64(value)
+            for dimension in dimensions:
+                pending[(day, dimension, keys[dimension], kind)].add_hash(h)
+    if not pending:
+        return 0
+
+    existing = {
+        (s.day, s.dimension, s.value, s.kind): s
+        for s in UniqueSketch.objects.filter(
+            day__in={k[0] for k in pending},
+            value__in={k[2] for k in pending},
+        )
+    }
+    merged = []
+    for key, sketch in pending.items():
+        row = existing.get(key)
+        if row is not None:
+            sketch.merge(HyperLogLog.from_bytes(row.registers))
+        day, dimension, value, kind = key
+        merged.append(UniqueSketch(day=day, dimension=dimension, value=value, kind=kind, registers=sketch.to_bytes()))
+    # Replacing the touched rows is two statements; bulk_update's CASE
+    # expression over hundreds of rows costs more to build than to run.
+    stale = [row.pk for key, row in existing.items() if key in pending]
+    with transaction.atomic():
+        UniqueSketch.objects.filter(pk__in=stale).delete()
+        UniqueSketch.objects.bulk_create(merged, batch_size=500)
+    return len(pending)
+
+
+def _merged(queryset):
+    total = None
+    for data in queryset.values_list('registers', flat=True).iterator():
+        sketch = HyperLogLog.from_bytes(data)
+        total = sketch if total is None else total.merge(sketch)
+    return total
+
+
+def unique_count(kind, first_day, last_day=None, dimension='total', value=''):
+    """Estimated distinct `kind` values from `first_day` to `last_day` inclusive."""
+    qs = UniqueSketch.objects.filter(dimension=dimension, value=value, kind=kind, day__gte=first_day)
+    if last_day:
+        qs = qs.filter(day__lte=last_day)
+    merged = _merged(qs)
+    return merged.count() if merged else 0
+
+
+def daily_uniques(kind, first_day):
+    """{day: estimated distinct `kind` values} for each day from `first_day` on."""
+    rows = UniqueSketch.objects.filter(dimension='total', value='', kind=kind, day__gte=first_day)
+    return {day: HyperLogLog.from_bytes(data).count() for day, data in rows.values_list('day', 'registers')}
+
+
+def rebuild(rows_batches):
+    """Replace the sketches of every day in `rows_batches` (iterables of
+    PageView) with ones built from those rows. Returns days rebuilt."""
+    days = set()
+    for rows in rows_batches:
+        rows = list(rows)
+        new_days = {timezone.localdate(r.timestamp) for r in rows} - days
+        if new_days:
+            UniqueSketch.objects.filter(day__in=new_days).delete()
+            days |= new_days
+        record(rows)
+    return len(days)
@@ -1,19 +1,42 @@
+import asyncio
 import json
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
 
+from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
 from django.db.models import Count, Q
 from django.db.models.functions import TruncDate
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils import timezone
+from django.views.decorators.cache import never_cache
 
+from core import caching
 from core.models import PageView, Item, Person, Reaction, Feedback
 
-from .ingest import run_ingest_in_background
+from . import retention, sketches
+from .live import feed, recent
 
 RANGE_DAYS = {'7d': 7, '30d': 30, '90d': 90, 'all': 3650}
 
+# Dashboard contexts are cached per range. While new page views keep
+# arriving, the ingester rebuilds the cached ranges every
+# DASHBOARD_REFRESH_INTERVAL seconds; a page load only computes one itself if
+# there is none, or it is older than DASHBOARD_MAX_STALE (the ingester isn't
+# running). Ranges nobody opened for DASHBOARD_IDLE_TIMEOUT drop out of the
+# cache and stop being refreshed.
+DASHBOARD_KEY = 'analytics-dashboard:{range_key}'
+DASHBOARD_REFRESH_INTERVAL = getattr(settings, 'ANALYTICS_DASHBOARD_REFRESH_INTERVAL', 60)
+DASHBOARD_MAX_STALE = 15 * 60
+DASHBOARD_IDLE_TIMEOUT = 60 * 60
+
+RECENT_ROWS = 50
+# A comment line this often keeps proxies from closing an idle stream.
+STREAM_KEEPALIVE = 15
+
 CAMPUS_LABELS = {
     'GOA': 'Goa',
     'HYD': 'Hyderabad',
@@ -37,16 +60,23 @@ def _bucket_status(code):
     return 'other'
 
 
-def _top_dimension(qs, field, limit=8):
-    rows = (
-        qs.exclude(**{field: ''})
-        .values(field)
-        .annotate(c=Count('id'))
-        .order_by('-c')[:limit]
-    )
+def _merge_counts(rows, key, extra):
+    """{value: count} from grouped raw `rows` plus rolled-up `extra` counts."""
+    counts = dict(extra)
+    for r in rows:
+        value = r[key]
+        counts[value] = counts.get(value, 0) + r['c']
+    return counts
+
+
+def _top_dimension(qs, field, limit=8, since=None):
+    rows = qs.exclude(**{field: ''}).values(field).annotate(c=Count('id'))
+    extra = retention.rollup_counts(field, since) if since else {}
+    extra.pop('', None)
+    counts = sorted(_merge_counts(rows, field, extra).items(), key=lambda x: -x[1])[:limit]
     return {
-        'labels': [r[field] or '—' for r in rows],
-        'data': [r['c'] for r in rows],
+        'labels': [value or '—' for value, _ in counts],
+        'data': [c for _, c in counts],
     }
 
 
@@ -54,31 +84,41 @@ def _unique_users_by_day(qs):
     rows = (
         qs.exclude(email='')
         .annotate(day=TruncDate('timestamp'))
-        .values('day', 'email')
-        .distinct()
+        .values('day')
+        .annotate(c=Count('email', distinct=True))
     )
-    by_day = {}
-    for r in rows:
-        by_day[r['day']] = by_day.get(r['day'], 0) + 1
-    return by_day
+    return {r['day']: r['c'] for r in rows}
 
 
-@staff_member_required
-def analytics_view(request):
-    run_ingest_in_background()
-
-    range_key = request.GET.get('range', '30d')
-    if range_key not in RANGE_DAYS:
-        range_key = '30d'
+def build_context(range_key):
+    """Everything the dashboard shows for one range, as template context."""
     days = RANGE_DAYS[range_key]
     now = timezone.now()
     since = now - timedelta(days=days)
 
     base_qs = PageView.objects.filter(timestamp__gte=since)
+    # Days already archived are counted from their rollups, raw rows only
+    # from the day after; `rolled_since` is None when the range has none.
+    boundary = retention.raw_since()
+    rolled_since = since if boundary is not None and boundary > since else None
+    if rolled_since:
+        base_qs = base_qs.filter(timestamp__gte=boundary)
+    rolled_daily = retention.rollup_daily(rolled_since) if rolled_since else []
+
+    # Short ranges still in PageView are counted exactly; anything longer
+    # merges the per-day HyperLogLog sketches (about ±2%).
+    exact_uniques = rolled_since is None and days <= sketches.EXACT_UNIQUES_DAYS
+    first_day = timezone.localdate(since)
 
-    total_views = base_qs.count()
-    unique_emails = base_qs.exclude(email='').values('email').distinct().count()
-    unique_ips = base_qs.exclude(ip='').values('ip').distinct().count()
+    total_views = base_qs.count() + sum(r['views'] for r in rolled_daily)
+    if exact_uniques:
+        unique_emails = base_qs.exclude(email='').values('email').distinct().count()
+        unique_ips = base_qs.exclude(ip='').values('ip').distinct().count()
+        unique_by_day = _unique_users_by_day(base_qs)
+    else:
+        unique_emails = sketches.unique_count('email', first_day)
+        unique_ips = sketches.unique_count('ip', first_day)
+        unique_by_day = sketches.daily_uniques('email', first_day)
     latest_pv = PageView.objects.order_by('-timestamp').values('timestamp').first()
     latest_ts = latest_pv['timestamp'] if latest_pv else None
 
@@ -93,8 +133,13 @@ def analytics_view(request):
         )
         .order_by('day')
     )
-    unique_by_day = _unique_users_by_day(base_qs)
     daily_labels, daily_total, daily_authed, daily_anon, daily_unique = [], [], [], [], []
+    for row in rolled_daily:
+        daily_labels.append(row['day'].strftime('%b %d'))
+        daily_total.append(row['views'])
+        daily_authed.append(row['authed'])
+        daily_anon.append(row['views'] - row['authed'])
+        daily_unique.append(unique_by_day.get(row['day'], 0))
     for row in daily:
         day = row['day']
         daily_labels.append(day.strftime('%b %d') if day else '—')
@@ -103,26 +148,54 @@ def analytics_view(request):
         daily_anon.append(row['total'] - row['authed'])
         daily_unique.append(unique_by_day.get(day, 0))
 
-    campus_rows = base_qs.values('campus').annotate(c=Count('id')).order_by('-c')
-    campus_labels = [CAMPUS_LABELS.get(r['campus'], r['campus'] or 'Anonymous') for r in campus_rows]
-    campus_counts = [r['c'] for r in campus_rows]
+    campus_counts = _merge_counts(
+        base_qs.values('campus').annotate(c=Count('id')),
+        'campus',
+        retention.rollup_counts('campus', rolled_since) if rolled_since else {},
+    )
+    campus_rows = sorted(campus_counts.items(), key=lambda x: -x[1])
+    campus_labels = [CAMPUS_LABELS.get(campus, campus or 'Anonymous') for campus, _ in campus_rows]
+    campus_counts = [c for _, c in campus_rows]
 
-    browser_rows = _top_dimension(base_qs, 'browser', limit=8)
-    os_rows = _top_dimension(base_qs, 'os', limit=8)
-    device_rows = _top_dimension(base_qs, 'device', limit=8)
+    browser_rows = _top_dimension(base_qs, 'browser', limit=8, since=rolled_since)
+    os_rows = _top_dimension(base_qs, 'os', limit=8, since=rolled_since)
+    device_rows = _top_dimension(base_qs, 'device', limit=8, since=rolled_since)
 
-    top_pages = list(
-        base_qs.values('path')
-        .annotate(views=Count('id'), uniques=Count('email', distinct=True))
-        .order_by('-views')[:10]
-    )
+    if exact_uniques:
+        top_pages = list(
+            base_qs.values('path')
+            .annotate(views=Count('id'), uniques=Count('email', distinct=True))
+            .order_by('-views')[:10]
+        )
+    else:
+        page_views = _merge_counts(
+            base_qs.values('path').annotate(c=Count('id')),
+            'path',
+            retention.rollup_counts('path', rolled_since) if rolled_since else {},
+        )
+        top_pages = [
+            {
+                'path': path,
+                'views': views,
+                'uniques': sketches.unique_count('email', first_day, dimension='path', value=path),
+            }
+            for path, views in sorted(page_views.items(), key=lambda x: -x[1])[:10]
+        ]
 
-    top_item_rows = list(
+    all_item_rows = list(
         base_qs.filter(item_id_ref__isnull=False)
         .values('item_id_ref')
         .annotate(views=Count('id'))
-        .order_by('-views')[:10]
     )
+    if rolled_since:
+        item_views = {}
+        for row in all_item_rows:
+            item_views[row['item_id_ref']] = row['views']
+        for value, views in retention.rollup_counts('item', rolled_since).items():
+            if value:
+                item_views[int(value)] = item_views.get(int(value), 0) + views
+        all_item_rows = [{'item_id_ref': i, 'views': v} for i, v in item_views.items()]
+    top_item_rows = sorted(all_item_rows, key=lambda r: -r['views'])[:10]
     item_ids = [r['item_id_ref'] for r in top_item_rows]
     item_map = {
         i.id: i for i in Item.objects.filter(id__in=item_ids).select_related('seller', 'category')
@@ -149,11 +222,6 @@ def analytics_view(request):
                 'views': row['views'],
             })
 
-    all_item_rows = list(
-        base_qs.filter(item_id_ref__isnull=False)
-        .values('item_id_ref')
-        .annotate(views=Count('id'))
-    )
     seller_agg = {}
     if all_item_rows:
         item_seller = dict(
@@ -170,6 +238,9 @@ def analytics_view(request):
     status_counts = {'2xx': 0, '3xx': 0, '4xx': 0, '5xx': 0, 'other': 0}
     for row in base_qs.values('status').annotate(c=Count('id')):
         status_counts[_bucket_status(row['status'])] += row['c']
+    if rolled_since:
+        for status, c in retention.rollup_counts('status', rolled_since).items():
+            status_counts[_bucket_status(int(status))] += c
 
     new_persons = Person.objects.filter(registered_at__gte=since).count()
     new_items = Item.objects.filter(added_at__gte=since).count()
@@ -195,6 +266,8 @@ def analytics_view(request):
             'new_reactions': new_reactions,
             'new_feedback': new_feedback,
         },
+        'raw_since': boundary if rolled_since else None,
+        'approx_uniques': not exact_uniques,
         'chart_daily': json.dumps({
             'labels': daily_labels,
             'total': daily_total,
@@ -214,17 +287,116 @@ def analytics_view(request):
         'top_items': top_items,
         'top_sellers': top_sellers,
     }
+    return context
+
+
+def _rebuild(range_key):
+    # Read the version first: page views ingested while building make the
+    # entry stale again rather than being silently left out.
+    version, = caching.versions(caching.ANALYTICS_VERSION_KEY)
+    entry = {'context': build_context(range_key), 'built': time.time(), 'version': version}
+    cache.set(DASHBOARD_KEY.format(range_key=range_key), entry, DASHBOARD_IDLE_TIMEOUT)
+    return entry
+
+
+def refresh_dashboards():
+    """Rebuild cached dashboards that are behind the ingested data.
+
+    Called by the ingester after it wrote page views. Returns the range
+    keys rebuilt.
+    """
+    version, = caching.versions(caching.ANALYTICS_VERSION_KEY)
+    rebuilt = []
+    for range_key in RANGE_DAYS:
+        entry = cache.get(DASHBOARD_KEY.format(range_key=range_key))
+        if entry is None or entry['version'] == version:
+            continue
+        _rebuild(range_key)
+        rebuilt.append(range_key)
+    return rebuilt
+
+
+@staff_member_required
+def analytics_view(request):
+    range_key = request.GET.get('range', '30d')
+    if range_key not in RANGE_DAYS:
+        range_key = '30d'
+    key = DASHBOARD_KEY.format(range_key=range_key)
+    entry = cache.get(key)
+    if entry is None or time.time() - entry['built'] > DASHBOARD_MAX_STALE:
+        entry = _rebuild(range_key)
+    else:
+        cache.touch(key, DASHBOARD_IDLE_TIMEOUT)
+    context = dict(entry['context'], built_at=datetime.fromtimestamp(entry['built'], dt_timezone.utc))
     return render(request, 'admin/analytics.html', context)
 
 
+def _feed_row(event):
+    return dict(event, campus_label=CAMPUS_LABELS.get(event['campus'], event['campus'] or 'Anon'))
+
+
+@never_cache
 @staff_member_required
-def analytics_recent_json(request):
-    rows = list(
-        PageView.objects.order_by('-timestamp').values(
-            'timestamp', 'method', 'path', 'status', 'name', 'email', 'campus', 'ip'
-        )[:50]
+async def analytics_recent_json(request):
+    rows = await asyncio.to_thread(recent.latest, RECENT_ROWS)
+    return JsonResponse({'rows': [_feed_row(r) for r in rows]})
+
+
+def _sse(event, data, event_id=None):
+    head = f'id: {event_id}\n' if event_id is not None else ''
+    return f'{head}event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+async def _snapshot():
+    rows = await asyncio.to_thread(recent.latest, RECENT_ROWS)
+    return rows, _sse('snapshot', {'rows': [_feed_row(r) for r in rows]})
+
+
+async def _event_stream(subscription, snapshot, seen):
+    try:
+        yield snapshot
+        while True:
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), STREAM_KEEPALIVE)
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            overflowed, events = subscription.take()
+            if overflowed:
+                # Fell behind: a fresh snapshot replaces the dropped backlog.
+                rows, snapshot = await _snapshot()
+                seen = rows[0]['seq'] if rows else seen
+                yield snapshot
+                continue
+            for event in events:
+                if event['seq'] > seen:
+                    yield _sse('pageview', _feed_row(event), event['seq'])
+    finally:
+        # Runs when the client disconnects and the server cancels us.
+        feed.unsubscribe(subscription)
+
+
+@never_cache
+@staff_member_required
+async def analytics_stream(request):
+    """Server-Sent Events: a `snapshot` of the latest rows, then a
+    `pageview` event per new access log line.
+
+    Needs an ASGI server; under WSGI a stream would hold a whole worker, so
+    it answers 204, which tells EventSource not to reconnect, and the
+    dashboard goes back to polling recent.json.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    subscription = feed.subscribe()
+    try:
+        rows, snapshot = await _snapshot()
+    except BaseException:
+        feed.unsubscribe(subscription)
+        raise
+    seen = rows[0]['seq'] if rows else 0
+    response = StreamingHttpResponse(
+        _event_stream(subscription, snapshot, seen), content_type='text/event-stream',
     )
-    for r in rows:
-        r['timestamp'] = r['timestamp'].isoformat() if r['timestamp'] else None
-        r['campus_label'] = CAMPUS_LABELS.get(r['campus'], r['campus'] or 'Anon')
-    return JsonResponse({'rows': rows})
+    response['X-Accel-Buffering'] = 'no'  # nginx would otherwise hold events back
+    return response
@@ -8,3 +8,5 @@ class CoreConfig(AppConfig):
     def ready(self):
         from pillow_heif import register_heif_opener
         register_heif_opener()
+
+        from . import signals  # noqa: F401
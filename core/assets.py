@@ -0,0 +1,45 @@
+"""Third-party web fonts: where they come from and whether they are vendored.
+
+`manage.py build_assets --vendor` downloads the fonts below into
+static/vendor/. Until that has been done (and committed), pages keep linking
+the public CDNs, so a fresh checkout still renders correctly.
+"""
+import functools
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+GOOGLE_FONTS_CSS_URL = (
+    'https://fonts.googleapis.com/css2?family=Plus+Jakarta+Sans:wght@400;500;600;700;800&display=swap'
+)
+FONT_AWESOME_VERSION = '6.5.0'
+FONT_AWESOME_BASE_URL = f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/{FONT_AWESOME_VERSION}'
+FONT_AWESOME_CSS_URL = f'{FONT_AWESOME_BASE_URL}/css/all.min.css'
+
+VENDOR_DIR = 'vendor'
+VENDOR_FONTS_CSS = f'{VENDOR_DIR}/fonts.css'
+VENDOR_ICONS_CSS = f'{VENDOR_DIR}/fontawesome.css'
+
+
+@functools.lru_cache(maxsize=None)
+def is_vendored(name):
+    """True if static asset `name` is available to serve locally."""
+    if settings.DEBUG:
+        return bool(finders.find(name))
+    return staticfiles_storage.exists(name)
+
+
+def font_stylesheets(icons=True):
+    """URLs of the stylesheets pages need for text (and optionally icon) fonts."""
+    urls = []
+    if is_vendored(VENDOR_FONTS_CSS):
+        urls.append(staticfiles_storage.url(VENDOR_FONTS_CSS))
+    else:
+        urls.append(GOOGLE_FONTS_CSS_URL)
+    if icons:
+        if is_vendored(VENDOR_ICONS_CSS):
+            urls.append(staticfiles_storage.url(VENDOR_ICONS_CSS))
+        else:
+            urls.append(FONT_AWESOME_CSS_URL)
+    return urls
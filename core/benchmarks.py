@@ -0,0 +1,285 @@
+"""Timing harness for the marketplace hot paths.
+
+Each scenario seeds whatever rows it needs and drives the real views through
+the Django test client. Each scenario runs inside its own transaction that
+is rolled back when it ends, so pointing it at a live database leaves no
+trace and scenarios never see each other's rows.
+"""
+import random
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from statistics import median
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import helper, seeding
+from .analytics import ingest
+from .analytics.views import DASHBOARD_KEY, RANGE_DAYS
+from .models import Person, Item, Category, Hostel, Campus, Reaction, PageView, LogIngestState
+
+SCENARIOS = {}
+
+# Access logging spawns a thread per request, profiling and metrics add
+# noise and ratelimiting would start returning 429s after a few dozen iterations;
+# none of them belong in a timing.
+BENCH_EXCLUDED_MIDDLEWARE = {
+    'core.middleware.AccessLogMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.MetricsMiddleware',
+}
+BENCH_SETTINGS = {
+    'RATELIMIT_ENABLE': False,
+    'MIDDLEWARE': [m for m in settings.MIDDLEWARE if m not in BENCH_EXCLUDED_MIDDLEWARE],
+}
+
+
+def scenario(name):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+class Runner:
+    def __init__(self, repeat=5, size=300):
+        self.repeat = repeat
+        self.size = size
+        self.results = []
+
+    def client_for(self, person):
+        client = Client(SERVER_NAME='localhost')
+        session = client.session
+        session['user_data'] = {'email': person.email, 'name': person.name}
+        session.save()
+        return client
+
+    def measure(self, label, fn, setup=None):
+        """Call `fn` `repeat` times, recording wall time and query count.
+
+        `setup`, if given, runs untimed before each call to reset state the
+        previous call changed.
+        """
+        timings = []
+        queries = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            queries.append(len(ctx.captured_queries))
+        result = {
+            'name': label,
+            'size': self.size,
+            'runs': self.repeat,
+            'median_ms': round(median(timings) * 1000, 3),
+            'min_ms': round(min(timings) * 1000, 3),
+            'max_ms': round(max(timings) * 1000, 3),
+            'queries': max(queries),
+        }
+        self.results.append(result)
+        return result
+
+    def run(self, names):
+        with override_settings(**BENCH_SETTINGS):
+            # Each scenario gets a clean database: rows one leaves behind
+            # can't collide with the next one's, or change its timings.
+            for name in names:
+                with transaction.atomic():
+                    SCENARIOS[name](self)
+                    transaction.set_rollback(True)
+        return self.results
+
+
+def make_seller(name, campus=Campus.GOA):
+    """A seller for scenario `name`, with an email of its own."""
+    hostel, _ = Hostel.objects.get_or_create(name=f'Bench Hostel {campus}', defaults={'campus': campus})
+    email = f'bench.{name}.seller@{campus.lower()}.bits-pilani.ac.in'
+    person = Person.objects.create(name='Bench Seller', email=email, phone='9876543210', hostel=hostel)
+    return person
+
+
+def make_items(seller, count, category=None):
+    category = category or Category.objects.create(name='Bench Category')
+    items = [
+        Item(
+            name=f'Bench item {i}',
+            description='Synthetic benchmark listing',
+            price=Decimal(100 + i),
+            seller=seller,
+            category=category,
+            hostel=seller.hostel,
+            phone=seller.phone,
+        )
+        for i in range(count)
+    ]
+    return Item.objects.bulk_create(items)
+
+
+def make_reactors(count, start=0, campus=Campus.GOA):
+    domain = f'{campus.lower()}.bits-pilani.ac.in'
+    people = [
+        Person(name=f'Bench Reactor {i}', email=f'bench.reactor{i}@{domain}', campus=campus)
+        for i in range(start, start + count)
+    ]
+    return Person.objects.bulk_create(people)
+
+
+@scenario('bulk_action')
+def bench_bulk_action(runner):
+    seller = make_seller('bulk_action')
+    items = make_items(seller, runner.size)
+    client = runner.client_for(seller)
+    selected = ','.join(str(item.id) for item in items)
+
+    for action in ('repost', 'toggle_sold'):
+        runner.measure(
+            f'bulk_action:{action}',
+            lambda: client.post(f'/bulk-action/{action}', {'selected_items': selected}),
+        )
+
+
+REACTION_EMOJIS = ['👍', '❤️', '😂', '🔥', '😮', '😢']
+
+
+@scenario('home_reactions')
+def bench_home_reactions(runner):
+    """One full home page (60 items) as reactions per item grow tenfold.
+
+    Time and query count should stay flat: the reaction summary is grouped
+    per item × emoji, so it scales with the page, not the reaction count.
+    """
+    seller = make_seller('home_reactions')
+    items = make_items(seller, 60)
+    client = runner.client_for(seller)
+
+    reacted = 0
+    for per_item in (max(runner.size // 10, 1), runner.size):
+        reactors = make_reactors(per_item - reacted, start=reacted)
+        Reaction.objects.bulk_create(
+            [
+                Reaction(item=item, person=person, reaction_type=REACTION_EMOJIS[(item.id + person.id) % len(REACTION_EMOJIS)])
+                for person in reactors
+                for item in items
+            ],
+            batch_size=2000,
+        )
+        reacted = per_item
+        runner.measure(f'home:reactions_per_item={per_item}', lambda: client.get('/'))
+
+
+BENCH_LOG_NAME = 'access.log.bench'
+
+
+def make_marketplace(runner, seed=0):
+    """A seeded marketplace of `runner.size` listings: (people, items).
+
+    Uses the same generators as `manage.py seed_data`, so listings spread
+    over every campus, category and sort key, and reactions are skewed the
+    way they are in production.
+    """
+    rng = random.Random(seed)
+    people = seeding.seed_people(max(runner.size // 10, 20), rng, seeding.hostels())
+    items = seeding.seed_items(runner.size, rng, people, seeding.categories())
+    seeding.seed_images(items, 3, rng)
+    seeding.seed_reactions(items, people, 30, rng)
+    return people, items
+
+
+@scenario('home')
+def bench_home(runner):
+    """The home page under every sort, the all-campus view, a category and a search."""
+    people, items = make_marketplace(runner)
+    viewer = people[0]
+    client = runner.client_for(viewer)
+    category_id = items[0].category_id
+
+    for sort in helper.FEED_SORTS:
+        runner.measure(f'home:sort={sort}', lambda: client.get('/', {'sort': sort}))
+    runner.measure('home:campus=ALL', lambda: client.get('/', {'campus': 'ALL'}))
+    runner.measure('home:category', lambda: client.get('/', {'c': category_id, 'campus': 'ALL'}))
+    runner.measure('home:search', lambda: client.get('/', {'q': 'laptop', 'campus': 'ALL'}))
+    runner.measure('feed_json', lambda: client.get('/api/feed', {'campus': 'ALL'}))
+
+
+@scenario('item_detail')
+def bench_item_detail(runner):
+    """A full item page, then the same page revalidated with its ETag (304)."""
+    people, items = make_marketplace(runner)
+    client = runner.client_for(people[0])
+    item = Item.objects.annotate(n=Count('reactions')).order_by('-n').first()
+    url = f'/item/{item.id}'
+
+    runner.measure('item_detail', lambda: client.get(url))
+    etag = client.get(url).get('ETag', '')
+    runner.measure('item_detail:304', lambda: client.get(url, HTTP_IF_NONE_MATCH=etag))
+
+
+@scenario('react_item')
+def bench_react_item(runner):
+    """Reacting to, and listing the reactions of, the most reacted-to listing."""
+    people, items = make_marketplace(runner)
+    person = people[-1]
+    client = runner.client_for(person)
+    item = Item.objects.annotate(n=Count('reactions')).order_by('-n').first()
+    url = f'/react/{item.id}/'
+
+    def clear_own_reaction():
+        Reaction.objects.filter(item=item, person=person).delete()
+
+    runner.measure('react_item:post', lambda: client.post(url, {'emoji': '🔥'}), setup=clear_own_reaction)
+    runner.measure('react_item:get', lambda: client.get(url))
+
+
+@scenario('ingest_all')
+def bench_ingest_all(runner):
+    """Ingesting an access log of `size` × 10 lines from scratch."""
+    people, items = make_marketplace(runner)
+    lines = runner.size * 10
+    with tempfile.TemporaryDirectory() as logs_dir:
+        seeding.write_access_log(
+            Path(logs_dir) / BENCH_LOG_NAME, lines, random.Random(0), people, [item.id for item in items],
+        )
+
+        def forget_log():
+            LogIngestState.objects.filter(filename=BENCH_LOG_NAME).delete()
+            PageView.objects.filter(source_file=BENCH_LOG_NAME).delete()
+
+        runner.measure(f'ingest_all:lines={lines}', lambda: ingest.ingest_all(logs_dir), setup=forget_log)
+
+
+@scenario('analytics_view')
+def bench_analytics_view(runner):
+    """The staff analytics dashboard over `size` × 10 ingested page views."""
+    people, items = make_marketplace(runner)
+    with tempfile.TemporaryDirectory() as logs_dir:
+        seeding.write_access_log(
+            Path(logs_dir) / BENCH_LOG_NAME, runner.size * 10, random.Random(0), people, [item.id for item in items],
+        )
+        ingest.ingest_all(logs_dir)
+
+    staff = get_user_model().objects.create_user('bench.staff', is_staff=True, is_superuser=True)
+    client = Client(SERVER_NAME='localhost')
+    client.force_login(staff)
+
+    def forget_dashboards():
+        cache.delete_many([DASHBOARD_KEY.format(range_key=k) for k in RANGE_DAYS])
+
+    try:
+        for range_key in ('7d', '30d'):
+            url = f'/admin/analytics/?range={range_key}'
+            runner.measure(f'analytics_view:range={range_key}', lambda: client.get(url), setup=forget_dashboards)
+            runner.measure(f'analytics_view:range={range_key}:cached', lambda: client.get(url))
+    finally:
+        # The cache outlives the rolled-back transaction; don't leave
+        # dashboards built from benchmark rows behind.
+        forget_dashboards()
@@ -0,0 +1,287 @@
+"""Cache keys and invalidation for slow-changing reference data.
+
+Everything goes through Django's file-based caches so that all gunicorn
+workers see the same entries and an invalidation in one worker reaches the
+others. Rendered item cards live in the separate 'cards' cache, sized for
+every listing, so they can't crowd pages and version counters out of the
+default one.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.connection import ConnectionProxy
+from django.utils.safestring import mark_safe
+from django.utils.timesince import timesince
+
+from . import metrics
+from .models import Hostel, Campus
+
+card_cache = ConnectionProxy(caches, 'cards')
+
+REFERENCE_TIMEOUT = 60 * 60 * 24
+CARD_TIMEOUT = 60 * 60 * 24 * 7
+
+HOSTEL_CHOICES_KEY = 'hostel-choices:{campus}'
+CARD_KEY = 'item-card:{template}:{id}'
+PAGE_KEY = 'page:{version}:{view}:{digest}'
+LISTINGS_VERSION_KEY = 'listings-version'
+REACTIONS_VERSION_KEY = 'reactions-version:{item_id}'
+ANALYTICS_VERSION_KEY = 'analytics-version'
+SEARCH_VERSION_KEY = 'search-version'
+
+# Pages bake in relative timestamps ("5 minutes ago"), so page validators
+# also roll over on this interval even when nothing was edited.
+VALIDATOR_TIME_BUCKET = 5 * 60
+
+PRECACHE_EXTENSIONS = {'css', 'js', 'png', 'jpg', 'jpeg', 'svg', 'ico', 'webp', 'woff', 'woff2'}
+
+CARD_TEMPLATES = (
+    'core/partials/home_card.html',
+    'core/partials/listing_card.html',
+    'core/partials/similar_card.html',
+)
+
+# Stands in for the relative timestamp while rendering, so the cached HTML
+# never goes stale just because time passed.
+_AGO_MARKER = '\x00updated-ago\x00'
+
+
+def hostel_choices(campus=None):
+    """Return `(name, name)` choice tuples for a campus' hostels, or all hostels."""
+    key = HOSTEL_CHOICES_KEY.format(campus=campus or 'ALL')
+    choices = cache.get(key)
+    metrics.CACHE_REQUESTS.inc(cache='hostel_choices', result='miss' if choices is None else 'hit')
+    if choices is None:
+        qs = Hostel.objects.all()
+        if campus:
+            qs = qs.filter(campus=campus)
+        choices = [(name, name) for name in qs.values_list('name', flat=True)]
+        cache.set(key, choices, REFERENCE_TIMEOUT)
+    return choices
+
+
+def invalidate_hostel_choices():
+    cache.delete_many([HOSTEL_CHOICES_KEY.format(campus=c) for c in [*Campus.values, 'ALL']])
+
+
+def _card_fingerprint(item):
+    # Catches changes made through queryset.update(), which bypasses the
+    # post_save invalidation (bulk actions, admin actions, soft deletes).
+    return (item.updated_at.isoformat(), item.is_sold, item.is_deleted, item.repost_count)
+
+
+def render_item_cards(items, template_name):
+    """Render one card per item, reusing cached HTML for unchanged items.
+
+    All cache lookups and writes are batched, so a page of 60 cards costs one
+    get_many and at most one set_many. Only cards that changed are rendered.
+    """
+    items = list(items)
+    keys = {item.id: CARD_KEY.format(template=template_name, id=item.id) for item in items}
+    cached = card_cache.get_many(keys.values())
+    template = None
+    fresh = {}
+    cards = []
+    for item in items:
+        key = keys[item.id]
+        entry = cached.get(key)
+        fingerprint = _card_fingerprint(item)
+        if entry is None or entry[0] != fingerprint:
+            if template is None:
+                template = get_template(template_name)
+            html = template.render({'item': item, 'updated_ago': _AGO_MARKER})
+            entry = (fingerprint, html.split(_AGO_MARKER))
+            fresh[key] = entry
+        cards.append(mark_safe(timesince(item.updated_at).join(entry[1])))
+    if fresh:
+        card_cache.set_many(fresh, CARD_TIMEOUT)
+    metrics.CACHE_REQUESTS.inc(len(items) - len(fresh), cache='item_card', result='hit')
+    metrics.CACHE_REQUESTS.inc(len(fresh), cache='item_card', result='miss')
+    return cards
+
+
+def invalidate_item_cards(item_ids):
+    card_cache.delete_many([
+        CARD_KEY.format(template=template, id=item_id)
+        for item_id in item_ids
+        for template in CARD_TEMPLATES
+    ])
+
+
+@functools.lru_cache(maxsize=None)
+def static_version():
+    """Short hash identifying the current release of static assets.
+
+    This is the hash ManifestStaticFilesStorage records in its manifest,
+    which collectstatic rewrites on every deploy. Without a manifest (DEBUG,
+    or plain storage) fall back to a per-process token so entries never
+    outlive a restart.
+    """
+    manifest_hash = getattr(staticfiles_storage, 'manifest_hash', '')
+    if manifest_hash:
+        return manifest_hash[:12]
+    return f"p{int(time.time())}"
+
+
+def precache_urls():
+    """URLs of every hashed static asset the storefront serves.
+
+    Admin assets and non-web files are left out; the manifest is empty until
+    collectstatic has run, in which case nothing is precached.
+    """
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return sorted(
+        staticfiles_storage.url(name)
+        for name in hashed_files
+        if not name.startswith('admin/') and name.rsplit('.', 1)[-1].lower() in PRECACHE_EXTENSIONS
+    )
+
+
+def cached_response(timeout, vary_on=None, by_url=True, flash_messages=False, **cache_control):
+    """Serve a view's rendered body from the cache, with HTTP validators.
+
+    For views whose output only depends on the URL (and whatever `vary_on`
+    returns for the request); pass `by_url=False` for fully static bodies
+    such as error pages, so scanners hitting random URLs share one entry.
+
+    The body is stored alongside an ETag (hash of the body) and Last-Modified
+    (time it was rendered), so repeat GETs with If-None-Match or
+    If-Modified-Since get a bodyless 304. `cache_control` kwargs go straight
+    to patch_cache_control. Error statuses are cached too but are never
+    answered with a 304.
+
+    Pages that render base.html should pass `flash_messages=True`: requests
+    with pending messages then bypass the cache, since the template renders
+    (and consumes) them. It is opt-in because looking touches the session,
+    which adds Vary: Cookie to the response.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if flash_messages and len(messages.get_messages(request)):
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, no_cache=True)
+                return response
+
+            variant = vary_on(request) if vary_on else ''
+            url = f"{request.scheme}|{request.get_host()}|{request.get_full_path()}" if by_url else ''
+            digest = hashlib.md5(f"{url}|{variant}".encode()).hexdigest()
+            key = PAGE_KEY.format(version=static_version(), view=view.__name__, digest=digest)
+
+            entry = None if settings.DEBUG else cache.get(key)
+            metrics.CACHE_REQUESTS.inc(cache='page', result='miss' if entry is None else 'hit')
+            if entry is None:
+                rendered = view(request, *args, **kwargs)
+                if rendered.streaming or rendered.cookies:
+                    return rendered
+                entry = {
+                    'body': rendered.content,
+                    'status': rendered.status_code,
+                    'content_type': rendered['Content-Type'],
+                    'etag': f'"{hashlib.md5(rendered.content).hexdigest()}"',
+                    'last_modified': int(time.time()),
+                }
+                if not settings.DEBUG:
+                    cache.set(key, entry, timeout)
+
+            response = HttpResponse(entry['body'], status=entry['status'], content_type=entry['content_type'])
+            if cache_control:
+                patch_cache_control(response, **cache_control)
+            if entry['status'] != 200:
+                return response
+            response['ETag'] = entry['etag']
+            response['Last-Modified'] = http_date(entry['last_modified'])
+            if request.method not in ('GET', 'HEAD'):
+                return response
+            return get_conditional_response(
+                request,
+                etag=entry['etag'],
+                last_modified=entry['last_modified'],
+                response=response,
+            )
+        return wrapper
+    return decorator
+
+
+def _initial_version():
+    # Counters start from the clock, so one that was evicted or wiped never
+    # restarts at a number some client already holds an ETag for.
+    return time.time_ns() // 1000
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def bump_listings_version():
+    """Record that something the feed shows changed: an item, its images or
+    reactions, a category or a hostel."""
+    _bump_version(LISTINGS_VERSION_KEY)
+
+
+def bump_reactions_version(item_id):
+    _bump_version(REACTIONS_VERSION_KEY.format(item_id=item_id))
+    _bump_version(LISTINGS_VERSION_KEY)  # feed cards show reaction summaries
+
+
+def bump_analytics_version():
+    """Record that new page views were ingested."""
+    _bump_version(ANALYTICS_VERSION_KEY)
+
+
+def bump_search_version():
+    """Record that SearchTerm rows changed, so processes resync their index."""
+    _bump_version(SEARCH_VERSION_KEY)
+
+
+def versions(*keys):
+    """Current values of version counters, in one cache round trip."""
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+def page_etag(*parts):
+    """Strong ETag over everything a page was rendered from.
+
+    Callers pass the viewer and data versions; the static release and the
+    current VALIDATOR_TIME_BUCKET are always mixed in.
+    """
+    bucket = int(time.time() // VALIDATOR_TIME_BUCKET)
+    raw = repr((static_version(), bucket) + parts)
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def not_modified(request, etag):
+    """A 304 if the client's copy matches `etag`, otherwise None.
+
+    Requests with pending flash messages always get the full page, since the
+    template renders (and consumes) them.
+    """
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validator(response, etag)
+    return response
+
+
+def set_validator(response, etag):
+    # no-cache: browsers may keep the page but must revalidate before reuse.
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Item, Category, Hostel, Feedback
+from .models import Item, Category, Feedback
+from . import caching
 
 
 class ItemForm(forms.ModelForm):
@@ -18,11 +19,8 @@ class ItemForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
 
-        if self.user and self.user.campus:
-            campus_hostels = Hostel.objects.filter(campus=self.user.campus)
-            self.fields['hostel'].widget.choices = [(hostel.name, hostel.name) for hostel in campus_hostels]
-        else:
-            self.fields['hostel'].widget.choices = [(hostel.name, hostel.name) for hostel in Hostel.objects.all()]
+        campus = self.user.campus if self.user and self.user.campus else None
+        self.fields['hostel'].widget.choices = caching.hostel_choices(campus)
 
         self.fields['hostel'].required = not self.user.hostel
         self.fields['phone'].required = not self.user.phone
@@ -1,11 +1,19 @@
+import base64
 import io
+import json
 import os
 import urllib.parse
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from operator import attrgetter
 
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
 from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
 
+from . import metrics
+
 
 MAX_IMAGE_DIMENSION = 1600
 JPEG_QUALITY = 82
@@ -27,7 +35,7 @@ def compress_image_bytes(source):
         except Exception:
             pass
 
-    with PILImage.open(source) as img:
+    with metrics.IMAGE_PROCESSING.time(), PILImage.open(source) as img:
         img = ImageOps.exif_transpose(img)
         if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
             rgba = img.convert('RGBA')
@@ -81,6 +89,26 @@ def normalize_uploaded_image(uploaded_file):
     return ContentFile(compressed, name=f'{base}.jpg')
 
 
+def delete_files_on_commit(field_files):
+    """Unlink stored files after the current transaction commits.
+
+    Bulk queryset deletes skip Image.delete(), so callers hand the FieldFiles
+    over here instead. If the transaction rolls back the rows survive and so
+    do their files. Storage errors are swallowed; a stray file is harmless.
+    """
+    names = [(f.storage, f.name) for f in field_files if f]
+
+    def _delete():
+        for storage, name in names:
+            try:
+                storage.delete(name)
+            except Exception:
+                pass
+
+    if names:
+        transaction.on_commit(_delete)
+
+
 def generate_whatsapp_link(phone_number, message=None):
     phone_number = get_clean_number(phone_number)
     phone_number = phone_number[1:]  # strip leading '+'
@@ -129,3 +157,60 @@ def items_sort(items_list, method='0'):
     sold_sorted = sorted(sold, key=key_fn, reverse=rev)
 
     return unsold_sorted + sold_sorted
+
+
+# Database-side equivalent of items_sort: unsold first, then the sort key,
+# with id as a tiebreaker so every row has a fixed place for keyset cursors.
+FEED_SORTS = {
+    '0': ('updated_at', True),
+    '1': ('price', False),
+    '2': ('price', True),
+    '3': ('relevance', True),  # searches only: annotated by core.search
+}
+RELEVANCE_SORT = '3'
+
+
+def _feed_sort(method):
+    return FEED_SORTS.get(str(method or '0'), FEED_SORTS['0'])
+
+
+def feed_order(queryset, method='0'):
+    field, descending = _feed_sort(method)
+    prefix = '-' if descending else ''
+    return queryset.order_by('is_sold', f'{prefix}{field}', f'{prefix}id')
+
+
+def feed_cursor(item, method='0'):
+    """Opaque cursor pointing just after `item` in the feed_order for `method`."""
+    field, _ = _feed_sort(method)
+    value = getattr(item, field)
+    value = value.isoformat() if field == 'updated_at' else str(value)
+    raw = json.dumps([int(item.is_sold), value, item.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def feed_after(queryset, method, cursor):
+    """Restrict a feed_order'ed queryset to the rows after `cursor`.
+
+    Raises ValueError if the cursor is malformed.
+    """
+    field, descending = _feed_sort(method)
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        is_sold, value, item_id = json.loads(raw)
+        is_sold = bool(is_sold)
+        item_id = int(item_id)
+        if field == 'updated_at':
+            value = datetime.fromisoformat(value)
+        elif field == 'relevance':
+            value = float(value)
+        else:
+            value = Decimal(value)
+    except (ValueError, TypeError, InvalidOperation, json.JSONDecodeError):
+        raise ValueError("Invalid cursor.")
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(
+        Q(is_sold__gt=is_sold)
+        | Q(is_sold=is_sold, **{f'{field}__{op}': value})
+        | Q(is_sold=is_sold, **{field: value, f'id__{op}': item_id})
+    )
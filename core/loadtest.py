@@ -0,0 +1,161 @@
+"""Concurrent HTTP load against a running server.
+
+Unlike core.benchmarks, which times views in-process, this drives a real
+server (gunicorn sync workers, or uvicorn workers on config.asgi) over HTTP,
+so worker counts, the event loop and connection handling are all part of
+the measurement. Sessions come from the DEBUG-only /debug-sign-in page, or
+from a session cookie copied out of a browser.
+
+    report = asyncio.run(loadtest.hammer('http://127.0.0.1:8000', ['/react/1/'], concurrency=64, total=2000))
+"""
+import asyncio
+import functools
+import ssl
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import certifi
+import httpx
+
+TIMEOUT = 30
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class Stats:
+    """Latencies and failures per route."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    def add(self, route, seconds, status):
+        """`status` is None when the request never got a response."""
+        self.latencies[route].append(seconds)
+        self.statuses[route][status or 'failed'] += 1
+        if status is None or status >= 500:
+            self.errors[route] += 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def report(self):
+        """[{route, requests, errors, error_rate, rps, p50_ms, p90_ms, p99_ms, max_ms, statuses}], busiest first."""
+        elapsed = self.elapsed or (time.perf_counter() - self.started)
+        rows = []
+        for route, latencies in sorted(self.latencies.items(), key=lambda kv: -len(kv[1])):
+            latencies = sorted(latencies)
+            rows.append({
+                'route': route,
+                'requests': len(latencies),
+                'errors': self.errors[route],
+                'error_rate': round(self.errors[route] / len(latencies), 4),
+                'rps': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+                'p90_ms': round(percentile(latencies, 0.90) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1),
+                'statuses': {str(k): v for k, v in sorted(self.statuses[route].items(), key=str)},
+            })
+        return rows
+
+
+@functools.cache
+def _ssl_context():
+    # httpx builds one per client otherwise, ~35ms of CPU each; replays open
+    # a client per visit and would spend more time on that than on requests.
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def client(base_url, concurrency, cookies=None):
+    return httpx.AsyncClient(
+        base_url=base_url,
+        cookies=cookies,
+        timeout=TIMEOUT,
+        verify=_ssl_context(),
+        follow_redirects=False,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+
+async def sign_in(http, email, name=''):
+    """Sign `http` in through /debug-sign-in (the server must run with DEBUG on)."""
+    page = await http.get('/debug-sign-in')
+    if page.status_code != 200:
+        raise RuntimeError(f"/debug-sign-in answered {page.status_code}; is the server running with DEBUG=True?")
+    token = http.cookies.get('csrftoken', '')
+    resp = await http.post(
+        '/debug-sign-in',
+        data={'email': email, 'name': name, 'csrfmiddlewaretoken': token},
+        headers={'Referer': str(http.base_url)},
+    )
+    if resp.status_code != 302 or 'sessionid' not in http.cookies:
+        raise RuntimeError(f"Signing in as {email} failed ({resp.status_code})")
+
+
+def route_of(path):
+    """Group URLs by shape: /item/12 and /item/40 are the same route."""
+    parts = [('<id>' if p.isdigit() else p) for p in urlsplit(path).path.split('/')]
+    return '/'.join(parts) or '/'
+
+
+async def timed_request(http, stats, method, path, **kwargs):
+    started = time.perf_counter()
+    try:
+        resp = await http.request(method, path, **kwargs)
+        status = resp.status_code
+    except httpx.HTTPError:
+        status = None
+    stats.add(f'{method} {route_of(path)}', time.perf_counter() - started, status)
+    return status
+
+
+def overall(stats):
+    merged = Stats()
+    merged.started, merged.elapsed = stats.started, stats.elapsed
+    for route, latencies in stats.latencies.items():
+        merged.latencies['*'].extend(latencies)
+        merged.errors['*'] += stats.errors[route]
+        for status, count in stats.statuses[route].items():
+            merged.statuses['*'][status] += count
+    return merged.report()[0]
+
+
+async def hammer(base_url, paths, concurrency=32, total=1000, email=None, cookies=None):
+    """GET `paths` round-robin, `total` requests with `concurrency` in flight.
+
+    Returns Stats.report() plus an overall row under route '*'.
+    """
+    stats = Stats()
+    async with client(base_url, concurrency, cookies) as http:
+        if email:
+            await sign_in(http, email)
+        counter = iter(range(total))
+
+        async def worker():
+            for n in counter:
+                await timed_request(http, stats, 'GET', paths[n % len(paths)])
+
+        stats.started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        stats.finish()
+    return stats.report() + [overall(stats)]
+
+
+def format_report(rows):
+    lines = [f"{'route':<36} {'reqs':>7} {'rps':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'errors':>7}"]
+    for r in rows:
+        lines.append(
+            f"{r['route'][:36]:<36} {r['requests']:>7} {r['rps']:>8.1f} {r['p50_ms']:>7.1f}ms "
+            f"{r['p90_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms {r['error_rate']:>7.2%}"
+        )
+    return lines
@@ -0,0 +1,86 @@
+import csv
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics.columnar import QueryError, load
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Not a date (YYYY-MM-DD): {value}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Count page views (live and archived) grouped by any columns, in memory. "
+        "Example: --since 2025-01-01 --until 2025-05-01 --where status__lt=400 "
+        "--group-by hostel,hour --distinct email"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=_date, help="First local date included (YYYY-MM-DD).")
+        parser.add_argument('--until', type=_date, help="First local date excluded (YYYY-MM-DD).")
+        parser.add_argument(
+            '--where',
+            action='append',
+            default=[],
+            metavar='FIELD[__OP]=VALUE',
+            help="Filter; repeatable. OP is one of in (comma-separated), gte, gt, lte, lt, startswith, contains.",
+        )
+        parser.add_argument('--group-by', default='', help="Comma-separated columns to group by.")
+        parser.add_argument('--distinct', help="Also count distinct values of this column per group.")
+        parser.add_argument('--limit', type=int, default=50, help="Largest groups to print (0 for all).")
+        parser.add_argument('--no-archive', action='store_true', help="Only read rows still in PageView.")
+        parser.add_argument('--format', choices=['table', 'csv', 'json'], default='table')
+
+    def handle(self, *args, **options):
+        conditions = {}
+        for clause in options['where']:
+            field, sep, value = clause.partition('=')
+            if not sep:
+                raise CommandError(f"--where needs FIELD=VALUE, got {clause!r}")
+            conditions[field] = value.split(',') if field.endswith('__in') else value
+
+        started = time.perf_counter()
+        table = load(since=options['since'], until=options['until'], include_archive=not options['no_archive'])
+        loaded = time.perf_counter()
+        group_by = [f for f in options['group_by'].split(',') if f]
+        try:
+            rows = (
+                table.query()
+                .where(**conditions)
+                .group_by(*group_by)
+                .count(distinct=options['distinct'], limit=options['limit'] or None)
+            )
+        except QueryError as exc:
+            raise CommandError(str(exc))
+        finished = time.perf_counter()
+
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(rows, indent=2))
+        elif options['format'] == 'csv':
+            if rows:
+                writer = csv.DictWriter(self.stdout, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            self._table(rows)
+            self.stderr.write(
+                f"{table.rows} row(s) loaded in {loaded - started:.2f}s, "
+                f"queried in {(finished - loaded) * 1000:.1f}ms."
+            )
+
+    def _table(self, rows):
+        if not rows:
+            self.stdout.write("No matching page views.")
+            return
+        headers = list(rows[0])
+        widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+        self.stdout.write('  '.join(h.ljust(w) for h, w in zip(headers, widths)))
+        for r in rows:
+            self.stdout.write('  '.join(str(r[h]).ljust(w) for h, w in zip(headers, widths)))
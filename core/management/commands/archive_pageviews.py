@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.analytics.retention import archive_dir, archive_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll PageView rows older than the retention window up into daily counts, "
+        "archive them as gzip JSONL by month and delete them. Meant to run daily from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.PAGEVIEW_RETENTION_DAYS,
+            help="Keep this many days of raw rows.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Only report how many rows each expired day has.",
+        )
+
+    def handle(self, *args, **options):
+        removed = archive_expired(
+            retention_days=options['days'],
+            dry_run=options['dry_run'],
+            on_day=lambda day, count: self.stdout.write(f"{day}: {count} row(s)"),
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Would archive {removed} row(s)."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Archived {removed} row(s) to {archive_dir()}."))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import SCENARIOS, Runner
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the marketplace hot paths against synthetic rows. "
+        "Each scenario runs in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios',
+            nargs='*',
+            help=f"Scenarios to run (default: all). Available: {', '.join(sorted(SCENARIOS))}.",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help="Timed runs per measurement; the median is reported.",
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=300,
+            help="Number of items each scenario seeds.",
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help="Print results as JSON for regression comparison.",
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or sorted(SCENARIOS)
+        unknown = [n for n in names if n not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(unknown)}")
+
+        results = Runner(repeat=options['repeat'], size=options['size']).run(names)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for r in results:
+            self.stdout.write(
+                f"{r['name']:<32} n={r['size']:<6} median={r['median_ms']:>9.2f}ms "
+                f"min={r['min_ms']:>9.2f}ms max={r['max_ms']:>9.2f}ms queries={r['queries']}"
+            )
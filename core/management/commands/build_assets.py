@@ -0,0 +1,236 @@
+import gzip
+import re
+from pathlib import Path
+from urllib.parse import urljoin
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core import assets
+
+try:
+    import brotli
+except ImportError:  # a declared dependency; handle() warns when it is missing
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # likewise; icon fonts are vendored whole without it (or brotli)
+    font_subset = None
+
+# Google serves woff2 (and unicode-range splits) only to browsers it recognises.
+BROWSER_UA = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+)
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.xml', '.map', '.ico', '.ttf'}
+
+URL_RE = re.compile(r'url\(([^)]+)\)')
+ICON_CLASS_RE = re.compile(r'\bfa-([a-z0-9-]+)')
+ICON_RULE_RE = re.compile(r'^(?:\.fa-[a-z0-9-]+:{1,2}before,?)+$')
+CONTENT_RE = re.compile(r'content:\s*"((?:\\[0-9a-fA-F]+|[^"])*)"')
+
+
+class Command(BaseCommand):
+    help = (
+        "Build static assets for deployment: optionally vendor the web fonts "
+        "(--vendor), run collectstatic, then write .gz and .br copies next "
+        "to every compressible file in STATIC_ROOT for the web server to serve as-is (nginx gzip_static)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vendor',
+            action='store_true',
+            help="Download Plus Jakarta Sans and a Font Awesome subset into static/vendor/.",
+        )
+        parser.add_argument(
+            '--no-collect',
+            action='store_true',
+            help="Skip collectstatic and only compress what is already in STATIC_ROOT.",
+        )
+        parser.add_argument(
+            '--min-size',
+            type=int,
+            default=512,
+            help="Files smaller than this many bytes are not pre-compressed.",
+        )
+
+    def handle(self, *args, **options):
+        if brotli is None:
+            self.stderr.write(self.style.WARNING(
+                "brotli is not installed: no .br copies will be written"
+                f"{' and the icon fonts will not be subset' if options['vendor'] else ''}."
+            ))
+        if options['vendor'] and font_subset is None:
+            self.stderr.write(self.style.WARNING("fontTools is not installed: the icon fonts will not be subset."))
+
+        if options['vendor']:
+            vendor_dir = self._vendor_dir()
+            self._vendor_text_fonts(vendor_dir)
+            self._vendor_icon_fonts(vendor_dir)
+
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'])
+
+        written, saved = self._compress(Path(settings.STATIC_ROOT), options['min_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Pre-compressed {written} file(s), {saved // 1024} KB saved per full download."
+        ))
+
+    # ── Vendoring ──────────────────────────────────────────────────────────────
+    def _vendor_dir(self):
+        if not settings.STATICFILES_DIRS:
+            raise CommandError("STATICFILES_DIRS is empty; nowhere to vendor fonts into.")
+        vendor_dir = Path(settings.STATICFILES_DIRS[0]) / assets.VENDOR_DIR
+        vendor_dir.mkdir(parents=True, exist_ok=True)
+        return vendor_dir
+
+    def _fetch(self, url):
+        resp = requests.get(url, headers={'User-Agent': BROWSER_UA}, timeout=30)
+        if resp.status_code != 200:
+            raise CommandError(f"GET {url} returned {resp.status_code}")
+        return resp
+
+    def _vendor_text_fonts(self, vendor_dir):
+        css = self._fetch(assets.GOOGLE_FONTS_CSS_URL).text
+        fonts_dir = vendor_dir / 'fonts'
+        fonts_dir.mkdir(exist_ok=True)
+
+        def localise(match):
+            url = match.group(1).strip('\'"')
+            name = url.rsplit('/', 1)[-1]
+            target = fonts_dir / name
+            if not target.exists():
+                target.write_bytes(self._fetch(url).content)
+            return f'url(fonts/{name})'
+
+        (vendor_dir / 'fonts.css').write_text(URL_RE.sub(localise, css))
+        self.stdout.write(f"Vendored {assets.VENDOR_FONTS_CSS}")
+
+    def _used_icons(self):
+        """Every fa-* class mentioned in the app's templates and static sources."""
+        roots = [Path(apps.get_app_config('core').path) / 'templates']
+        roots += [Path(d) for d in settings.STATICFILES_DIRS]
+        used = set()
+        for root in roots:
+            for path in root.rglob('*'):
+                if path.suffix not in ('.html', '.js', '.css') or assets.VENDOR_DIR in path.parts:
+                    continue
+                used.update(ICON_CLASS_RE.findall(path.read_text(errors='ignore')))
+        return used
+
+    def _vendor_icon_fonts(self, vendor_dir):
+        css = self._fetch(assets.FONT_AWESOME_CSS_URL).text
+        used = self._used_icons()
+        kept_rules = []
+        codepoints = set()
+        for selector, body in _top_level_rules(css):
+            if ICON_RULE_RE.match(selector):
+                selectors = [s for s in selector.split(',') if s and ICON_CLASS_RE.search(s).group(1) in used]
+                if not selectors:
+                    continue
+                kept_rules.append(f"{','.join(selectors)}{{{body}}}")
+                content = CONTENT_RE.search(body)
+                if content:
+                    codepoints.update(_css_codepoints(content.group(1)))
+                continue
+            if selector.startswith('@font-face'):
+                body = self._localise_webfont(body, vendor_dir)
+            kept_rules.append(f"{selector}{{{body}}}")
+
+        # @font-face rules precede the icon rules in all.min.css, so the
+        # fonts are subset once every icon has been seen.
+        subset = bool(font_subset and brotli and codepoints)  # fontTools needs brotli for woff2
+        if subset:
+            for woff2 in (vendor_dir / 'webfonts').glob('*.woff2'):
+                _subset_font(woff2, codepoints)
+
+        (vendor_dir / 'fontawesome.css').write_text(''.join(kept_rules))
+        self.stdout.write(
+            f"Vendored {assets.VENDOR_ICONS_CSS} ({len(used)} icon classes referenced"
+            f"{', glyphs subset' if subset else ''})"
+        )
+
+    def _localise_webfont(self, body, vendor_dir):
+        webfonts_dir = vendor_dir / 'webfonts'
+        webfonts_dir.mkdir(exist_ok=True)
+        src = re.search(r'src:([^;}]+)', body)
+        if not src:
+            return body
+        woff2 = next((u.strip('\'"') for u in URL_RE.findall(src.group(1)) if '.woff2' in u), None)
+        if not woff2:
+            return body
+        name = woff2.rsplit('/', 1)[-1]
+        # Always refetched: a previous run may have subset it to fewer glyphs.
+        (webfonts_dir / name).write_bytes(self._fetch(urljoin(assets.FONT_AWESOME_CSS_URL, woff2)).content)
+        return body.replace(src.group(0), f'src:url(webfonts/{name}) format("woff2")')
+
+    # ── Pre-compression ───────────────────────────────────────────────────────
+    def _compress(self, root, min_size):
+        if not root.exists():
+            raise CommandError(f"{root} does not exist; run collectstatic first.")
+        written = saved = 0
+        for path in root.rglob('*'):
+            if not path.is_file() or path.suffix not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            stat = path.stat()
+            if stat.st_size < min_size:
+                continue
+            data = None
+            encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+            if brotli:
+                encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+            for suffix, encode in encoders:
+                target = path.with_name(path.name + suffix)
+                if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                    continue
+                if data is None:
+                    data = path.read_bytes()
+                packed = encode(data)
+                # Not worth a second copy if it barely shrinks.
+                if len(packed) > len(data) * 0.95:
+                    continue
+                target.write_bytes(packed)
+                written += 1
+                saved += len(data) - len(packed)
+        return written, saved
+
+
+def _top_level_rules(css):
+    """Yield (selector, body) for each top-level rule; nested blocks stay in body."""
+    depth = 0
+    start = 0
+    selector = ''
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0:
+                selector = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                yield selector, css[start:i]
+                start = i + 1
+
+
+def _css_codepoints(content):
+    for escape in re.findall(r'\\([0-9a-fA-F]+)', content):
+        yield int(escape, 16)
+    for ch in re.sub(r'\\[0-9a-fA-F]+', '', content):
+        yield ord(ch)
+
+
+def _subset_font(path, codepoints):
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = font_subset.load_font(str(path), options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    font_subset.save_font(font, str(path), options)
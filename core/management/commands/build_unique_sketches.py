@@ -0,0 +1,38 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from core.analytics import retention, sketches
+from core.models import PageView
+
+CHUNK = 5000
+
+
+def _chunks(iterable):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, CHUNK)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per-day unique visitor sketches from PageView and the archives. "
+        "Ingestion keeps them current; run this once for data ingested before they existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help="Only rebuild days that still have rows in PageView.",
+        )
+
+    def handle(self, *args, **options):
+        def batches():
+            if not options['no_archive'] and retention.archive_dir().is_dir():
+                for path in sorted(retention.archive_dir().glob('*/*.jsonl.gz')):
+                    yield from retention.read_archive(path)
+            yield from _chunks(PageView.objects.order_by('timestamp').iterator(chunk_size=CHUNK))
+
+        days = sketches.rebuild(batches())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt unique visitor sketches for {days} day(s)."))
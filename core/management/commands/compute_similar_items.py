@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.similarity import COVIEW_DAYS, TOP_K, compute_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the similar-items list shown on each item page from category, "
+        "campus, price band, name tokens and co-views. Meant to run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=TOP_K,
+            help="Neighbours to keep per item.",
+        )
+        parser.add_argument(
+            '--coview-days',
+            type=int,
+            default=COVIEW_DAYS,
+            help="How far back to look in PageView for co-views.",
+        )
+
+    def handle(self, *args, **options):
+        count = compute_neighbours(k=options['k'], coview_days=options['coview_days'])
+        self.stdout.write(self.style.SUCCESS(f"Computed similar items for {count} item(s)."))
@@ -1,11 +1,85 @@
+import signal
+import threading
+import time
+
 from django.core.management.base import BaseCommand
 
-from core.analytics.ingest import ingest_all
+from core.analytics.ingest import (
+    BATCH_SIZE, FLUSH_INTERVAL, FOLLOW_INTERVAL, IngestBusy, follow, ingest_all, ingest_lock,
+)
+from core.analytics.views import DASHBOARD_REFRESH_INTERVAL, refresh_dashboards
 
 
 class Command(BaseCommand):
-    help = "Parse logs/access.log* and upsert rows into the PageView table (idempotent)."
+    help = (
+        "Parse logs/access.log* and upsert rows into the PageView table (idempotent). "
+        "Run once from cron, or with --follow as a long-running ingester."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help="Keep running, tailing the logs (across rotations) and ingesting lines as they are written.",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=FOLLOW_INTERVAL,
+            help="Seconds between checks for new lines in --follow mode.",
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            default=FLUSH_INTERVAL,
+            help="Longest a parsed row waits in memory before being written in --follow mode.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help="Rows per INSERT.",
+        )
 
     def handle(self, *args, **options):
-        created = ingest_all()
+        try:
+            with ingest_lock():
+                if options['follow']:
+                    self._follow(options)
+                    return
+                created = ingest_all(batch_size=options['batch_size'])
+                if created:
+                    refresh_dashboards()
+        except IngestBusy as exc:
+            # Another ingester (a cron run or the follower) is on it.
+            self.stdout.write(self.style.WARNING(f"Ingest already running (lock held on {exc})."))
+            return
         self.stdout.write(self.style.SUCCESS(f"Ingested {created} new row(s)."))
+
+    def _follow(self, options):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+        state = {'dirty': False, 'refreshed': 0.0}
+
+        def on_poll(written):
+            if written:
+                self.stdout.write(f"Ingested {written} new row(s).")
+                state['dirty'] = True
+            # Cached dashboards are rebuilt here, in the ingester, so staff
+            # page loads never wait for them.
+            if state['dirty'] and time.monotonic() - state['refreshed'] >= DASHBOARD_REFRESH_INTERVAL:
+                state['refreshed'] = time.monotonic()
+                state['dirty'] = False
+                for range_key in refresh_dashboards():
+                    self.stdout.write(f"Refreshed the {range_key} dashboard.")
+
+        self.stdout.write(f"Following logs every {options['interval']}s; Ctrl-C to stop.")
+        follow(
+            interval=options['interval'],
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+            stop=stop,
+            on_poll=on_poll,
+        )
+        self.stdout.write(self.style.SUCCESS("Stopped."))
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent GETs to a running server and report latency percentiles "
+        "and error rates per route. Compare `gunicorn config.wsgi` with "
+        "`gunicorn config.asgi -k uvicorn.workers.UvicornWorker` at the same worker count."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="Server to load, e.g. http://127.0.0.1:8000.")
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            required=True,
+            help="Path to request; repeat for several, which are requested in turn.",
+        )
+        parser.add_argument('--concurrency', type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument('--requests', type=int, default=1000, help="Total requests to send.")
+        parser.add_argument(
+            '--sign-in-as',
+            metavar='EMAIL',
+            help="Sign in through /debug-sign-in first (the server must run with DEBUG=True).",
+        )
+        parser.add_argument('--session', help="Use this sessionid cookie instead of signing in.")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--concurrency and --requests must be positive.")
+        cookies = {'sessionid': options['session']} if options['session'] else None
+        try:
+            rows = asyncio.run(loadtest.hammer(
+                options['base_url'].rstrip('/'),
+                options['paths'],
+                concurrency=options['concurrency'],
+                total=options['requests'],
+                email=options['sign_in_as'],
+                cookies=cookies,
+            ))
+        except (RuntimeError, OSError) as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+        for line in loadtest.format_report(rows):
+            self.stdout.write(line)
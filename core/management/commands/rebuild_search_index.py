@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the search index from every item, category and hostel name. Saves keep it "
+        "current on their own; run this after installing, or after bulk loads that skip signals."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} word(s)."))
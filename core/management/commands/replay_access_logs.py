@@ -0,0 +1,103 @@
+import asyncio
+import json
+from datetime import datetime, time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core import loadtest, replay
+
+
+def _moment(value):
+    """A --since/--until value: a date (midnight) or a datetime, in local time."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Not a date or datetime: {value!r}")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the GET traffic recorded in logs/access.log* against a running server, "
+        "visitor by visitor at the recorded pace, and report latency percentiles and "
+        "error rates per route. Signed-in visitors need the server running with DEBUG=True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="Server to replay against, e.g. http://127.0.0.1:8000.")
+        parser.add_argument('--logs-dir', help="Directory holding access.log* (default: logs/).")
+        parser.add_argument('--since', help="Replay lines logged at or after this date or datetime.")
+        parser.add_argument('--until', help="Replay lines logged before this date or datetime.")
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help="Time compression: 60 plays an hour of traffic in a minute.",
+        )
+        parser.add_argument(
+            '--max-gap',
+            type=float,
+            help="Shorten any quiet stretch in the log to at most this many seconds (before --speed).",
+        )
+        parser.add_argument('--limit', type=int, help="Stop after this many requests.")
+        parser.add_argument(
+            '--max-visits',
+            type=int,
+            default=200,
+            help="Visits in progress at once; later ones wait (and fall behind schedule).",
+        )
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        if options['speed'] <= 0 or options['max_visits'] < 1:
+            raise CommandError("--speed and --max-visits must be positive.")
+        logs_dir = Path(options['logs_dir']) if options['logs_dir'] else None
+        if logs_dir and not logs_dir.is_dir():
+            raise CommandError(f"No such directory: {logs_dir}")
+
+        visits, skipped = replay.read_visits(
+            logs_dir,
+            since=_moment(options['since']) if options['since'] else None,
+            until=_moment(options['until']) if options['until'] else None,
+            max_gap=options['max_gap'],
+            limit=options['limit'],
+        )
+        if not visits:
+            raise CommandError("Nothing to replay in that range.")
+        requests = sum(len(visit.requests) for visit in visits)
+        recorded = max(visit.requests[-1][0] for visit in visits)
+        if not options['json']:
+            self.stdout.write(
+                f"Replaying {requests} request(s) in {len(visits)} visit(s) "
+                f"({skipped} POST/sign-in/admin line(s) skipped), "
+                f"about {recorded / options['speed']:.0f}s at {options['speed']:g}x..."
+            )
+
+        try:
+            rows, summary = asyncio.run(replay.replay(
+                options['base_url'].rstrip('/'),
+                visits,
+                speed=options['speed'],
+                max_visits=options['max_visits'],
+            ))
+        except (RuntimeError, OSError) as e:
+            raise CommandError(str(e))
+        summary['skipped_lines'] = skipped
+
+        if options['json']:
+            self.stdout.write(json.dumps({'summary': summary, 'routes': rows}, indent=2))
+            return
+        for line in loadtest.format_report(rows):
+            self.stdout.write(line)
+        self.stdout.write(
+            f"Finished in {summary['elapsed_seconds']}s; requests went out "
+            f"{summary['lag_p50_ms']}ms (p50) / {summary['lag_p99_ms']}ms (p99) / "
+            f"{summary['lag_max_ms']}ms (max) behind schedule."
+        )
@@ -0,0 +1,25 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics.retention import restore_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Load an archived month of page views back into PageView. "
+        "The next archive_pageviews run removes them again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help="Month to restore, as YYYY-MM.")
+
+    def handle(self, *args, **options):
+        month = options['month']
+        if not re.fullmatch(r'\d{4}-\d{2}', month):
+            raise CommandError("Month must look like 2025-01.")
+        try:
+            loaded = restore_month(month)
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Restored {loaded} row(s) from {month}."))
@@ -0,0 +1,86 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import search, seeding
+from core.analytics.ingest import LOGS_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic people, listings, images and reactions, "
+        "and optionally write a synthetic access log, for load testing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=500, help="Seeded people to create.")
+        parser.add_argument('--items', type=int, default=5000, help="Seeded listings to create.")
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=3,
+            help="Maximum images per listing (all share one placeholder file).",
+        )
+        parser.add_argument(
+            '--reactions',
+            type=int,
+            default=50,
+            help="Maximum reactions per listing; most listings get far fewer.",
+        )
+        parser.add_argument(
+            '--log-lines',
+            type=int,
+            default=0,
+            help=f"Access log lines to write to logs/{seeding.SEED_LOG_NAME} for ingest_access_logs.",
+        )
+        parser.add_argument('--log-days', type=int, default=30, help="Days the access log spans.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible data.")
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help="Remove previously seeded data first (or only, with --people 0 --items 0).",
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Allow seeding when DEBUG is off.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to seed with DEBUG off; pass --force if this database is disposable.")
+
+        if options['clear']:
+            removed = seeding.clear()
+            self.stdout.write(f"Removed {removed} seeded people and everything they listed.")
+
+        rng = random.Random(options['seed'])
+        people, items = [], []
+        with transaction.atomic():
+            if options['people']:
+                campus_hostels = seeding.hostels()
+                people = seeding.seed_people(options['people'], rng, campus_hostels)
+            if options['items']:
+                if not people:
+                    raise CommandError("Listings need sellers; pass --people.")
+                items = seeding.seed_items(options['items'], rng, people, seeding.categories())
+                images = seeding.seed_images(items, options['images'], rng)
+                reactions = seeding.seed_reactions(items, people, options['reactions'], rng)
+                self.stdout.write(f"Created {len(images)} image(s) and {len(reactions)} reaction(s).")
+            if people or items:
+                # bulk_create sends no post_save, so the index hasn't seen these names.
+                search.rebuild()
+
+        if options['log_lines']:
+            LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            path = LOGS_DIR / seeding.SEED_LOG_NAME
+            seeding.write_access_log(
+                path, options['log_lines'], rng, people, [item.id for item in items], days=options['log_days'],
+            )
+            self.stdout.write(f"Wrote {options['log_lines']} line(s) to {path}.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(people)} people and {len(items)} listing(s)."
+        ))
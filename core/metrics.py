@@ -0,0 +1,234 @@
+"""Prometheus-style counters and histograms, summed across gunicorn workers.
+
+Each process keeps its metrics in memory and, at most every FLUSH_INTERVAL
+seconds, writes a snapshot to METRICS_DIR/<pid>.json. The /metrics endpoint
+adds up every snapshot (plus the serving process's live values) and renders
+the Prometheus text format. Snapshots of exited workers are kept so counters
+stay monotonic across worker restarts, until they are STALE_AFTER old.
+
+Gauges that describe the system rather than the process (ingestion lag) are
+computed when scraped.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+FLUSH_INTERVAL = 5
+STALE_AFTER = 60 * 60 * 24 * 7
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels_key(labels):
+    return json.dumps(sorted(labels.items()), separators=(',', ':'))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+
+    def inc(self, amount=1, **labels):
+        if amount:
+            self.registry._add_counter(self.name, _labels_key(labels), amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        self.registry._observe(self, _labels_key(labels), value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        # {name: {labels_key: value}}; histograms hold [per-bucket counts..., sum, count].
+        self.values = {}
+        self.last_flush = time.monotonic()
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / '.cache' / 'metrics'))
+
+    def counter(self, name, documentation):
+        return self._register(Counter(self, name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, buckets))
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _add_counter(self, name, key, amount):
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+        self._maybe_flush()
+
+    def _observe(self, histogram, key, value):
+        with self.lock:
+            series = self.values.setdefault(histogram.name, {})
+            row = series.get(key)
+            if row is None:
+                row = series[key] = [0] * (len(histogram.buckets) + 2)
+            for i, bound in enumerate(histogram.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot where other workers can read it."""
+        # Forked after import (gunicorn --preload): write under our own pid.
+        self.pid = os.getpid()
+        with self.lock:
+            snapshot = json.dumps(self.values)
+            self.last_flush = time.monotonic()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f'{self.pid}.json'
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(snapshot)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def collect(self):
+        """Every worker's values added together: {name: {labels_key: value}}."""
+        self.flush()
+        merged = {}
+        now = time.time()
+        try:
+            paths = list(self.directory.glob('*.json'))
+        except OSError:
+            paths = []
+        for path in paths:
+            try:
+                if now - path.stat().st_mtime > STALE_AFTER:
+                    path.unlink()
+                    continue
+                values = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, series in values.items():
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    if isinstance(value, list):
+                        current = target.setdefault(key, [0] * len(value))
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+    def render(self, extra_gauges=()):
+        lines = []
+        merged = self.collect()
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged.get(name, {}).items()):
+                pairs = json.loads(key)
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_format_labels(pairs)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value[:-2]):
+                    cumulative += count
+                    le = pairs + [['le', _format_value(bound)]]
+                    lines.append(f'{name}_bucket{_format_labels(le)} {cumulative}')
+                le = pairs + [['le', '+Inf']]
+                lines.append(f'{name}_bucket{_format_labels(le)} {value[-1]}')
+                lines.append(f'{name}_sum{_format_labels(pairs)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(pairs)} {value[-1]}')
+        for name, documentation, samples in extra_gauges:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+REQUESTS = registry.counter(
+    'swd_http_requests_total', 'HTTP responses by route, method and status code.')
+REQUEST_LATENCY = registry.histogram(
+    'swd_http_request_duration_seconds', 'Time to produce a response, by route.')
+RATELIMITED = registry.counter(
+    'swd_ratelimited_requests_total', 'Requests over a view ratelimit, by route.')
+IMAGE_PROCESSING = registry.histogram(
+    'swd_image_processing_seconds', 'Time to resize and re-encode one uploaded image.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+CACHE_REQUESTS = registry.counter(
+    'swd_cache_requests_total', 'Application cache lookups by cache and result (hit/miss).')
+
+
+def _ingest_gauges():
+    from core.analytics.ingest import pending_bytes
+    lag = pending_bytes()
+    return [
+        ('swd_ingest_lag_bytes', 'Access log bytes not yet ingested into PageView, by file.',
+         [({'file': name}, size) for name, size in sorted(lag.items())]),
+    ]
+
+
+def metrics_view(request):
+    """Text exposition for Prometheus. Staff sessions, or `Authorization:
+    Bearer <METRICS_TOKEN>` for the scraper."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    has_token = bool(token) and constant_time_compare(auth, f'Bearer {token}')
+    user = getattr(request, 'user', None)
+    if not has_token and not (user and user.is_active and user.is_staff):
+        return HttpResponseForbidden('Forbidden')
+    body = registry.render(extra_gauges=_ingest_gauges())
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,19 +1,78 @@
+import abc
 import logging
+import random
 import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import acompress_sequence, compress_sequence, compress_string
 from user_agents import parse
 
+from . import metrics, profiling
+
+try:
+    import brotli
+except ImportError:  # a declared dependency; without it responses are only gzipped
+    brotli = None
+
 logger = logging.getLogger('core.access')
 
+DEFAULT_COMPRESSION_CONTENT_TYPES = (
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+    'image/svg+xml',
+)
+
+
+class HybridMiddleware(abc.ABC):
+    """Base for middleware that runs natively in both WSGI and ASGI stacks.
+
+    Django wraps sync-only middleware in a thread under ASGI, which would
+    put every async view behind a thread handoff; these call `__acall__`
+    instead when the rest of the stack is async.
+    """
+    sync_capable = True
+    async_capable = True
 
-class AccessLogMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    @abc.abstractmethod
+    def handle(self, request):
+        """Process `request` under WSGI (or a sync stack)."""
+
+    @abc.abstractmethod
+    async def __acall__(self, request):
+        """Process `request` under ASGI."""
 
+
+class AccessLogMiddleware(HybridMiddleware):
+    def handle(self, request):
+        response = self.get_response(request)
         # Grab cheap session data synchronously before the thread
-        user_data = request.session.get('user_data') or {}
+        self._spawn(request, response, request.session.get('user_data'))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self._spawn(request, response, await request.session.aget('user_data'))
+        return response
+
+    def _spawn(self, request, response, user_data):
+        user_data = user_data or {}
         email = user_data.get('email', '')
         name = user_data.get('name', '')
         method = request.method
@@ -28,8 +87,6 @@ class AccessLogMiddleware:
             daemon=True,
         ).start()
 
-        return response
-
     @staticmethod
     def _get_client_ip(request):
         return (
@@ -68,3 +125,199 @@ class AccessLogMiddleware:
             pass
         finally:
             django.db.connection.close()
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """Profile a random sample of requests per route (see core.profiling).
+
+    Unsampled requests cost one random() call. Goes first in MIDDLEWARE so
+    the latency covers the whole middleware stack.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if self.sample_rate:
+            profiling.install_query_counter()
+            profiling.install_template_timer()
+
+    def handle(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile, token = profiling.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiling.stop(token)
+        self._record(request, response, started, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile, token = profiling.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiling.stop(token)
+        self._record(request, response, started, profile)
+        return response
+
+    @staticmethod
+    def _record(request, response, started, profile):
+        total_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        route = match.view_name if match else '<unresolved>'
+        profiling.recorder.record(route, request.method, response.status_code, total_ms, profile)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Count responses and time them per route into core.metrics."""
+    def handle(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _record(request, response, elapsed):
+        match = request.resolver_match
+        route = match.view_name if match else '<unresolved>'
+        metrics.REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        metrics.REQUEST_LATENCY.observe(elapsed, route=route)
+        # django_ratelimit flags the request; views then answer 429 themselves.
+        if getattr(request, 'limited', False):
+            metrics.RATELIMITED.inc(route=route)
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Compress text responses with brotli or gzip, whichever the client prefers.
+
+    Only content types in COMPRESSION_CONTENT_TYPES are touched, and buffered
+    responses shorter than COMPRESSION_MIN_SIZE are sent as-is. Streaming
+    responses are compressed chunk by chunk and flushed after every chunk, so
+    the browser still receives the top of the page early.
+
+    gzip output gets Django's random-length header padding (BREACH
+    mitigation); brotli has no equivalent, so BROTLI_RESPONSES can turn it
+    off without uninstalling the package.
+    """
+    gzip_max_random_bytes = 100
+    brotli_quality = 5  # levels above ~6 cost far more CPU than they save on dynamic pages
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 512)
+        self.content_types = tuple(
+            getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_COMPRESSION_CONTENT_TYPES)
+        )
+        self.brotli = brotli is not None and getattr(settings, 'BROTLI_RESPONSES', True)
+        if brotli is None and getattr(settings, 'BROTLI_RESPONSES', True):
+            logging.getLogger(__name__).warning(
+                "BROTLI_RESPONSES is on but the brotli package is not installed; "
+                "responses will only be gzipped."
+            )
+
+    def handle(self, request):
+        return self._process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._process(request, await self.get_response(request))
+
+    def _process(self, request, response):
+        if not self._compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self._negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if not encoding:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._acompress_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = self._compress_stream(response.streaming_content, encoding)
+            # The compressed length isn't known until the stream ends.
+            del response.headers['Content-Length']
+        else:
+            compressed = self._compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # A strong ETag no longer matches the bytes on the wire (RFC 9110 8.8.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types:
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def _negotiate(self, accept_encoding):
+        """Pick 'br' or 'gzip' from an Accept-Encoding header, or None."""
+        weights = {}
+        for part in accept_encoding.split(','):
+            name, _, params = part.strip().partition(';')
+            q = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            weights[name.strip().lower()] = q
+        wildcard = weights.get('*', 0.0)
+        candidates = ['br', 'gzip'] if self.brotli else ['gzip']
+        best = None
+        best_q = 0.0
+        for name in candidates:
+            q = weights.get(name, wildcard)
+            if q > best_q:
+                best, best_q = name, q
+        return best
+
+    def _compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return compress_string(content, max_random_bytes=self.gzip_max_random_bytes)
+
+    def _compress_stream(self, chunks, encoding):
+        if encoding == 'gzip':
+            yield from compress_sequence(chunks, max_random_bytes=self.gzip_max_random_bytes)
+            return
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    async def _acompress_stream(self, chunks, encoding):
+        if encoding == 'gzip':
+            async for data in acompress_sequence(chunks, max_random_bytes=self.gzip_max_random_bytes):
+                yield data
+            return
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+        async for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -164,11 +164,45 @@ class Reaction(models.Model):
 
     class Meta:
         unique_together = ('item', 'person')
+        indexes = [
+            # Covers the per item × emoji count/latest aggregation on feeds.
+            models.Index(fields=['item', 'reaction_type', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.person} {self.reaction_type} → {self.item}"
 
 
+class ItemNeighbours(models.Model):
+    """Precomputed "similar items" for an item, best match first.
+
+    Written by `manage.py compute_similar_items` (see core.similarity).
+    """
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, primary_key=True, related_name='neighbours')
+    neighbour_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.item_id} → {self.neighbour_ids}"
+
+
+class SearchTerm(models.Model):
+    """One distinct word of the item, category and hostel names, and where
+    it appears.
+
+    Kept current on save by core.search. Item and category ids are packed
+    as sorted 32-bit integers (array('I')), four bytes per posting.
+    """
+    term = models.CharField(max_length=100, unique=True)
+    item_ids = models.BinaryField(default=b'')
+    category_ids = models.BinaryField(default=b'')
+    hostels = models.JSONField(default=list)  # Hostel keys are their names
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.term
+
+
 class PageView(models.Model):
     timestamp = models.DateTimeField(db_index=True)
     status = models.PositiveSmallIntegerField()
@@ -196,6 +230,58 @@ class PageView(models.Model):
         return f"{self.timestamp} {self.method} {self.path}"
 
 
+class PageViewRollup(models.Model):
+    """Per-day page view counts that outlive the raw PageView rows.
+
+    Written by `manage.py archive_pageviews` (see core.analytics.retention)
+    just before a day's rows are archived and deleted. One row per day,
+    dimension (campus, path, status, ...) and value; dimension 'total' has a
+    single row per day with value ''.
+    """
+    day = models.DateField()
+    dimension = models.CharField(max_length=16)
+    value = models.CharField(max_length=500, blank=True)
+    views = models.IntegerField(default=0)
+    authed = models.IntegerField(default=0)
+    uniques = models.IntegerField(default=0)  # distinct signed-in emails that day
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'dimension', 'value'], name='pageview_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.value}: {self.views}"
+
+
+class UniqueSketch(models.Model):
+    """HyperLogLog sketch of the distinct emails or IPs seen on one day,
+    overall (dimension 'total', value ''), per campus or per path.
+
+    Updated as access logs are ingested (see core.analytics.sketches) and
+    kept after the raw rows are archived, so unique counts work for any range.
+    """
+    day = models.DateField()
+    dimension = models.CharField(max_length=16)
+    value = models.CharField(max_length=500, blank=True)
+    kind = models.CharField(max_length=8)  # 'email' or 'ip'
+    registers = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'dimension', 'value', 'kind'], name='unique_sketch_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'kind', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.value} ({self.kind})"
+
+
 class LogIngestState(models.Model):
     signature = models.CharField(max_length=64, primary_key=True)
     filename = models.CharField(max_length=128)
@@ -0,0 +1,103 @@
+"""Google sign-in over an async HTTP client.
+
+The sign-in views spend most of their time waiting on Google: the token
+exchange, the signing certificates and the profile picture. Doing that with
+httpx inside async views means a slow round trip holds a coroutine rather
+than a whole worker when served by ASGI.
+
+The certificates are the same for every sign-in and Google says how long
+they may be cached, so they are kept in Django's cache for that long and
+only refetched when a token names a key we don't have (Google rotated).
+"""
+import base64
+import functools
+import json
+import re
+import ssl
+
+import certifi
+import httpx
+from django.core.cache import cache
+from google.auth import jwt
+
+TOKEN_URL = 'https://oauth2.googleapis.com/token'
+CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+CERTS_KEY = 'google-oauth-certs'
+CERTS_DEFAULT_TIMEOUT = 60 * 60
+
+TOKEN_TIMEOUT = 10
+AVATAR_TIMEOUT = 5
+
+
+@functools.cache
+def _ssl_context():
+    # Loading the CA bundle takes ~30ms of CPU, which AsyncClient would
+    # otherwise spend on the event loop for every sign-in.
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def client(**kwargs):
+    """An AsyncClient for one view; use it as `async with oauth.client() as c:`."""
+    kwargs.setdefault('timeout', TOKEN_TIMEOUT)
+    kwargs.setdefault('verify', _ssl_context())
+    return httpx.AsyncClient(**kwargs)
+
+
+async def exchange_code(http, code, client_id, client_secret, redirect_uri):
+    """Trade an authorization code for the ID token string."""
+    resp = await http.post(TOKEN_URL, data={
+        'code': code,
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'redirect_uri': redirect_uri,
+        'grant_type': 'authorization_code',
+    })
+    token_json = resp.json()
+    id_token_str = token_json.get('id_token')
+    if not id_token_str:
+        raise ValueError(
+            token_json.get('error_description') or token_json.get('error') or 'No id_token in response'
+        )
+    return id_token_str
+
+
+async def _certs(http, refresh=False):
+    certs = None if refresh else await cache.aget(CERTS_KEY)
+    if certs is None:
+        resp = await http.get(CERTS_URL)
+        resp.raise_for_status()
+        certs = resp.json()
+        match = re.search(r'max-age=(\d+)', resp.headers.get('cache-control', ''))
+        await cache.aset(CERTS_KEY, certs, int(match.group(1)) if match else CERTS_DEFAULT_TIMEOUT)
+    return certs
+
+
+def _key_id(token):
+    try:
+        header = token.split('.')[0]
+        return json.loads(base64.urlsafe_b64decode(header + '=' * (-len(header) % 4))).get('kid')
+    except (ValueError, AttributeError):
+        return None
+
+
+async def verify_id_token(http, token, audience, clock_skew_in_seconds=10):
+    """Decode and check a Google ID token, as google.oauth2.id_token's
+    verify_oauth2_token does. Raises ValueError if it isn't valid."""
+    certs = await _certs(http)
+    if _key_id(token) not in certs:
+        # Signed with a key published after we cached the certs.
+        certs = await _certs(http, refresh=True)
+    claims = jwt.decode(token, certs=certs, audience=audience, clock_skew_in_seconds=clock_skew_in_seconds)
+    if claims.get('iss') not in ISSUERS:
+        raise ValueError(f"Wrong issuer {claims.get('iss')!r}")
+    return claims
+
+
+async def fetch_avatar(http, url):
+    """The picture's bytes, or None if it couldn't be downloaded."""
+    try:
+        resp = await http.get(url, timeout=AVATAR_TIMEOUT)
+    except httpx.HTTPError:
+        return None
+    return resp.content if resp.status_code == 200 else None
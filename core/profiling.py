@@ -0,0 +1,194 @@
+"""Sampled per-route request profiling, kept in memory per worker process.
+
+ProfilingMiddleware (core.middleware) profiles a random PROFILING_SAMPLE_RATE
+share of requests: SQL query count and time, template render time and total
+latency. Each sample goes into a ring buffer and into running per-route
+totals, which staff can see at /admin/profiling/.
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+from django.utils import timezone
+
+RING_SIZE = 2000
+
+_current = contextvars.ContextVar('core_profile', default=None)
+
+
+class Profile:
+    __slots__ = ('queries', 'db_ms', 'render_ms', 'render_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.render_ms = 0.0
+        self.render_depth = 0
+
+
+def start():
+    """Begin profiling the current request; returns (profile, token)."""
+    profile = Profile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def count_queries(execute, sql, params, many, context):
+    """connection.execute_wrapper hook adding each query to the active profile."""
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_ms += (time.perf_counter() - started) * 1000
+
+
+def _timed_render(render_fn):
+    @functools.wraps(render_fn)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return render_fn(self, *args, **kwargs)
+        # Only the outermost render is timed, so cards rendered inside a
+        # page aren't counted twice.
+        profile.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return render_fn(self, *args, **kwargs)
+        finally:
+            profile.render_depth -= 1
+            if profile.render_depth == 0:
+                profile.render_ms += (time.perf_counter() - started) * 1000
+    wrapper._profiled = True
+    return wrapper
+
+
+def _add_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def install_query_counter():
+    """Count queries on every database connection into the active profile.
+
+    Installed per connection rather than around the request, because under
+    ASGI an async view's queries run on other threads' connections; the
+    profile follows them there as a context variable.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+    connection_created.connect(_add_query_counter, dispatch_uid='core.profiling.count_queries')
+    for conn in connections.all(initialized_only=True):
+        _add_query_counter(None, conn)
+
+
+def install_template_timer():
+    """Time Django template renders (render(), render_to_string(), get_template().render())."""
+    from django.template.backends.django import Template
+    if not getattr(Template.render, '_profiled', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Recorder:
+    def __init__(self, size=RING_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = deque(maxlen=self.size)
+            self.routes = {}
+            self.since = timezone.now()
+
+    def record(self, route, method, status, total_ms, profile):
+        sample = {
+            'at': timezone.now(),
+            'route': route,
+            'method': method,
+            'status': status,
+            'total_ms': total_ms,
+            'db_ms': profile.db_ms,
+            'render_ms': profile.render_ms,
+            'queries': profile.queries,
+        }
+        with self.lock:
+            self.samples.append(sample)
+            agg = self.routes.get(route)
+            if agg is None:
+                agg = self.routes[route] = {
+                    'route': route, 'count': 0, 'errors': 0,
+                    'total_ms': 0.0, 'db_ms': 0.0, 'render_ms': 0.0,
+                    'queries': 0, 'max_ms': 0.0, 'max_queries': 0,
+                }
+            agg['count'] += 1
+            agg['errors'] += status >= 500
+            agg['total_ms'] += total_ms
+            agg['db_ms'] += profile.db_ms
+            agg['render_ms'] += profile.render_ms
+            agg['queries'] += profile.queries
+            agg['max_ms'] = max(agg['max_ms'], total_ms)
+            agg['max_queries'] = max(agg['max_queries'], profile.queries)
+
+    def summary(self):
+        """Per-route averages (all samples) and percentiles (samples still in the ring)."""
+        with self.lock:
+            routes = [dict(agg) for agg in self.routes.values()]
+            samples = list(self.samples)
+        recent = {}
+        for sample in samples:
+            recent.setdefault(sample['route'], []).append(sample['total_ms'])
+        for row in routes:
+            n = row['count']
+            latencies = sorted(recent.get(row['route'], ()))
+            row.update({
+                'avg_ms': row['total_ms'] / n,
+                'avg_db_ms': row['db_ms'] / n,
+                'avg_render_ms': row['render_ms'] / n,
+                'avg_queries': row['queries'] / n,
+                'p50_ms': _percentile(latencies, 0.50),
+                'p95_ms': _percentile(latencies, 0.95),
+            })
+        # Where the time goes: routes that cost the most in total come first.
+        routes.sort(key=lambda r: r['total_ms'], reverse=True)
+        return routes, samples
+
+
+recorder = Recorder()
+
+
+@staff_member_required
+def profiling_view(request):
+    if request.method == 'POST':
+        recorder.reset()
+        return redirect(request.path)
+    routes, samples = recorder.summary()
+    slowest = sorted(samples, key=lambda s: s['total_ms'], reverse=True)[:25]
+    return render(request, 'admin/profiling.html', {
+        'title': 'Request profile',
+        'routes': routes,
+        'slowest': slowest,
+        'sample_count': len(samples),
+        'ring_size': recorder.size,
+        'since': recorder.since,
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0),
+        'pid': os.getpid(),
+    })
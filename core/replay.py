@@ -0,0 +1,199 @@
+"""Replay recorded traffic from the access logs against a running server.
+
+core.loadtest hammers a fixed list of URLs; this plays back what visitors
+actually did. Log lines are grouped into visits (one person, or one
+anonymous ip + browser, until they go quiet for SESSION_IDLE) and every
+visit is replayed on its own cookie jar at its original pace: the first
+request at the moment it was logged, relative to the start of the replay,
+and each later one after the same pause the visitor took. `speed`
+compresses the clock, and `max_gap` squeezes out long quiet stretches
+(nights, holidays) so a month of logs doesn't take a month at any speed.
+
+Signed-in visitors are signed in as themselves through the DEBUG-only
+/debug-sign-in page (which creates any Person the local database lacks).
+Only GETs are replayed: the log doesn't record request bodies, and
+replaying sign-out, admin or POST requests would change state rather
+than load pages.
+
+    visits = replay.read_visits(since=..., until=..., max_gap=60)
+    report = asyncio.run(replay.replay('http://127.0.0.1:8000', visits, speed=10))
+"""
+import asyncio
+import time
+from datetime import timedelta
+
+import httpx
+
+from . import loadtest
+from .analytics.ingest import LOGS_DIR
+from .analytics.parser import parse_line
+
+SESSION_IDLE = timedelta(minutes=30)
+REPLAY_METHODS = ('GET', 'HEAD')
+SKIP_PREFIXES = ('/admin/', '/sign-in', '/sign-out', '/auth-receiver', '/debug-sign-in')
+SIGN_IN_ROUTE = 'POST /debug-sign-in'
+
+
+class Visit:
+    """One visitor's requests as (seconds into the replay, method, path)."""
+
+    __slots__ = ('email', 'name', 'requests', 'last_seen')
+
+    def __init__(self, email, name):
+        self.email = email
+        self.name = name
+        self.requests = []
+        self.last_seen = None
+
+    @property
+    def start(self):
+        return self.requests[0][0]
+
+
+def _visitor(parsed):
+    return parsed['email'] or f"{parsed['ip']}|{parsed['browser']}|{parsed['os']}|{parsed['device']}"
+
+
+def read_log_lines(logs_dir=None, since=None, until=None):
+    """Access log lines in [since, until), oldest first, as
+    (timestamp, method, path, email, name, visitor) tuples.
+
+    Only what a replay needs is kept; a full set of rotated logs is a few
+    hundred thousand lines.
+    """
+    lines = []
+    for path in sorted((logs_dir or LOGS_DIR).glob('access.log*')):
+        if not path.is_file():
+            continue
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for raw in f:
+                parsed = parse_line(raw)
+                if not parsed:
+                    continue
+                ts = parsed['timestamp']
+                if (since and ts < since) or (until and ts >= until):
+                    continue
+                lines.append((ts, parsed['method'], parsed['path'], parsed['email'], parsed['name'], _visitor(parsed)))
+    # Rotated files sort after access.log, and log writer threads can finish
+    # a little out of order.
+    lines.sort(key=lambda line: line[0])
+    return lines
+
+
+def build_visits(lines, max_gap=None, limit=None):
+    """Group read_log_lines() output into visits, oldest first.
+
+    Returns (visits, skipped), where `skipped` counts lines that are not
+    replayed (POSTs, sign-in and admin pages). With `max_gap` (seconds),
+    no two consecutive requests in the whole log are scheduled further
+    apart than that. `limit` stops after that many replayable requests.
+    """
+    open_visits = {}
+    visits = []
+    skipped = 0
+    clock = 0.0
+    previous = None
+    replayed = 0
+    for ts, method, path, email, name, visitor in lines:
+        if method not in REPLAY_METHODS or path.startswith(SKIP_PREFIXES):
+            skipped += 1
+            continue
+        if limit is not None and replayed >= limit:
+            break
+        if previous is not None:
+            gap = (ts - previous).total_seconds()
+            clock += min(gap, max_gap) if max_gap is not None else gap
+        previous = ts
+
+        visit = open_visits.get(visitor)
+        if visit is None or ts - visit.last_seen > SESSION_IDLE:
+            visit = open_visits[visitor] = Visit(email, name)
+            visits.append(visit)
+        visit.requests.append((clock, method, path))
+        visit.last_seen = ts
+        replayed += 1
+    return visits, skipped
+
+
+def read_visits(logs_dir=None, since=None, until=None, max_gap=None, limit=None):
+    return build_visits(read_log_lines(logs_dir, since, until), max_gap=max_gap, limit=limit)
+
+
+async def _sign_in(http, stats, visit, sessions):
+    """Reuse the visitor's session from an earlier visit, or sign in."""
+    cookie = sessions.get(visit.email)
+    if cookie:
+        http.cookies.set('sessionid', cookie)
+        return
+    started = time.perf_counter()
+    try:
+        await loadtest.sign_in(http, visit.email, visit.name)
+    except (RuntimeError, httpx.HTTPError):
+        # Carry on anonymously; the failure shows up in the report.
+        stats.add(SIGN_IN_ROUTE, time.perf_counter() - started, None)
+        return
+    stats.add(SIGN_IN_ROUTE, time.perf_counter() - started, 302)
+    sessions[visit.email] = http.cookies.get('sessionid')
+
+
+async def replay(base_url, visits, speed=1.0, max_visits=200):
+    """Play `visits` back against `base_url`, `speed` times faster than logged.
+
+    At most `max_visits` visits are in progress at once. Requests go out on
+    schedule unless the visitor's previous response hasn't arrived yet (or
+    the visit is waiting for a free slot); how late they went out is
+    reported as the schedule lag, and a large lag means the server (or this
+    machine) could not keep up with the recorded rate.
+
+    Returns (Stats.report() plus an overall '*' row, summary dict).
+    """
+    stats = loadtest.Stats()
+    lag = []
+    sessions = {}
+    slots = asyncio.Semaphore(max_visits)
+    loop = asyncio.get_running_loop()
+
+    async with loadtest.client(base_url, 1) as http:
+        try:
+            probe = await http.get('/debug-sign-in')
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Can't reach {base_url}: {e}") from None
+    if probe.status_code != 200 and any(visit.email for visit in visits):
+        raise RuntimeError(
+            f"/debug-sign-in answered {probe.status_code}; replaying signed-in visits "
+            "needs the server running with DEBUG=True."
+        )
+
+    async def play(visit):
+        await asyncio.sleep(max(begin + visit.start / speed - loop.time(), 0))
+        async with slots:
+            async with loadtest.client(base_url, 1) as http:
+                if visit.email:
+                    await _sign_in(http, stats, visit, sessions)
+                for at, method, path in visit.requests:
+                    delay = begin + at / speed - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    lag.append(max(-delay, 0))
+                    await loadtest.timed_request(http, stats, method, path)
+
+    begin = loop.time()
+    stats.started = time.perf_counter()
+    await asyncio.gather(*(play(visit) for visit in visits))
+    stats.finish()
+
+    lag.sort()
+    summary = {
+        'visits': len(visits),
+        'signed_in_visitors': len({visit.email for visit in visits if visit.email}),
+        'requests': len(lag),
+        'recorded_seconds': round(max((v.requests[-1][0] for v in visits), default=0), 1),
+        'elapsed_seconds': round(stats.elapsed, 1),
+        'lag_p50_ms': round(loadtest.percentile(lag, 0.50) * 1000, 1),
+        'lag_p99_ms': round(loadtest.percentile(lag, 0.99) * 1000, 1),
+        'lag_max_ms': round(lag[-1] * 1000, 1) if lag else 0.0,
+    }
+    rows = stats.report()
+    if rows:
+        rows.append(loadtest.overall(stats))
+    return rows, summary
@@ -0,0 +1,472 @@
+"""Typo-tolerant search over item, category and hostel names.
+
+The index is a dictionary of the distinct words in those names (SearchTerm
+rows), each listing the items, categories and hostels it appears in.
+Signals keep it current: saving an item rewrites only the rows for words
+its name gained or lost, which for most saves (mark sold, repost) is none.
+Rows are never deleted, only emptied, so every change reaches the other
+processes through SearchTerm.updated_at.
+
+Each process holds the dictionary in memory with a trigram index over it:
+every word is padded as "  word " and cut into three-character pieces, the
+way PostgreSQL's pg_trgm does, and each trigram maps to an array of the
+words containing it. A cache counter bumped on every index write tells
+processes to pull the rows changed since they last looked, so a lookup
+costs one cache read when nothing has changed.
+
+A query word matches dictionary words it equals, words it is a prefix of,
+and words sharing enough trigrams with it. Trigram candidates are scored
+by trigram overlap (Dice coefficient) averaged with an edit-distance
+similarity, which separates "cylce" → "cycle" from "cylce" → "cyber"
+where the trigrams alone tie. An item's relevance is the mean, over the
+query words, of its best-matching word.
+
+`manage.py rebuild_search_index` rewrites the whole index, for rows
+written without signals (bulk_create, seeding, raw SQL).
+"""
+import bisect
+import heapq
+import re
+import threading
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import caching
+from .models import Category, Hostel, Item, SearchTerm
+
+WORD_RE = re.compile(r'\w+')
+MAX_WORD_LENGTH = 100
+MAX_QUERY_WORDS = 8
+
+# Shorter words only match exactly: two letters share too few trigrams
+# with anything to tell a typo from a different word.
+FUZZY_MIN_LENGTH = 3
+MIN_TRIGRAM_SIMILARITY = 0.3
+MIN_WORD_SCORE = 0.45
+# A word the query word is a prefix of scores between this and 1, by how
+# much of it was typed.
+PREFIX_SCORE = 0.6
+MAX_PREFIX_WORDS = 500
+MIN_RELEVANCE = 0.4
+MAX_ITEMS = 500
+SUGGESTIONS = 8
+
+# A row written just before a sync started may commit just after it.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def words(text):
+    """The indexed words of a name or query: casefolded runs of letters and
+    digits, at least two long."""
+    return [w[:MAX_WORD_LENGTH] for w in WORD_RE.findall((text or '').casefold()) if len(w) > 1]
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_similarity(a, b):
+    """1 - (optimal string alignment distance / longer length): a wrong,
+    missing, extra or swapped character costs one edit."""
+    if a == b:
+        return 1.0
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], before[j - 2] + 1)
+        before, previous = previous, current
+    return 1 - previous[-1] / max(len(a), len(b))
+
+
+def _pack(ids):
+    return array('I', sorted(ids)).tobytes()
+
+
+def _unpack(blob):
+    ids = array('I')
+    ids.frombytes(bytes(blob))
+    return ids
+
+
+# ── Writing ──────────────────────────────────────────────────────────────────
+
+# The SearchTerm field each kind of name is posted under.
+FIELDS = {'item': 'item_ids', 'category': 'category_ids', 'hostel': 'hostels'}
+
+
+def _postings(row, field):
+    return set(row.hostels) if field == 'hostels' else set(_unpack(getattr(row, field)))
+
+
+def _set_postings(row, field, postings):
+    if field == 'hostels':
+        row.hostels = sorted(postings)
+    else:
+        setattr(row, field, _pack(postings))
+
+
+# Writes held back by deferred(): {field: {(word, key): posted}}.
+_pending = threading.local()
+
+
+def _write(field, added, removed):
+    """Apply {word: keys} additions and removals to one SearchTerm field."""
+    pending = getattr(_pending, 'changes', None)
+    if pending is not None:
+        for word, keys in removed.items():
+            pending[field].update(((word, key), False) for key in keys)
+        for word, keys in added.items():
+            pending[field].update(((word, key), True) for key in keys)
+        return
+    touched = set(added) | set(removed)
+    if not touched:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        # Writing before reading takes SQLite's write lock up front, so two
+        # saves can't both read a row and each drop the other's change.
+        SearchTerm.objects.filter(term__in=touched).update(updated_at=now)
+        rows = {row.term: row for row in SearchTerm.objects.select_for_update().filter(term__in=touched)}
+        created = []
+        for word in touched:
+            row = rows.get(word)
+            if row is None:
+                if word not in added:
+                    continue
+                row = SearchTerm(term=word)
+                created.append(row)
+            postings = _postings(row, field)
+            postings |= added.get(word, set())
+            postings -= removed.get(word, set())
+            _set_postings(row, field, postings)
+            row.updated_at = now
+        SearchTerm.objects.bulk_create(created)
+        SearchTerm.objects.bulk_update(rows.values(), [field, 'updated_at'], batch_size=500)
+        transaction.on_commit(caching.bump_search_version)
+
+
+@contextmanager
+def deferred():
+    """Hold the index writes made inside the block and apply them together
+    when it exits, for bulk deletes where cascades would otherwise write
+    once per item. Nothing is written if the block raises."""
+    if getattr(_pending, 'changes', None) is not None:
+        yield
+        return
+    _pending.changes = changes = defaultdict(dict)
+    try:
+        yield
+    finally:
+        _pending.changes = None
+    for field, postings in changes.items():
+        added, removed = defaultdict(set), defaultdict(set)
+        for (word, key), posted in postings.items():
+            (added if posted else removed)[word].add(key)
+        _write(field, added, removed)
+
+
+def update(kind, key, old_name, new_name):
+    """Move an item, category or hostel from the words of `old_name` to the
+    words of `new_name`. '' stands for not indexed (new, deleted or hidden)."""
+    old, new = set(words(old_name)), set(words(new_name))
+    if old == new:
+        return
+    _write(FIELDS[kind], {word: {key} for word in new}, {word: {key} for word in old - new})
+
+
+def item_name(item):
+    """The name an item is searchable by: none once it is deleted."""
+    return '' if item.is_deleted else item.name
+
+
+def indexed_name(model, pk):
+    """The name the `model` row `pk` is indexed under in the database now."""
+    if pk is None:
+        return ''
+    if model is Item:
+        row = Item.objects.filter(pk=pk).values('name', 'is_deleted').first()
+        return '' if row is None or row['is_deleted'] else row['name']
+    return model.objects.filter(pk=pk).values_list('name', flat=True).first() or ''
+
+
+def reindex_items(item_ids):
+    """Re-file items whose is_deleted was changed with queryset.update(),
+    which sends no post_save."""
+    added, removed = defaultdict(set), defaultdict(set)
+    for item_id, name, is_deleted in Item.objects.filter(id__in=list(item_ids)).values_list('id', 'name', 'is_deleted'):
+        for word in words(name):
+            (removed if is_deleted else added)[word].add(item_id)
+    _write('item_ids', added, removed)
+
+
+def rebuild():
+    """Rewrite every SearchTerm row from the names in the database; returns
+    the number of words with at least one posting."""
+    postings = defaultdict(lambda: (set(), set(), set()))
+    for item_id, name in Item.objects.filter(is_deleted=False).values_list('id', 'name').iterator():
+        for word in words(name):
+            postings[word][0].add(item_id)
+    for category_id, name in Category.objects.values_list('id', 'name'):
+        for word in words(name):
+            postings[word][1].add(category_id)
+    for name in Hostel.objects.values_list('name', flat=True):
+        for word in words(name):
+            postings[word][2].add(name)
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {row.term: row for row in SearchTerm.objects.all()}
+        created = []
+        for word in set(existing) | set(postings):
+            row = existing.get(word)
+            if row is None:
+                row = SearchTerm(term=word)
+                created.append(row)
+            # Words no name uses any more are emptied, not deleted, so
+            # processes syncing by updated_at see them go.
+            item_ids, category_ids, hostels = postings.get(word, ((), (), ()))
+            row.item_ids, row.category_ids, row.hostels = _pack(item_ids), _pack(category_ids), sorted(hostels)
+            row.updated_at = now
+        SearchTerm.objects.bulk_create(created, batch_size=1000)
+        SearchTerm.objects.bulk_update(
+            existing.values(), ['item_ids', 'category_ids', 'hostels', 'updated_at'], batch_size=500,
+        )
+        transaction.on_commit(caching.bump_search_version)
+    return len(postings)
+
+
+# ── Reading ──────────────────────────────────────────────────────────────────
+
+class _Entry:
+    __slots__ = ('number', 'word', 'trigram_count', 'items', 'categories', 'hostels')
+
+    def __init__(self, number, word, trigram_count):
+        self.number = number
+        self.word = word
+        self.trigram_count = trigram_count
+        self.items = array('I')
+        self.categories = ()
+        self.hostels = ()
+
+
+class Matches:
+    """What a query matched, as {key: relevance} for each kind of name."""
+
+    def __init__(self):
+        self.items = {}
+        self.categories = {}
+        self.hostels = {}
+
+    def __bool__(self):
+        return bool(self.items or self.categories or self.hostels)
+
+    def q(self):
+        """Items matched by their own name, their category or their hostel."""
+        return (
+            Q(id__in=list(self.items))
+            | Q(category_id__in=list(self.categories))
+            | Q(hostel_id__in=list(self.hostels))
+        )
+
+    def relevance(self):
+        """An Item expression for the best of those three relevances (0 if none)."""
+        return Greatest(
+            _case('id', self.items), _case('category_id', self.categories), _case('hostel_id', self.hostels),
+        )
+
+
+def _case(field, scores):
+    # One WHEN per distinct score rather than per row keeps the SQL short.
+    by_score = defaultdict(list)
+    for key, score in scores.items():
+        by_score[score].append(key)
+    return Case(
+        *(When(**{f'{field}__in': keys}, then=Value(score)) for score, keys in by_score.items()),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+class Index:
+    """One process's copy of the dictionary, with its trigram postings and a
+    sorted word list for prefix lookups."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.synced_at = None
+        self.entries = []
+        self.by_word = {}
+        self.trigrams = {}
+        self.sorted_words = []
+        self.category_names = {}
+        self.hostel_names = []
+
+    def refresh(self):
+        """Pull the SearchTerm rows written since the last refresh, if any were."""
+        version, = caching.versions(caching.SEARCH_VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self._sync(version)
+        return self
+
+    def _sync(self, version):
+        started = timezone.now()
+        rows = SearchTerm.objects.all()
+        if self.synced_at is not None:
+            rows = rows.filter(updated_at__gte=self.synced_at - SYNC_OVERLAP)
+        for word, item_ids, category_ids, hostels in rows.values_list(
+            'term', 'item_ids', 'category_ids', 'hostels',
+        ).iterator():
+            entry = self.by_word.get(word) or self._add(word)
+            entry.items = _unpack(item_ids)
+            entry.categories = tuple(_unpack(category_ids))
+            entry.hostels = tuple(hostels)
+        self.category_names = dict(Category.objects.values_list('id', 'name'))
+        self.hostel_names = list(Hostel.objects.values_list('name', flat=True))
+        self.version, self.synced_at = version, started
+
+    def _add(self, word):
+        grams = trigrams(word)
+        entry = _Entry(len(self.entries), word, len(grams))
+        # Lookups run without the lock, so an entry is published to the
+        # structures that lead to it (sorted words, trigrams) only once the
+        # ones they resolve through (entries, by_word) hold it.
+        self.entries.append(entry)
+        self.by_word[word] = entry
+        bisect.insort(self.sorted_words, word)
+        for gram in grams:
+            self.trigrams.setdefault(gram, array('I')).append(entry.number)
+        return entry
+
+    def _prefixed(self, prefix):
+        """Entries for words starting with `prefix`, in alphabetical order."""
+        sorted_words = self.sorted_words
+        start = bisect.bisect_left(sorted_words, prefix)
+        for word in sorted_words[start:start + MAX_PREFIX_WORDS]:
+            if not word.startswith(prefix):
+                break
+            yield self.by_word[word]
+
+    def word_matches(self, word):
+        """{entry: score} for the dictionary words close to `word`, scores in (0, 1]."""
+        matches = {}
+        exact = self.by_word.get(word)
+        if exact is not None:
+            matches[exact] = 1.0
+        if len(word) < FUZZY_MIN_LENGTH:
+            return matches
+        for entry in self._prefixed(word):
+            if entry is not exact:
+                matches[entry] = PREFIX_SCORE + (1 - PREFIX_SCORE) * len(word) / len(entry.word)
+
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            numbers = self.trigrams.get(gram)
+            if numbers is not None:
+                shared.update(numbers)
+        for number, count in shared.items():
+            entry = self.entries[number]
+            dice = 2 * count / (len(grams) + entry.trigram_count)
+            if dice < MIN_TRIGRAM_SIMILARITY or entry in matches:
+                continue
+            score = (dice + _edit_similarity(word, entry.word)) / 2
+            if score >= MIN_WORD_SCORE:
+                matches[entry] = score
+        return matches
+
+    def search(self, query):
+        """Matches for `query`: at most MAX_ITEMS items, best first."""
+        query_words = list(dict.fromkeys(words(query)))[:MAX_QUERY_WORDS]
+        found = Matches()
+        if not query_words:
+            return found
+        n = len(query_words)
+        best = {}
+        for i, word in enumerate(query_words):
+            for entry, score in self.word_matches(word).items():
+                for kind, keys in (('items', entry.items), ('categories', entry.categories), ('hostels', entry.hostels)):
+                    for key in keys:
+                        per_word = best.get((kind, key))
+                        if per_word is None:
+                            per_word = best[(kind, key)] = [0.0] * n
+                        if score > per_word[i]:
+                            per_word[i] = score
+        for (kind, key), per_word in best.items():
+            relevance = sum(per_word) / n
+            if relevance >= MIN_RELEVANCE:
+                getattr(found, kind)[key] = round(relevance, 2)
+        if len(found.items) > MAX_ITEMS:
+            found.items = dict(heapq.nlargest(MAX_ITEMS, found.items.items(), key=itemgetter(1)))
+        return found
+
+    def suggest(self, text, limit=SUGGESTIONS):
+        """Completions for a search box holding `text`, best first.
+
+        Categories and hostels with a word starting with the word being
+        typed come first, then the most-listed dictionary words starting
+        with it, then (for three or more letters) close misspellings. Each
+        is {'text': the whole query to search for, 'kind': ..., ...}.
+        """
+        tokens = WORD_RE.findall(text.casefold())
+        if not tokens or not text[-1:].isalnum() or len(tokens[-1]) < 2:
+            return []
+        typed = tokens[-1][:MAX_WORD_LENGTH]
+        head = ' '.join(tokens[:-1])
+
+        suggestions = [
+            {'text': name, 'kind': 'category', 'id': category_id}
+            for category_id, name in sorted(self.category_names.items(), key=itemgetter(1))
+            if any(word.startswith(typed) for word in words(name))
+        ]
+        suggestions += [
+            {'text': name, 'kind': 'hostel'}
+            for name in sorted(self.hostel_names)
+            if any(word.startswith(typed) for word in words(name))
+        ]
+        suggestions = suggestions[:limit // 2]
+
+        completions = heapq.nlargest(
+            limit - len(suggestions),
+            (entry for entry in self._prefixed(typed) if entry.items),
+            key=lambda entry: len(entry.items),
+        )
+        if len(completions) < limit - len(suggestions) and len(typed) >= FUZZY_MIN_LENGTH:
+            seen = {entry.word for entry in completions}
+            close = sorted(
+                ((score, entry) for entry, score in self.word_matches(typed).items()
+                 if entry.items and entry.word not in seen),
+                key=lambda pair: (-pair[0], -len(pair[1].items)),
+            )
+            completions += [entry for _, entry in close[:limit - len(suggestions) - len(completions)]]
+        suggestions += [
+            {'text': f'{head} {entry.word}'.lstrip(), 'kind': 'word', 'count': len(entry.items)}
+            for entry in completions
+        ]
+        return suggestions
+
+
+index = Index()
+
+
+def search(query):
+    return index.refresh().search(query)
+
+
+def suggest(text, limit=SUGGESTIONS):
+    return index.refresh().suggest(text, limit)
@@ -0,0 +1,185 @@
+"""Synthetic marketplace data for load testing and benchmarks.
+
+Everything is created with bulk_create (so model save() side effects such as
+phone clean-up and WhatsApp links are skipped) and is tagged so `clear()`
+can remove it again: seeded people have SEED_EMAIL_PREFIX emails, and
+items, reactions and images hang off them. Pass an explicit `random.Random`
+for a reproducible dataset.
+"""
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image as PILImage
+
+from . import search
+from .models import Person, Item, Image, Category, Hostel, Campus, Reaction, PageView
+
+SEED_EMAIL_PREFIX = 'seed.'
+SEED_CAMPUSES = [Campus.GOA, Campus.HYDERABAD, Campus.PILANI, Campus.DUBAI]
+PLACEHOLDER_IMAGE = 'images/seed-placeholder.jpg'
+SEED_LOG_NAME = 'access.log.seed'
+
+CATEGORIES = [
+    ('Electronics', 'fas fa-laptop'),
+    ('Books', 'fas fa-book'),
+    ('Cycles', 'fas fa-bicycle'),
+    ('Furniture', 'fas fa-couch'),
+    ('Clothing', 'fas fa-tshirt'),
+    ('Appliances', 'fas fa-blender'),
+    ('Sports', 'fas fa-football-ball'),
+    ('Stationery', 'fas fa-pencil-alt'),
+]
+ITEM_NOUNS = [
+    'laptop', 'charger', 'kettle', 'drafter', 'lab coat', 'cycle', 'mattress',
+    'table lamp', 'calculator', 'headphones', 'monitor', 'chair', 'textbook',
+    'hoodie', 'cricket bat', 'badminton racket', 'extension board', 'cooler',
+    'printer', 'keyboard', 'mouse', 'router', 'guitar', 'shoes', 'backpack',
+]
+ITEM_ADJECTIVES = [
+    'barely used', 'new', 'old', 'working', 'mint', 'second-hand', 'cheap',
+    'branded', 'portable', 'foldable', 'wireless', 'large', 'small',
+]
+EMOJIS = ['👍', '❤️', '😂', '🔥', '😮', '😢']
+USER_AGENTS = [
+    ('Chrome Mobile 124.0.0', 'Android 14', 'Samsung SM-S918B'),
+    ('Chrome 124.0.0', 'Windows 10', 'Other'),
+    ('Mobile Safari 17.4', 'iOS 17.4', 'iPhone'),
+    ('Safari 17.4', 'Mac OS X 10.15.7', 'Mac'),
+    ('Firefox 125.0', 'Ubuntu', 'Other'),
+]
+PATH_WEIGHTS = [
+    ('/', 30), ('/item/{item}', 40), ('/my-listings/', 6), ('/add-product', 4),
+    ('/categories', 3), ('/about', 2), ('/?q={word}', 8), ('/?campus={campus}', 7),
+]
+
+
+def categories():
+    result = []
+    for name, icon in CATEGORIES:
+        category, _ = Category.objects.get_or_create(name=name, defaults={'icon_class': icon})
+        result.append(category)
+    return result
+
+
+def hostels(per_campus=4):
+    result = {}
+    for campus in SEED_CAMPUSES:
+        result[campus] = [
+            Hostel.objects.get_or_create(name=f'Seed Hostel {campus} {n}', defaults={'campus': campus})[0]
+            for n in range(1, per_campus + 1)
+        ]
+    return result
+
+
+def seed_people(count, rng, campus_hostels):
+    # Numbering continues after earlier runs so emails stay unique.
+    start = Person.objects.filter(email__startswith=SEED_EMAIL_PREFIX).count()
+    people = []
+    for i in range(start, start + count):
+        campus = rng.choice(SEED_CAMPUSES)
+        people.append(Person(
+            name=f'Seed Student {i}',
+            email=f'{SEED_EMAIL_PREFIX}{i}@{campus.lower()}.bits-pilani.ac.in',
+            campus=campus,
+            phone=f'+9198{rng.randrange(10 ** 8):08d}',
+            hostel=rng.choice(campus_hostels[campus]),
+        ))
+    return Person.objects.bulk_create(people, batch_size=1000)
+
+
+def seed_items(count, rng, sellers, category_list):
+    now = timezone.now()
+    items = []
+    for _ in range(count):
+        seller = rng.choice(sellers)
+        noun = rng.choice(ITEM_NOUNS)
+        items.append(Item(
+            name=f'{rng.choice(ITEM_ADJECTIVES).capitalize()} {noun}',
+            description=f'Selling my {noun}. DM on WhatsApp.',
+            price=Decimal(rng.choice([50, 100, 150, 250, 400, 800, 1500, 3000, 12000])),
+            seller=seller,
+            category=rng.choice(category_list),
+            hostel_id=seller.hostel_id,
+            phone=seller.phone,
+            is_sold=rng.random() < 0.2,
+            updated_at=now - timedelta(minutes=rng.randrange(60 * 24 * 60)),
+            repost_count=rng.choice([0, 0, 0, 1, 2]),
+        ))
+    return Item.objects.bulk_create(items, batch_size=1000)
+
+
+def placeholder_image():
+    """Storage name of a tiny JPEG every seeded Image row points at."""
+    if not default_storage.exists(PLACEHOLDER_IMAGE):
+        buffer = io.BytesIO()
+        PILImage.new('RGB', (64, 64), (240, 123, 63)).save(buffer, format='JPEG')
+        default_storage.save(PLACEHOLDER_IMAGE, ContentFile(buffer.getvalue()))
+    return PLACEHOLDER_IMAGE
+
+
+def seed_images(items, per_item, rng):
+    name = placeholder_image()
+    images = [
+        Image(item=item, image=name, display_order=order)
+        for item in items
+        for order in range(rng.randint(1, per_item) if per_item else 0)
+    ]
+    return Image.objects.bulk_create(images, batch_size=2000)
+
+
+def seed_reactions(items, people, max_per_item, rng):
+    """Up to `max_per_item` reactions per item from distinct people, skewed so
+    a few items are popular and most have none or one."""
+    reactions = []
+    for item in items:
+        count = min(int(rng.paretovariate(1.5)) - 1, max_per_item, len(people))
+        for person in rng.sample(people, count):
+            reactions.append(Reaction(item=item, person=person, reaction_type=rng.choice(EMOJIS)))
+    return Reaction.objects.bulk_create(reactions, batch_size=5000, ignore_conflicts=True)
+
+
+def access_log_lines(count, rng, people, item_ids, days=30, end=None):
+    """`count` access log lines in AccessLogMiddleware's format, oldest first."""
+    end = end or timezone.localtime()
+    start = end - timedelta(days=days)
+    step = (end - start) / max(count, 1)
+    paths, weights = zip(*PATH_WEIGHTS)
+    for i in range(count):
+        ts = (start + step * i).strftime('%Y-%m-%d %H:%M:%S')
+        path = rng.choices(paths, weights)[0].format(
+            item=rng.choice(item_ids) if item_ids else 1,
+            word=rng.choice(ITEM_NOUNS).replace(' ', '+'),
+            campus=rng.choice(SEED_CAMPUSES),
+        )
+        status = 200 if rng.random() < 0.95 else rng.choice([302, 404, 429, 500])
+        browser, os_name, device = rng.choice(USER_AGENTS)
+        if people and rng.random() < 0.8:
+            person = rng.choice(people)
+            who = f'user="{person.name}" <{person.email}> id={person.id} campus={person.campus}'
+        else:
+            who = 'user="-" <anonymous> id=- campus=-'
+        ip = f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+        yield f'{ts} {status} GET {path} | {who} | {browser} | os={os_name} device={device} | ip={ip}'
+
+
+def write_access_log(path, count, rng, people, item_ids, days=30):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in access_log_lines(count, rng, people, item_ids, days=days):
+            f.write(line + '\n')
+
+
+def clear():
+    """Delete every seeded person and, through cascades, their items,
+    images and reactions, plus page views ingested from the seeded log.
+    Returns the number of people removed."""
+    people = Person.objects.filter(email__startswith=SEED_EMAIL_PREFIX)
+    count = people.count()
+    with search.deferred():
+        people.delete()
+        Hostel.objects.filter(name__startswith='Seed Hostel ').delete()
+    PageView.objects.filter(source_file=SEED_LOG_NAME).delete()
+    return count
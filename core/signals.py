@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import caching, search
+from .models import Category, Hostel, Item, Image, Reaction
+
+
+@receiver([post_save, post_delete], sender=Hostel)
+def hostel_changed(sender, **kwargs):
+    caching.invalidate_hostel_choices()
+    transaction.on_commit(caching.bump_listings_version)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, **kwargs):
+    transaction.on_commit(caching.bump_listings_version)
+
+
+def _invalidate_card_on_commit(item_id):
+    # Deferred so a concurrent render cannot re-cache the pre-commit state.
+    def invalidate():
+        caching.invalidate_item_cards([item_id])
+        caching.bump_listings_version()
+    transaction.on_commit(invalidate)
+
+
+@receiver([post_save, post_delete], sender=Item)
+def item_changed(sender, instance, **kwargs):
+    _invalidate_card_on_commit(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Image)
+def image_changed(sender, instance, **kwargs):
+    _invalidate_card_on_commit(instance.item_id)
+
+
+@receiver([post_save, post_delete], sender=Reaction)
+def reaction_changed(sender, instance, **kwargs):
+    item_id = instance.item_id
+    transaction.on_commit(lambda: caching.bump_reactions_version(item_id))
+
+
+@receiver(post_init, sender=Item)
+@receiver(post_init, sender=Category)
+def remember_indexed_name(sender, instance, **kwargs):
+    # post_save only sees the new name; the words of the loaded one are the
+    # ones to take the row off. Skipped when a field it needs was deferred.
+    loaded = instance.__dict__
+    if 'name' not in loaded or (sender is Item and 'is_deleted' not in loaded):
+        return
+    if instance.pk is None:
+        instance._indexed_name = ''
+    else:
+        instance._indexed_name = search.item_name(instance) if sender is Item else instance.name
+
+
+@receiver(pre_save, sender=Item)
+@receiver(pre_save, sender=Category)
+def lookup_indexed_name(sender, instance, **kwargs):
+    if not hasattr(instance, '_indexed_name'):
+        instance._indexed_name = search.indexed_name(sender, instance.pk)
+
+
+@receiver(post_save, sender=Item)
+def index_item(sender, instance, **kwargs):
+    search.update('item', instance.id, instance._indexed_name, search.item_name(instance))
+    instance._indexed_name = search.item_name(instance)
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item(sender, instance, **kwargs):
+    search.update('item', instance.id, search.item_name(instance), '')
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    search.update('category', instance.id, instance._indexed_name, instance.name)
+    instance._indexed_name = instance.name
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    search.update('category', instance.id, instance.name, '')
+
+
+# A hostel's name is its primary key, so renaming one creates a new row.
+@receiver(post_save, sender=Hostel)
+def index_hostel(sender, instance, created, **kwargs):
+    if created:
+        search.update('hostel', instance.name, '', instance.name)
+
+
+@receiver(post_delete, sender=Hostel)
+def unindex_hostel(sender, instance, **kwargs):
+    search.update('hostel', instance.name, instance.name, '')
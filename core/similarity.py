@@ -0,0 +1,173 @@
+"""Precomputed "similar items" for the item detail page.
+
+compute_neighbours() scores candidate pairs of live items on shared
+category, seller campus, price band, name tokens and co-views (visitors who
+opened both item pages, from PageView.item_id_ref), and stores each item's
+top K in ItemNeighbours. It is a batch job (`manage.py compute_similar_items`,
+run from cron); item_detail only reads one row by primary key.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import Item, ItemNeighbours, PageView
+
+TOP_K = 6
+COVIEW_DAYS = 90
+
+WEIGHTS = {
+    'category': 3.0,
+    'campus': 2.0,
+    'price': 1.0,
+    'name': 3.0,
+    'coview': 4.0,
+}
+# Sold items still show up, but below comparable unsold ones.
+SOLD_PENALTY = 1.5
+
+# Visitors who opened more item pages than this are crawlers or people
+# browsing everything; their views say little about which items go together.
+MAX_VIEWS_PER_VISITOR = 50
+# Tokens on more items than this carry no signal and would make everything
+# a candidate for everything else.
+MAX_TOKEN_ITEMS = 200
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOP_WORDS = {
+    'a', 'an', 'and', 'the', 'for', 'with', 'of', 'in', 'on', 'to',
+    'new', 'used', 'sale', 'selling', 'good', 'condition', 'brand',
+}
+
+
+def _tokens(name):
+    return frozenset(t for t in TOKEN_RE.findall(name.lower()) if len(t) > 1 and t not in STOP_WORDS)
+
+
+def _price_band(price):
+    # Bands double in width (≤50, ≤100, ≤200, ...), so ₹150 and ₹180 share
+    # a band while ₹150 and ₹1500 are several apart.
+    return max(0, math.ceil(math.log2(max(float(price), 1) / 50)))
+
+
+def _coview_scores(live_ids, days):
+    """Cosine co-view similarity, {item_id: {other_id: score}}, from the last `days`."""
+    since = timezone.now() - timedelta(days=days)
+    rows = (
+        PageView.objects
+        .filter(timestamp__gte=since, status=200, item_id_ref__isnull=False)
+        .values_list('person_id_ref', 'ip', 'item_id_ref')
+        .distinct()
+    )
+    visits = defaultdict(set)
+    for person_id, ip, item_id in rows.iterator():
+        if item_id in live_ids:
+            visits[('person', person_id) if person_id else ('ip', ip)].add(item_id)
+
+    views = Counter()
+    pairs = Counter()
+    for seen in visits.values():
+        if len(seen) > MAX_VIEWS_PER_VISITOR:
+            continue
+        views.update(seen)
+        pairs.update(combinations(sorted(seen), 2))
+
+    scores = defaultdict(dict)
+    for (a, b), together in pairs.items():
+        score = together / math.sqrt(views[a] * views[b])
+        scores[a][b] = score
+        scores[b][a] = score
+    return scores
+
+
+def compute_neighbours(k=TOP_K, coview_days=COVIEW_DAYS):
+    """Recompute ItemNeighbours for every live item. Returns the row count.
+
+    Candidates for an item are the items in its category on the same campus,
+    items sharing a name token, and items co-viewed with it; only those are
+    scored, so the job stays well short of all pairs.
+    """
+    items = list(
+        Item.objects.filter(is_deleted=False)
+        .values('id', 'name', 'price', 'is_sold', 'updated_at', 'category_id', 'seller__campus')
+    )
+    by_id = {item['id']: item for item in items}
+    tokens = {item['id']: _tokens(item['name']) for item in items}
+    bands = {item['id']: _price_band(item['price']) for item in items}
+
+    by_group = defaultdict(list)
+    by_token = defaultdict(list)
+    for item in items:
+        by_group[(item['category_id'], item['seller__campus'])].append(item['id'])
+        for token in tokens[item['id']]:
+            by_token[token].append(item['id'])
+
+    coviewed = _coview_scores(set(by_id), coview_days)
+
+    def score(a, b):
+        s = 0.0
+        if a['category_id'] == b['category_id']:
+            s += WEIGHTS['category']
+        if a['seller__campus'] == b['seller__campus']:
+            s += WEIGHTS['campus']
+        gap = abs(bands[a['id']] - bands[b['id']])
+        if gap <= 1:
+            s += WEIGHTS['price'] / (gap + 1)
+        ta, tb = tokens[a['id']], tokens[b['id']]
+        if ta and tb:
+            s += WEIGHTS['name'] * len(ta & tb) / len(ta | tb)
+        s += WEIGHTS['coview'] * coviewed.get(a['id'], {}).get(b['id'], 0.0)
+        if b['is_sold']:
+            s -= SOLD_PENALTY
+        return s
+
+    rows = []
+    for item in items:
+        item_id = item['id']
+        candidates = set(by_group[(item['category_id'], item['seller__campus'])])
+        for token in tokens[item_id]:
+            if len(by_token[token]) <= MAX_TOKEN_ITEMS:
+                candidates.update(by_token[token])
+        candidates.update(coviewed.get(item_id, ()))
+        candidates.discard(item_id)
+
+        best = heapq.nlargest(
+            k,
+            ((score(item, by_id[c]), by_id[c]['updated_at'], c) for c in candidates),
+        )
+        rows.append(ItemNeighbours(item_id=item_id, neighbour_ids=[c for s, _, c in best if s > 0]))
+
+    with transaction.atomic():
+        ItemNeighbours.objects.all().delete()
+        ItemNeighbours.objects.bulk_create(rows, batch_size=500)
+        # Cached item pages embed the old neighbours.
+        transaction.on_commit(caching.bump_listings_version)
+    return len(rows)
+
+
+def similar_items(item, k=TOP_K):
+    """Up to `k` live items similar to `item`, best match first.
+
+    Items listed since the last batch run have no precomputed row yet and
+    get the most recently updated items in their category instead.
+    """
+    neighbour_ids = (
+        ItemNeighbours.objects.filter(item_id=item.id)
+        .values_list('neighbour_ids', flat=True)
+        .first()
+    )
+    items = Item.objects.filter(is_deleted=False).select_related('seller', 'hostel').prefetch_related('images')
+    if neighbour_ids is None:
+        return list(
+            items.filter(category_id=item.category_id)
+            .exclude(id=item.id)
+            .order_by('-updated_at')[:k]
+        )
+    found = items.in_bulk(neighbour_ids[:k])
+    return [found[i] for i in neighbour_ids[:k] if i in found]
@@ -0,0 +1,139 @@
+// SWD Store service worker — generated by core.views.service_worker.
+// VERSION is the static manifest hash, so every deploy that changes a static
+// file installs a fresh worker and drops the previous release's caches.
+var VERSION = '{{ version }}';
+var STATIC_CACHE = 'static-' + VERSION;
+var PAGES_CACHE = 'pages-' + VERSION;
+var MEDIA_CACHE = 'media-v1';
+var CDN_CACHE = 'cdn-v1';
+var KEEP = [STATIC_CACHE, PAGES_CACHE, MEDIA_CACHE, CDN_CACHE];
+
+var PRECACHE = {{ precache_json|safe }};
+// Pages every signed-in user sees alike, kept for offline use. Per-user
+// pages (my listings, edit item, add product, feedback) are never stored.
+var OFFLINE_PAGES = {{ offline_pages_json|safe }};
+var OFFLINE_PAGE_PREFIXES = {{ offline_page_prefixes_json|safe }};
+// Navigating to these means the session is ending or changing hands, so
+// the stored pages (which show the previous user's name and avatar) go.
+var SESSION_PAGES = {{ session_pages_json|safe }};
+var MEDIA_MAX_ENTRIES = {{ media_max_entries }};
+var CDN_HOSTS = [
+  'fonts.googleapis.com',
+  'fonts.gstatic.com',
+  'cdnjs.cloudflare.com',
+];
+
+self.addEventListener('install', function(event) {
+  event.waitUntil(
+    caches.open(STATIC_CACHE)
+      .then(function(cache) { return cache.addAll(PRECACHE); })
+      .then(function() { return self.skipWaiting(); })
+  );
+});
+
+self.addEventListener('activate', function(event) {
+  event.waitUntil(
+    caches.keys()
+      .then(function(names) {
+        return Promise.all(names.map(function(name) {
+          if (KEEP.indexOf(name) === -1) return caches.delete(name);
+        }));
+      })
+      .then(function() { return self.clients.claim(); })
+  );
+});
+
+// ── Strategies ────────────────────────────────────────────────────────────────
+function cacheFirst(request, cacheName) {
+  return caches.open(cacheName).then(function(cache) {
+    return cache.match(request).then(function(hit) {
+      return hit || fetch(request).then(function(resp) {
+        if (resp.ok) cache.put(request, resp.clone());
+        return resp;
+      });
+    });
+  });
+}
+
+// Offline, falls back to a stored copy or the stored home page. Only
+// responses for which `store` is true are saved.
+function networkFirst(request, cacheName, store) {
+  return caches.open(cacheName).then(function(cache) {
+    return fetch(request)
+      .then(function(resp) {
+        // Skip redirects (e.g. to sign-in) so they never stand in for the page.
+        var noStore = /no-store/.test(resp.headers.get('Cache-Control') || '');
+        if (store && resp.ok && !resp.redirected && !noStore) cache.put(request, resp.clone());
+        return resp;
+      })
+      .catch(function() {
+        return cache.match(request)
+          .then(function(hit) { return hit || cache.match('/'); })
+          .then(function(hit) { return hit || Response.error(); });
+      });
+  });
+}
+
+function trim(cache, maxEntries) {
+  return cache.keys().then(function(keys) {
+    if (keys.length <= maxEntries) return;
+    return Promise.all(keys.slice(0, keys.length - maxEntries).map(function(k) {
+      return cache.delete(k);
+    }));
+  });
+}
+
+function staleWhileRevalidate(event, cacheName, maxEntries) {
+  var request = event.request;
+  return caches.open(cacheName).then(function(cache) {
+    return cache.match(request).then(function(hit) {
+      var refresh = fetch(request).then(function(resp) {
+        // Opaque (no-cors) CDN responses report status 0 but are still usable.
+        if (resp.ok || resp.type === 'opaque') {
+          return cache.put(request, resp.clone()).then(function() {
+            return maxEntries ? trim(cache, maxEntries) : null;
+          }).then(function() { return resp; });
+        }
+        return resp;
+      });
+      if (hit) {
+        event.waitUntil(refresh.catch(function() {}));
+        return hit;
+      }
+      return refresh;
+    });
+  });
+}
+
+// ── Routing ───────────────────────────────────────────────────────────────────
+function isOfflinePage(pathname) {
+  return OFFLINE_PAGES.indexOf(pathname) !== -1 ||
+    OFFLINE_PAGE_PREFIXES.some(function(prefix) { return pathname.indexOf(prefix) === 0; });
+}
+
+self.addEventListener('fetch', function(event) {
+  var request = event.request;
+  if (request.method !== 'GET') return;
+
+  var url = new URL(request.url);
+
+  if (url.origin === self.location.origin) {
+    if (url.pathname.indexOf('/admin/') === 0) return;
+    if (url.pathname.indexOf('{{ static_url|escapejs }}') === 0) {
+      event.respondWith(cacheFirst(request, STATIC_CACHE));
+    } else if (url.pathname.indexOf('{{ media_url|escapejs }}') === 0) {
+      event.respondWith(staleWhileRevalidate(event, MEDIA_CACHE, MEDIA_MAX_ENTRIES));
+    } else if (request.mode === 'navigate') {
+      if (SESSION_PAGES.indexOf(url.pathname) !== -1) {
+        event.waitUntil(caches.delete(PAGES_CACHE));
+      } else {
+        event.respondWith(networkFirst(request, PAGES_CACHE, isOfflinePage(url.pathname)));
+      }
+    }
+    return;
+  }
+
+  if (CDN_HOSTS.indexOf(url.hostname) !== -1) {
+    event.respondWith(staleWhileRevalidate(event, CDN_CACHE));
+  }
+});
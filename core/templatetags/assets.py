@@ -0,0 +1,24 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from core import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def font_links(icons=True):
+    """<link> tags for the site fonts; self-hosted once vendored, CDN otherwise."""
+    urls = assets.font_stylesheets(icons=icons)
+    preconnect = ''
+    if assets.GOOGLE_FONTS_CSS_URL in urls:
+        preconnect = mark_safe(
+            '<link rel="preconnect" href="https://fonts.googleapis.com">\n'
+            '  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>\n  '
+        )
+    return format_html(
+        '{}{}',
+        preconnect,
+        format_html_join('\n  ', '<link rel="stylesheet" href="{}">', ((url,) for url in urls)),
+    )
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from . import search
+from .analytics import columnar, retention
+from .analytics.hll import HyperLogLog
+from .models import Category, Hostel, Item, PageView, PageViewRollup, Person
+
+# Keep tests out of the file caches the running site uses.
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'cards': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-cards'},
+}
+
+
+class SearchWordTests(SimpleTestCase):
+    def test_words_are_casefolded_and_single_characters_dropped(self):
+        self.assertEqual(search.words('Hero Sprint-X CYCLE, 2 wheels'), ['hero', 'sprint', 'cycle', 'wheels'])
+
+    def test_trigrams_are_padded_like_pg_trgm(self):
+        self.assertEqual(search.trigrams('cat'), {'  c', ' ca', 'cat', 'at '})
+
+    def test_edit_similarity_counts_a_swap_as_one_edit(self):
+        self.assertEqual(search._edit_similarity('cycle', 'cycle'), 1.0)
+        self.assertAlmostEqual(search._edit_similarity('cylce', 'cycle'), 0.8)
+        self.assertAlmostEqual(search._edit_similarity('labtop', 'laptop'), 1 - 1 / 6)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bicycles = Category.objects.create(name='Bicycles')
+            self.electronics = Category.objects.create(name='Electronics')
+            self.hostel = Hostel.objects.create(name='Malviya Bhawan')
+            seller = Person.objects.create(name='Seller', email='f20230001@goa.bits-pilani.ac.in', hostel=self.hostel)
+            self.items = {
+                name: Item.objects.create(name=name, price=Decimal(100), seller=seller, category=category)
+                for name, category in [
+                    ('Hero cycle', self.bicycles),
+                    ('Cycles rack', self.bicycles),
+                    ('Dell laptop', self.electronics),
+                    ('Laptop stand', self.electronics),
+                    ('Study chair', self.electronics),
+                ]
+            }
+        self.index = search.Index().refresh()
+
+    def ids(self, *names):
+        return {self.items[name].id for name in names}
+
+    def test_typos_match_the_intended_word(self):
+        self.assertEqual(set(self.index.search('cylce').items), self.ids('Hero cycle', 'Cycles rack'))
+        self.assertEqual(set(self.index.search('labtop').items), self.ids('Dell laptop', 'Laptop stand'))
+        self.assertFalse(self.index.search('xyzzy'))
+
+    def test_exact_words_outrank_prefixes_and_typos(self):
+        exact = self.index.search('cycle').items
+        self.assertEqual(exact[self.items['Hero cycle'].id], 1.0)
+        self.assertLess(exact[self.items['Cycles rack'].id], 1.0)
+        self.assertLess(self.index.search('cylce').items[self.items['Hero cycle'].id], 1.0)
+
+    def test_relevance_is_the_mean_over_query_words(self):
+        matches = self.index.search('dell chair')
+        self.assertEqual(matches.items[self.items['Dell laptop'].id], 0.5)
+        self.assertEqual(matches.items[self.items['Study chair'].id], 0.5)
+
+    def test_category_and_hostel_names_are_searchable(self):
+        self.assertIn(self.bicycles.id, self.index.search('bicycle').categories)
+        self.assertIn('Malviya Bhawan', self.index.search('malviya').hostels)
+
+    def test_suggest_lists_categories_then_completions_by_listing_count(self):
+        self.assertEqual(self.index.suggest('bic')[0], {'text': 'Bicycles', 'kind': 'category', 'id': self.bicycles.id})
+        self.assertEqual(self.index.suggest('Malv')[0], {'text': 'Malviya Bhawan', 'kind': 'hostel'})
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(
+                name='Cycles lock', price=Decimal(100), seller=self.items['Hero cycle'].seller, category=self.bicycles,
+            )
+        self.assertEqual(self.index.refresh().suggest('cyc'), [
+            {'text': 'cycles', 'kind': 'word', 'count': 2},
+            {'text': 'cycle', 'kind': 'word', 'count': 1},
+        ])
+
+    def test_suggest_keeps_earlier_words_and_corrects_typos(self):
+        self.assertIn({'text': 'dell laptop', 'kind': 'word', 'count': 2}, self.index.suggest('dell lap'))
+        self.assertIn('laptop', [s['text'] for s in self.index.suggest('labtop')])
+        self.assertEqual(self.index.suggest('l'), [])
+
+    def test_refresh_picks_up_renames_and_deletes_from_other_processes(self):
+        item = Item.objects.get(id=self.items['Hero cycle'].id)
+        with self.captureOnCommitCallbacks(execute=True):
+            item.name = 'Hero roadster'
+            item.save()
+        self.index.refresh()
+        self.assertIn(item.id, self.index.search('roadster').items)
+        self.assertNotIn(item.id, self.index.search('cycle').items)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.filter(id=item.id).update(is_deleted=True)
+            search.reindex_items([item.id])
+        self.assertNotIn(item.id, self.index.refresh().search('roadster').items)
+
+    def test_saves_do_not_query_the_indexed_name(self):
+        item = Item.objects.get(id=self.items['Study chair'].id)
+        with self.assertNumQueries(2):  # the seller (for the phone), then the UPDATE
+            item.is_sold = True
+            item.save()
+
+
+class HyperLogLogTests(SimpleTestCase):
+    @staticmethod
+    def sketch(values):
+        hll = HyperLogLog()
+        for value in values:
+            hll.add(value)
+        return hll
+
+    def test_estimates_stay_within_three_standard_errors(self):
+        for n in (1_000, 20_000, 100_000):
+            estimate = self.sketch(f'user{i}@example.com' for i in range(n)).count()
+            self.assertLess(abs(estimate - n) / n, 3 * 1.04 / 64, n)
+
+    def test_small_counts_are_near_exact(self):
+        self.assertEqual(self.sketch(['a', 'b', 'c', 'a']).count(), 3)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_merge_is_the_sketch_of_the_union(self):
+        union = self.sketch(str(i) for i in range(10_000)).registers
+        dense = self.sketch(str(i) for i in range(6_000)).merge(self.sketch(str(i) for i in range(4_000, 10_000)))
+        self.assertEqual(dense.registers, union)
+        # A mostly-empty sketch takes the sparse merge path.
+        sparse = self.sketch(str(i) for i in range(9_990)).merge(self.sketch(str(i) for i in range(9_990, 10_000)))
+        self.assertEqual(sparse.registers, union)
+
+    def test_bytes_round_trip(self):
+        hll = self.sketch(str(i) for i in range(500))
+        self.assertEqual(HyperLogLog.from_bytes(hll.to_bytes()).registers, hll.registers)
+
+    def test_merge_rejects_other_precisions(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog().merge(HyperLogLog(p=10))
+
+
+def page_view(n, timestamp, **fields):
+    defaults = {
+        'status': 200, 'method': 'GET', 'path': '/', 'email': '', 'campus': 'GOA',
+        'source_file': 'access.log', 'line_hash': f'line-{n}',
+    }
+    return PageView(timestamp=timestamp, **{**defaults, **fields})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.archive_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings_override = override_settings(PAGEVIEW_ARCHIVE_DIR=self.archive_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        noon = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.old_days = [noon - datetime.timedelta(days=200), noon - datetime.timedelta(days=195)]
+        PageView.objects.bulk_create([
+            page_view(0, self.old_days[0], email='a@goa.bits-pilani.ac.in'),
+            page_view(1, self.old_days[0], path='/item/7', item_id_ref=7, email='b@goa.bits-pilani.ac.in'),
+            page_view(2, self.old_days[1], status=404, path='/nope'),
+            page_view(3, noon),
+        ])
+
+    def test_archive_then_restore_round_trips_the_rows(self):
+        before = list(PageView.objects.order_by('line_hash').values(*retention.ARCHIVE_FIELDS))
+
+        self.assertEqual(retention.archive_expired(retention_days=90), 3)
+        self.assertEqual(list(PageView.objects.values_list('line_hash', flat=True)), ['line-3'])
+        # One file per day with rows; the empty days between them get none.
+        archived = sorted(p.name for p in self.archive_dir.rglob('*.jsonl.gz'))
+        self.assertEqual(archived, [f'{timezone.localdate(day).isoformat()}.jsonl.gz' for day in self.old_days])
+        total = PageViewRollup.objects.get(day=timezone.localdate(self.old_days[0]), dimension='total')
+        self.assertEqual((total.views, total.authed, total.uniques), (2, 2, 2))
+
+        for month in {timezone.localdate(day).strftime('%Y-%m') for day in self.old_days}:
+            retention.restore_month(month)
+            retention.restore_month(month)  # restoring twice adds nothing
+        after = list(PageView.objects.order_by('line_hash').values(*retention.ARCHIVE_FIELDS))
+        self.assertEqual(after, before)
+
+    def test_restore_of_a_missing_month_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            retention.restore_month('1999-01')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ColumnarQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        PageView.objects.bulk_create([
+            page_view(0, now, email='a@goa.bits-pilani.ac.in'),
+            page_view(1, now, path='/item/1', item_id_ref=1, email='a@goa.bits-pilani.ac.in'),
+            page_view(2, now, path='/item/2', item_id_ref=2, email='b@hyderabad.bits-pilani.ac.in', campus='HYD'),
+            page_view(3, now, path='/item/2', item_id_ref=2, status=304),
+            page_view(4, now, path='/missing', status=404),
+        ])
+
+    def setUp(self):
+        self.table = columnar.load(include_archive=False)
+
+    def count(self, **conditions):
+        return self.table.query().where(**conditions).count()[0]['views']
+
+    def test_filters(self):
+        self.assertEqual(self.table.rows, 5)
+        self.assertEqual(self.count(status=200), 3)
+        self.assertEqual(self.count(status__lt=400), 4)
+        self.assertEqual(self.count(status__in=[304, 404]), 2)
+        self.assertEqual(self.count(path__startswith='/item/', campus='GOA'), 2)
+        self.assertEqual(self.count(path__contains='miss'), 1)
+        self.assertEqual(self.table.query().where(status=500).count(), [])
+
+    def test_group_by_counts_largest_first_with_distinct_values(self):
+        rows = self.table.query().where(path__startswith='/item/').group_by('path').count(distinct='email')
+        self.assertEqual(rows, [
+            {'path': '/item/2', 'views': 2, 'distinct_email': 1},  # the blank email isn't a visitor
+            {'path': '/item/1', 'views': 1, 'distinct_email': 1},
+        ])
+
+    def test_bad_queries_raise_query_error(self):
+        query = self.table.query()
+        with self.assertRaisesMessage(columnar.QueryError, 'Unknown column'):
+            query.where(colour='red')
+        with self.assertRaisesMessage(columnar.QueryError, 'Unknown operator'):
+            query.where(status__ne=200)
+        with self.assertRaisesMessage(columnar.QueryError, 'status expects an integer'):
+            query.where(status='abc')
+        with self.assertRaisesMessage(columnar.QueryError, 'status expects an integer'):
+            query.where(status__in=['200', 'abc'])
+        with self.assertRaisesMessage(columnar.QueryError, 'contains only applies to text columns'):
+            query.where(status__contains=2)
@@ -5,6 +5,8 @@ app_name = 'core'
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('api/feed', views.feed_json, name='feed_json'),
+    path('api/suggest', views.search_suggest, name='search_suggest'),
     path('sign-in', views.sign_in, name='sign_in'),
     path('auth-receiver', views.auth_receiver, name='auth_receiver'),
     path('sign-out', views.sign_out, name='sign_out'),
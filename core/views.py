@@ -1,26 +1,32 @@
 import json
 import os
 import secrets
-import requests
+from functools import wraps
+from asgiref.sync import sync_to_async
 from django.core.files.base import ContentFile
 from urllib.parse import urlencode
 from django.contrib.staticfiles.storage import staticfiles_storage
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseRedirect, HttpResponsePermanentRedirect, HttpResponse, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import HttpResponseRedirect, HttpResponsePermanentRedirect, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.safestring import mark_safe
 from django.urls import reverse
 from django.contrib import messages
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q, Count, F, Max, Case, When, Value
+from django.utils import timezone
 from django.conf import settings
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from django_ratelimit import ALL
+from django_ratelimit.core import is_ratelimited
 from django_ratelimit.decorators import ratelimit
 
 from .models import Person, Item, Image, Category, Hostel, Feedback, FeedbackImage, Campus, Reaction
 from .forms import ItemForm, FeedbackForm
-from . import helper
+from . import caching, helper, oauth, search, similarity
 
 def _get_current_user(request):
     """Return Person if session has valid user_data, else None."""
@@ -30,9 +36,31 @@ def _get_current_user(request):
     return Person.objects.filter(email=user_data['email']).first()
 
 
+async def _aget_current_user(request):
+    user_data = await request.session.aget('user_data')
+    if not user_data:
+        return None
+    return await Person.objects.filter(email=user_data['email']).afirst()
+
+
+def _async_ratelimit(key, rate):
+    """ratelimit(block=False) for async views: sets request.limited and
+    leaves the response to the view. Shares counters with the sync
+    decorator, since the group is still derived from the view."""
+    def decorator(view_fn):
+        @wraps(view_fn)
+        async def wrapper(request, *args, **kwargs):
+            limited = await sync_to_async(is_ratelimited)(
+                request=request, group=None, fn=view_fn, key=key, rate=rate, method=ALL, increment=True,
+            )
+            request.limited = limited or getattr(request, 'limited', False)
+            return await view_fn(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 def _login_required(view_fn):
     """Simple decorator that redirects to sign-in if user is not authenticated."""
-    from functools import wraps
     @wraps(view_fn)
     def wrapper(request, *args, **kwargs):
         if not _get_current_user(request):
@@ -44,7 +72,7 @@ def _login_required(view_fn):
 @csrf_exempt
 def sign_in(request):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
     if _get_current_user(request):
         return redirect('core:home')
     state = secrets.token_urlsafe(16)
@@ -66,98 +94,74 @@ def sign_in(request):
     })
 
 
-def _download_avatar(person, picture_url):
-    """Download profile picture from Google and store it. Replaces any existing avatar."""
+def _store_avatar(person, content):
+    """Save a downloaded profile picture, replacing any existing avatar."""
     try:
-        resp = requests.get(picture_url, timeout=5)
-        if resp.status_code != 200:
-            return
         # Delete old avatar file from disk before overwriting
         if person.avatar:
             person.avatar.delete(save=False)
-        person.avatar.save(f'avatar_{person.id}.jpg', ContentFile(resp.content), save=False)
+        person.avatar.save(f'avatar_{person.id}.jpg', ContentFile(content), save=False)
         Person.objects.filter(pk=person.pk).update(avatar=person.avatar.name)
     except Exception:
         pass  # Never let avatar download block sign-in
 
 
-def _complete_sign_in(request, user_data):
-    request.session['user_data'] = user_data
+async def _complete_sign_in(request, http, user_data):
+    await request.session.aset('user_data', user_data)
     email = user_data['email']
-    person, created = Person.objects.get_or_create(
+    person, created = await Person.objects.aget_or_create(
         email=email,
         defaults={'name': user_data.get('name', '')},
     )
     picture_url = user_data.get('picture')
     if picture_url:
-        _download_avatar(person, picture_url)
+        content = await oauth.fetch_avatar(http, picture_url)
+        if content:
+            await sync_to_async(_store_avatar)(person, content)
     return redirect('core:home')
 
 
-@ratelimit(key='ip', rate='20/m', block=False)
+@_async_ratelimit(key='ip', rate='20/m')
 @csrf_exempt
-def auth_receiver(request):
+async def auth_receiver(request):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
-
-    # ── OAuth2 redirect callback (GET) ────────────────────────────────────────
-    if request.method == 'GET':
-        if request.GET.get('error'):
-            messages.error(request, 'Sign-in was cancelled. Please try again.')
-            return redirect('core:sign_in')
-        code = request.GET.get('code')
-        state = request.GET.get('state')
-        session_state = request.session.get('oauth_state')
-        if not code or not state or state != session_state:
-            msg = (f'State mismatch (got {state!r}, expected {session_state!r})'
-                   if settings.DEBUG else 'Sign-in failed. Please try again.')
-            messages.error(request, msg)
-            return redirect('core:sign_in')
-        redirect_uri = request.build_absolute_uri('/auth-receiver')
-        try:
-            token_resp = requests.post(
-                'https://oauth2.googleapis.com/token',
-                data={
-                    'code': code,
-                    'client_id': settings.GOOGLE_OAUTH_CLIENT_ID,
-                    'client_secret': settings.GOOGLE_OAUTH_CLIENT_SECRET,
-                    'redirect_uri': redirect_uri,
-                    'grant_type': 'authorization_code',
-                },
-                timeout=10,
-            )
-            token_json = token_resp.json()
-            id_token_str = token_json.get('id_token')
-            if not id_token_str:
-                raise ValueError(
-                    token_json.get('error_description') or token_json.get('error') or 'No id_token in response'
+        return await sync_to_async(rate_limited)(request)
+
+    async with oauth.client() as http:
+        # ── OAuth2 redirect callback (GET) ────────────────────────────────────
+        if request.method == 'GET':
+            if request.GET.get('error'):
+                messages.error(request, 'Sign-in was cancelled. Please try again.')
+                return redirect('core:sign_in')
+            code = request.GET.get('code')
+            state = request.GET.get('state')
+            session_state = await request.session.aget('oauth_state')
+            if not code or not state or state != session_state:
+                msg = (f'State mismatch (got {state!r}, expected {session_state!r})'
+                       if settings.DEBUG else 'Sign-in failed. Please try again.')
+                messages.error(request, msg)
+                return redirect('core:sign_in')
+            redirect_uri = request.build_absolute_uri('/auth-receiver')
+            try:
+                id_token_str = await oauth.exchange_code(
+                    http, code, settings.GOOGLE_OAUTH_CLIENT_ID, settings.GOOGLE_OAUTH_CLIENT_SECRET, redirect_uri,
                 )
-            user_data = id_token.verify_oauth2_token(
-                id_token_str,
-                google_requests.Request(),
-                settings.GOOGLE_OAUTH_CLIENT_ID,
-                clock_skew_in_seconds=10,
-            )
-        except Exception as e:
-            msg = f'Sign-in error: {e}' if settings.DEBUG else 'Sign-in failed. Please try again.'
-            messages.error(request, msg)
-            return redirect('core:sign_in')
-        return _complete_sign_in(request, user_data)
-
-    # ── Google One Tap credential (POST) ──────────────────────────────────────
-    if request.method == 'POST':
-        try:
-            token = request.POST['credential']
-            user_data = id_token.verify_oauth2_token(
-                token,
-                google_requests.Request(),
-                settings.GOOGLE_OAUTH_CLIENT_ID,
-                clock_skew_in_seconds=10,
-            )
-        except Exception:
-            messages.error(request, 'Sign-in failed. Please try again.')
-            return redirect('core:sign_in')
-        return _complete_sign_in(request, user_data)
+                user_data = await oauth.verify_id_token(http, id_token_str, settings.GOOGLE_OAUTH_CLIENT_ID)
+            except Exception as e:
+                msg = f'Sign-in error: {e}' if settings.DEBUG else 'Sign-in failed. Please try again.'
+                messages.error(request, msg)
+                return redirect('core:sign_in')
+            return await _complete_sign_in(request, http, user_data)
+
+        # ── Google One Tap credential (POST) ──────────────────────────────────
+        if request.method == 'POST':
+            try:
+                token = request.POST['credential']
+                user_data = await oauth.verify_id_token(http, token, settings.GOOGLE_OAUTH_CLIENT_ID)
+            except Exception:
+                messages.error(request, 'Sign-in failed. Please try again.')
+                return redirect('core:sign_in')
+            return await _complete_sign_in(request, http, user_data)
 
     return redirect('core:sign_in')
 
@@ -165,21 +169,21 @@ def auth_receiver(request):
 @ratelimit(key='ip', rate='20/m', block=False)
 def sign_out(request):
     request.session.pop('user_data', None)
-    return redirect('core:sign_in')
-
+    response = redirect('core:sign_in')
+    # The service worker drops its stored pages on this navigation too; this
+    # also covers browsers where it isn't running.
+    response['Clear-Site-Data'] = '"cache"'
+    return response
 
-@ratelimit(key='ip', rate='60/m', block=False)
-def home(request):
-    if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
 
-    current_user = _get_current_user(request)
-    if not current_user:
-        return redirect('core:sign_in')
+def _feed_items(request, current_user):
+    """Items matching the campus / category / search filters in the query string.
 
+    Returns (queryset, selected_campus, campus_filter). Shared by the home
+    page and its JSON feed so both always list the same items.
+    """
     category_id = request.GET.get('c')
     query = request.GET.get('q')
-    sort_method = request.GET.get('sort', '0')
     selected_campus = request.GET.get('campus')
 
     items_query = Item.objects.filter(is_deleted=False).select_related('seller', 'category', 'hostel').prefetch_related('images')
@@ -204,12 +208,83 @@ def home(request):
         items_query = items_query.filter(category__id=category_id)
 
     if query:
+        # Exact substrings, plus names the search index finds close to the
+        # query ("cylce" → cycle), ranked by how close.
+        matches = search.search(query)
         items_query = items_query.filter(
             Q(name__icontains=query) |
             Q(hostel__name__icontains=query) |
             Q(description__icontains=query) |
-            Q(category__name__icontains=query)
-        )
+            Q(category__name__icontains=query) |
+            matches.q()
+        ).annotate(relevance=matches.relevance())
+    return items_query, selected_campus, campus_filter
+
+
+def _feed_sort(request):
+    """The feed's sort method. Searches default to best match, which only
+    exists for them."""
+    searching = bool(request.GET.get('q'))
+    sort_method = request.GET.get('sort') or (helper.RELEVANCE_SORT if searching else '0')
+    if sort_method == helper.RELEVANCE_SORT and not searching:
+        return '0'
+    return sort_method
+
+
+def _feed_etag(request, current_user):
+    # The feed depends on the viewer (default campus, own reactions, avatar),
+    # the filters in the URL and, through the listings version, on every
+    # item, image, reaction, category and hostel.
+    listings_version, = caching.versions(caching.LISTINGS_VERSION_KEY)
+    return caching.page_etag(
+        current_user.id, current_user.campus, _session_picture(request),
+        request.get_full_path(), listings_version,
+    )
+
+
+def _reaction_summaries(item_ids, person):
+    """Per-item reaction bubbles for feed cards: up to three distinct emojis
+    (most recently used first), the total count and the viewer's own reaction.
+
+    Two queries whose size depends on the page, not on how many reactions
+    the items have: one row per item × emoji, and the viewer's reactions.
+    """
+    groups = (
+        Reaction.objects.filter(item_id__in=item_ids)
+        .values('item_id', 'reaction_type')
+        .annotate(count=Count('id'), latest=Max('created_at'))
+        .order_by('item_id', '-latest')
+    )
+    summaries = {str(iid): {'emojis': [], 'total': 0, 'mine': None} for iid in item_ids}
+    for row in groups:
+        summary = summaries[str(row['item_id'])]
+        summary['total'] += row['count']
+        if len(summary['emojis']) < 3:
+            summary['emojis'].append(row['reaction_type'])
+    mine = Reaction.objects.filter(item_id__in=item_ids, person=person).values_list('item_id', 'reaction_type')
+    for iid, emoji in mine:
+        summaries[str(iid)]['mine'] = emoji
+    return summaries
+
+
+@ratelimit(key='ip', rate='60/m', block=False)
+def home(request):
+    if getattr(request, 'limited', False):
+        return rate_limited(request)
+
+    current_user = _get_current_user(request)
+    if not current_user:
+        return redirect('core:sign_in')
+
+    etag = _feed_etag(request, current_user)
+    response = caching.not_modified(request, etag)
+    if response is not None:
+        return response
+
+    category_id = request.GET.get('c')
+    query = request.GET.get('q')
+    sort_method = _feed_sort(request)
+    items_query, selected_campus, campus_filter = _feed_items(request, current_user)
 
     # Category counts
     categories = Category.objects.all()
@@ -227,8 +302,9 @@ def home(request):
     categories_with_counts.sort(key=lambda x: x['item_count'], reverse=True)
     total_count = sum(c['item_count'] for c in categories_with_counts)
 
-    items_query = items_query  # no reaction annotation needed
-    items = helper.items_sort(items_query, sort_method)
+    # Sorted and paginated in the database, in the same order feed_json
+    # continues from with its cursor.
+    items = helper.feed_order(items_query, sort_method)
     paginator = Paginator(items, 60)
     page = request.GET.get('page')
     try:
@@ -239,33 +315,9 @@ def home(request):
         paginated_items = paginator.page(paginator.num_pages)
 
     # Reaction data for this page's items (single DB query)
-    page_item_ids = [item.id for item in paginated_items]
-    rxns_raw = list(
-        Reaction.objects.filter(item_id__in=page_item_ids)
-        .order_by('item_id', '-created_at')
-        .values_list('item_id', 'reaction_type', 'person_id')
-    )
-    from collections import defaultdict
-    item_emojis = defaultdict(list)
-    item_emojis_seen = defaultdict(set)
-    item_total = defaultdict(int)
-    user_item_emoji = {}
-    for iid, emoji, person_id in rxns_raw:
-        item_total[iid] += 1
-        if emoji not in item_emojis_seen[iid] and len(item_emojis[iid]) < 3:
-            item_emojis_seen[iid].add(emoji)
-            item_emojis[iid].append(emoji)
-        if person_id == current_user.id and iid not in user_item_emoji:
-            user_item_emoji[iid] = emoji
-    reaction_data = {
-        str(iid): {
-            'emojis': item_emojis.get(iid, []),
-            'total': item_total.get(iid, 0),
-            'mine': user_item_emoji.get(iid),
-        }
-        for iid in page_item_ids
-    }
-    reaction_data_json = json.dumps(reaction_data)
+    page_items = list(paginated_items)
+    reaction_data_json = json.dumps(_reaction_summaries([item.id for item in page_items], current_user))
+    next_cursor = helper.feed_cursor(page_items[-1], sort_method) if paginated_items.has_next() else ''
 
     campus_tabs = [
         ('GOA', 'Goa'),
@@ -274,7 +326,7 @@ def home(request):
         ('DUB', 'Dubai'),
         ('ALL', 'All Campuses'),
     ]
-    return render(request, 'core/home.html', {
+    context = {
         'user': current_user,
         'items': paginated_items,
         'page_obj': paginated_items,
@@ -288,27 +340,143 @@ def home(request):
         'selected_category': category_id,
         'campus_tabs': campus_tabs,
         'reaction_data_json': reaction_data_json,
+        'next_cursor': next_cursor,
+    }
+    if settings.STREAM_FEED:
+        response = _stream_feed(request, 'core/home.html', context, paginated_items, 'core/partials/home_card.html')
+    else:
+        context['cards'] = caching.render_item_cards(paginated_items, 'core/partials/home_card.html')
+        response = render(request, 'core/home.html', context)
+    return caching.set_validator(response, etag)
+
+
+FEED_BATCH_SIZE = 24
+
+
+@ratelimit(key='ip', rate='60/m', block=False)
+def feed_json(request):
+    """Next batch of home feed cards after `cursor`, for infinite scroll.
+
+    Takes the same campus / c / q / sort parameters as home.
+    """
+    if getattr(request, 'limited', False):
+        return JsonResponse({'error': 'Too many requests'}, status=429)
+
+    current_user = _get_current_user(request)
+    if not current_user:
+        return JsonResponse({'error': 'Not authenticated'}, status=401)
+
+    etag = _feed_etag(request, current_user)
+    response = caching.not_modified(request, etag)
+    if response is not None:
+        return response
+
+    sort_method = _feed_sort(request)
+    items_query, selected_campus, _ = _feed_items(request, current_user)
+    items_query = helper.feed_order(items_query, sort_method)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            items_query = helper.feed_after(items_query, sort_method, cursor)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    # One extra row tells us whether there is another batch without a COUNT.
+    batch = list(items_query[:FEED_BATCH_SIZE + 1])
+    has_more = len(batch) > FEED_BATCH_SIZE
+    batch = batch[:FEED_BATCH_SIZE]
+    response = JsonResponse({
+        'campus': selected_campus,
+        'cards': caching.render_item_cards(batch, 'core/partials/home_card.html'),
+        'reactions': _reaction_summaries([item.id for item in batch], current_user),
+        'next_cursor': helper.feed_cursor(batch[-1], sort_method) if has_more else None,
     })
+    return caching.set_validator(response, etag)
+
+
+SUGGEST_MAX_QUERY = 100
+
+
+@ratelimit(key='ip', rate='300/m', block=False)
+def search_suggest(request):
+    """Autocomplete for the search boxes, called as the user types.
+
+    Served from the in-memory search index, so it costs a session lookup
+    and a cache read on top of a few dictionary walks.
+    """
+    if getattr(request, 'limited', False):
+        return JsonResponse({'error': 'Too many requests'}, status=429)
+
+    current_user = _get_current_user(request)
+    if not current_user:
+        return JsonResponse({'error': 'Not authenticated'}, status=401)
+
+    query = request.GET.get('q', '')[:SUGGEST_MAX_QUERY]
+    response = JsonResponse({'query': query, 'suggestions': search.suggest(query)})
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+
+# Stands in for the card grid while the rest of a streamed page is rendered.
+_FEED_MARKER = '\x00feed-cards\x00'
+FEED_STREAM_BATCH = 12
+
+
+def _stream_feed(request, template_name, context, items, card_template):
+    """Render a feed page as a stream: the page around the card grid is
+    rendered up front (so CSRF, messages and session work finish before the
+    response leaves the view), then the cards follow in batches."""
+    items = list(items)
+    if not items:
+        return render(request, template_name, {**context, 'cards': []})
+    html = render_to_string(template_name, {**context, 'cards': [mark_safe(_FEED_MARKER)]}, request)
+    head, tail = html.split(_FEED_MARKER, 1)
+
+    def chunks():
+        yield head
+        for start in range(0, len(items), FEED_STREAM_BATCH):
+            yield '\n'.join(caching.render_item_cards(items[start:start + FEED_STREAM_BATCH], card_template))
+        yield tail
+
+    response = StreamingHttpResponse(chunks(), content_type='text/html; charset=utf-8')
+    response['X-Accel-Buffering'] = 'no'  # let nginx pass each chunk straight through
+    return response
 
 
 @ratelimit(key='ip', rate='60/m', block=False)
 def item_detail(request, id):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     current_user = _get_current_user(request)
     if not current_user:
         return redirect('core:sign_in')
 
-    item = get_object_or_404(Item, id=id, is_deleted=False)
-    similar_items = (
-        Item.objects
-        .filter(category=item.category, is_deleted=False)
-        .exclude(id=item.id)
-        .select_related('seller', 'hostel')
-        .prefetch_related('images')
-        .order_by('-updated_at')[:6]
+    item = get_object_or_404(
+        Item.objects.select_related('seller', 'category', 'hostel').prefetch_related('images'),
+        id=id, is_deleted=False,
+    )
+    # Validator over what the page shows: the item row, its images and
+    # seller, plus version counters standing in for the reactions and the
+    # similar items (and category / hostel names) so those aren't queried.
+    seller = item.seller
+    listings_version, reactions_version = caching.versions(
+        caching.LISTINGS_VERSION_KEY,
+        caching.REACTIONS_VERSION_KEY.format(item_id=item.id),
     )
+    etag = caching.page_etag(
+        current_user.id, _session_picture(request),
+        item.updated_at.isoformat(), item.name, item.description, str(item.price),
+        item.is_sold, item.whatsapp, item.hostel_id, item.category_id,
+        [(img.id, img.display_order, img.image.name) for img in item.images.all()],
+        seller.id, seller.name, seller.avatar.name, seller.campus, seller.hostel_id,
+        reactions_version, listings_version,
+    )
+    response = caching.not_modified(request, etag)
+    if response is not None:
+        return response
+
+    similar_items = similarity.similar_items(item)
 
     # Reactions
     all_rxns = list(
@@ -329,9 +497,9 @@ def item_detail(request, id):
     emoji_groups = dict(sorted(emoji_groups.items(), key=lambda x: len(x[1]), reverse=True))
     total_rxns = len(all_rxns)
 
-    return render(request, 'core/item_detail.html', {
+    response = render(request, 'core/item_detail.html', {
         'item': item,
-        'similar_items': similar_items,
+        'similar_cards': caching.render_item_cards(similar_items, 'core/partials/similar_card.html'),
         'user': current_user,
         'all_item_rxns': all_rxns[:20],
         'total_rxns': total_rxns,
@@ -339,12 +507,13 @@ def item_detail(request, id):
         'my_emoji': my_emoji,
         'my_emoji_json': json.dumps(my_emoji),
     })
+    return caching.set_validator(response, etag)
 
 
 @ratelimit(key='ip', rate='10/m', block=False)
 def add_product(request):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -383,10 +552,38 @@ def add_product(request):
     return render(request, 'core/add_product.html', {'form': form, 'user': person})
 
 
+def _reconcile_images(item, keep_ids):
+    """Drop images missing from `keep_ids` and renumber the rest in that order.
+
+    Runs a fixed number of queries regardless of image count: one load, one
+    DELETE, one bulk UPDATE. Files of removed images are only unlinked from
+    storage once the surrounding transaction commits. Returns how many images
+    the item has left.
+    """
+    current = {img.id: img for img in item.images.all()}
+    keep_ids = [img_id for img_id in dict.fromkeys(keep_ids) if img_id in current]
+
+    removed = [img for img_id, img in current.items() if img_id not in keep_ids]
+    if removed:
+        Image.objects.filter(id__in=[img.id for img in removed]).delete()
+        helper.delete_files_on_commit([img.image for img in removed])
+
+    reordered = []
+    for idx, img_id in enumerate(keep_ids):
+        img = current[img_id]
+        if img.display_order != idx:
+            img.display_order = idx
+            reordered.append(img)
+    if reordered:
+        Image.objects.bulk_update(reordered, ['display_order'])
+
+    return len(keep_ids)
+
+
 @ratelimit(key='ip', rate='10/m', block=False)
 def edit_item(request, id):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -418,29 +615,19 @@ def edit_item(request, id):
                 person.save()
 
             updated_item.hostel = person.hostel
-            updated_item.save()
 
             existing_ids = [
                 int(x) for x in request.POST.get('existing_image_ids', '').split(',')
                 if x.strip().isdigit()
             ]
-            # Delete images removed by the user
-            for img in item.images.all():
-                if img.id not in existing_ids:
-                    img.image.delete(save=False)
-                    img.delete()
-            # Reorder the kept images
-            for idx, img_id in enumerate(existing_ids):
-                try:
-                    img = Image.objects.get(id=img_id, item=item)
-                    img.display_order = idx
-                    img.save()
-                except Image.DoesNotExist:
-                    pass
-            # Append newly uploaded images
-            next_order = len(existing_ids)
-            for idx, image_file in enumerate(request.FILES.getlist('images')[:5 - next_order]):
-                Image.objects.create(item=item, image=helper.normalize_uploaded_image(image_file), display_order=next_order + idx)
+            with transaction.atomic():
+                updated_item.save()
+                next_order = _reconcile_images(item, existing_ids)
+                # Append newly uploaded images
+                Image.objects.bulk_create([
+                    Image(item=item, image=helper.normalize_uploaded_image(image_file), display_order=next_order + idx)
+                    for idx, image_file in enumerate(request.FILES.getlist('images')[:5 - next_order])
+                ])
 
             messages.success(request, 'Item updated successfully!')
             return redirect('core:my_listings')
@@ -464,7 +651,7 @@ def edit_item(request, id):
 @ratelimit(key='ip', rate='30/m', block=False)
 def delete_item(request, id):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -473,6 +660,8 @@ def delete_item(request, id):
     item = get_object_or_404(Item, id=id, is_deleted=False)
     if item.seller == person:
         Item.objects.filter(pk=item.pk).update(is_deleted=True)
+        search.update('item', item.id, item.name, '')
+        caching.bump_listings_version()
     return redirect('core:my_listings')
 
 
@@ -483,15 +672,19 @@ def my_listings(request):
         return redirect('core:sign_in')
 
     listings = helper.items_sort(
-        Item.objects.filter(seller=person, is_deleted=False).select_related('category', 'hostel').prefetch_related('images')
+        Item.objects.filter(seller=person, is_deleted=False).select_related('seller', 'category', 'hostel').prefetch_related('images')
     )
-    return render(request, 'core/my_listings.html', {'listings': listings, 'user': person})
+    return render(request, 'core/my_listings.html', {
+        'listings': listings,
+        'cards': caching.render_item_cards(listings, 'core/partials/listing_card.html'),
+        'user': person,
+    })
 
 
 @ratelimit(key='ip', rate='30/m', block=False)
 def mark_sold(request, id):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -506,7 +699,7 @@ def mark_sold(request, id):
 @ratelimit(key='ip', rate='30/m', block=False)
 def repost(request, id):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -529,7 +722,7 @@ def repost(request, id):
 @csrf_exempt
 def bulk_action(request, action):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -545,22 +738,32 @@ def bulk_action(request, action):
         messages.error(request, 'No valid items were selected.')
         return redirect('core:my_listings')
 
-    if action == 'repost':
-        count = 0
-        for item in items:
-            item.repost()
-            count += 1
-        messages.success(request, f'Successfully reposted {count} item(s).')
-    elif action == 'toggle_sold':
-        count = 0
-        for item in items:
-            item.is_sold = not item.is_sold
-            item.save(change_time=False)
-            count += 1
-        messages.success(request, f'Successfully toggled sold status for {count} item(s).')
-    elif action == 'delete':
-        count = items.update(is_deleted=True)
-        messages.success(request, f'Successfully deleted {count} item(s).')
+    # Every selected row belongs to `person`, so nothing per-item needs to be
+    # re-derived (phone/WhatsApp only change via Person.save) and each action
+    # collapses into a single UPDATE.
+    with transaction.atomic():
+        if action == 'repost':
+            changes = {
+                'is_sold': False,
+                'updated_at': timezone.now(),
+                'repost_count': F('repost_count') + 1,
+            }
+            if person.hostel_id:
+                changes['hostel'] = person.hostel_id
+            count = items.update(**changes)
+            messages.success(request, f'Successfully reposted {count} item(s).')
+        elif action == 'toggle_sold':
+            count = items.update(
+                is_sold=Case(When(is_sold=True, then=Value(False)), default=Value(True))
+            )
+            messages.success(request, f'Successfully toggled sold status for {count} item(s).')
+        elif action == 'delete':
+            deleted_ids = list(items.values_list('id', flat=True))
+            count = items.update(is_deleted=True)
+            search.reindex_items(deleted_ids)
+            messages.success(request, f'Successfully deleted {count} item(s).')
+        # update() skips the post_save signal that normally does this.
+        transaction.on_commit(caching.bump_listings_version)
 
     return redirect('core:my_listings')
 
@@ -568,7 +771,7 @@ def bulk_action(request, action):
 @ratelimit(key='ip', rate='10/m', block=False)
 def feedback(request):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
 
@@ -590,12 +793,19 @@ def feedback(request):
     return render(request, 'core/feedback.html', {'form': form, 'user': person})
 
 
+def _session_picture(request):
+    # base.html shows the signed-in user's avatar; it is the only per-user bit.
+    return (request.session.get('user_data') or {}).get('picture', '')
+
+
 @ratelimit(key='ip', rate='60/m', block=False)
+@caching.cached_response(60 * 60, vary_on=_session_picture, flash_messages=True, private=True, max_age=10 * 60)
 def about(request):
     return render(request, 'core/about.html')
 
 
 @ratelimit(key='ip', rate='60/m', block=False)
+@caching.cached_response(60 * 60, vary_on=_session_picture, flash_messages=True, private=True, max_age=10 * 60)
 def terms(request):
     return render(request, 'core/terms.html')
 
@@ -603,7 +813,7 @@ def terms(request):
 @ratelimit(key='ip', rate='60/m', block=False)
 def categories(request):
     if getattr(request, 'limited', False):
-        return render(request, 'core/429.html', status=429)
+        return rate_limited(request)
 
     person = _get_current_user(request)
     if not person:
@@ -631,80 +841,12 @@ def debug_sign_in(request):
             return redirect('core:home')
     return render(request, 'core/debug_sign_in.html')
 
-@ratelimit(key='ip', rate='60/m', block=False)
-@csrf_exempt
-def react_item(request, item_id):
-    person = _get_current_user(request)
-    if not person:
-        return JsonResponse({'error': 'Not authenticated'}, status=401)
-
-    item = get_object_or_404(Item, id=item_id, is_deleted=False)
-
-    # GET: return reactor data without reacting
-    if request.method == 'GET':
-        all_rxns = list(
-            Reaction.objects.filter(item=item)
-            .select_related('person')
-            .order_by('-created_at')
-        )
-        total = len(all_rxns)
-        seen = set()
-        recent_emojis = []
-        for r in all_rxns:
-            if r.reaction_type not in seen and len(recent_emojis) < 3:
-                seen.add(r.reaction_type)
-                recent_emojis.append(r.reaction_type)
-        emoji_groups = {}
-        for r in all_rxns:
-            e = r.reaction_type
-            if e not in emoji_groups:
-                emoji_groups[e] = []
-            emoji_groups[e].append(r.person.name)
-        emoji_groups = dict(sorted(emoji_groups.items(), key=lambda x: len(x[1]), reverse=True))
-        reactors = [
-            {
-                'name': r.person.name,
-                'initial': (r.person.name[0].upper() if r.person.name else '?'),
-                'emoji': r.reaction_type,
-                'avatar_url': r.person.avatar.url if r.person.avatar else None,
-            }
-            for r in all_rxns[:20]
-        ]
-        return JsonResponse({
-            'total': total,
-            'recent_emojis': recent_emojis,
-            'emoji_groups': emoji_groups,
-            'reactors': reactors,
-        })
-
-    if request.method != 'POST':
-        return JsonResponse({'error': 'Method not allowed'}, status=405)
-
-    emoji = request.POST.get('emoji', '').strip()
-    if not emoji:
-        return JsonResponse({'error': 'No emoji provided'}, status=400)
-
-    my_emoji = None
-    try:
-        existing = Reaction.objects.get(item=item, person=person)
-        if existing.reaction_type == emoji:
-            existing.delete()  # toggle off (same emoji = remove)
-        else:
-            existing.reaction_type = emoji  # replace with new emoji
-            existing.save()
-            my_emoji = emoji
-    except Reaction.DoesNotExist:
-        Reaction.objects.create(item=item, person=person, reaction_type=emoji)
-        my_emoji = emoji
-
-    # Build response
-    all_rxns = list(
-        Reaction.objects.filter(item=item)
-        .select_related('person')
-        .order_by('-created_at')
-    )
-    total = len(all_rxns)
-
+async def _reaction_detail(item):
+    """Reaction bubbles, per-emoji name lists and the latest reactors for an
+    item's detail page."""
+    all_rxns = [
+        r async for r in Reaction.objects.filter(item=item).select_related('person').order_by('-created_at')
+    ]
     seen = set()
     recent_emojis = []
     for r in all_rxns:
@@ -731,23 +873,61 @@ def react_item(request, item_id):
         }
         for r in all_rxns[:20]
     ]
-
-    return JsonResponse({
-        'my_emoji': my_emoji,
+    return {
+        'total': len(all_rxns),
         'recent_emojis': recent_emojis,
-        'total': total,
         'emoji_groups': emoji_groups,
         'reactors': reactors,
-    })
+    }
+
+
+@_async_ratelimit(key='ip', rate='60/m')
+@csrf_exempt
+async def react_item(request, item_id):
+    person = await _aget_current_user(request)
+    if not person:
+        return JsonResponse({'error': 'Not authenticated'}, status=401)
+
+    item = await aget_object_or_404(Item, id=item_id, is_deleted=False)
+
+    # GET: return reactor data without reacting
+    if request.method == 'GET':
+        return JsonResponse(await _reaction_detail(item))
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    emoji = request.POST.get('emoji', '').strip()
+    if not emoji:
+        return JsonResponse({'error': 'No emoji provided'}, status=400)
+
+    my_emoji = None
+    try:
+        existing = await Reaction.objects.aget(item=item, person=person)
+        if existing.reaction_type == emoji:
+            await existing.adelete()  # toggle off (same emoji = remove)
+        else:
+            existing.reaction_type = emoji  # replace with new emoji
+            await existing.asave()
+            my_emoji = emoji
+    except Reaction.DoesNotExist:
+        await Reaction.objects.acreate(item=item, person=person, reaction_type=emoji)
+        my_emoji = emoji
+
+    return JsonResponse({'my_emoji': my_emoji, **await _reaction_detail(item)})
 
+@caching.cached_response(60 * 60 * 24, by_url=False, public=True, max_age=5 * 60)
 def page_not_found(request, exception):
     return render(request, 'core/404.html', status=404)
 
 
+# Not cached: a 500 may come from a broken cache or disk, and this page
+# has to render anyway.
 def server_error(request):
     return render(request, 'core/500.html', status=500)
 
 
+@caching.cached_response(60 * 60 * 24, public=True, max_age=60 * 60 * 24)
 def manifest_json(request):
     return JsonResponse({
         "name": "SWD Store",
@@ -773,14 +953,28 @@ def manifest_json(request):
     }, content_type='application/manifest+json')
 
 
+@caching.cached_response(60 * 60 * 24, public=True, no_cache=True)
 def service_worker(request):
-    js = "self.addEventListener('fetch', function(event) {});"
-    return HttpResponse(js, content_type='application/javascript')
+    return render(request, 'core/sw.js', {
+        'version': caching.static_version(),
+        'precache_json': json.dumps(caching.precache_urls()),
+        'offline_pages_json': json.dumps([
+            reverse('core:home'), reverse('core:categories'), reverse('core:about'), reverse('core:terms'),
+        ]),
+        'offline_page_prefixes_json': json.dumps([reverse('core:item_detail', args=[0])[:-1]]),
+        'session_pages_json': json.dumps([
+            reverse('core:sign_in'), reverse('core:sign_out'), reverse('core:auth_receiver'),
+        ]),
+        'media_max_entries': 300,
+        'static_url': settings.STATIC_URL,
+        'media_url': settings.MEDIA_URL,
+    }, content_type='application/javascript')
 
 
 def favicon_redirect(request):
     return HttpResponsePermanentRedirect(staticfiles_storage.url('images/icon_512.png'))
 
 
+@caching.cached_response(60 * 60 * 24, by_url=False, no_store=True)
 def rate_limited(request, exception=None):
     return render(request, 'core/429.html', status=429)
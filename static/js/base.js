@@ -0,0 +1,264 @@
+// ── Page progress bar ─────────────────────────────────────────────────────────
+(function(){
+  var bar = document.getElementById('page-bar');
+  var t;
+  function start(){ bar.style.width='0'; bar.style.opacity='1'; clearTimeout(t); bar.style.width='70%'; }
+  function done(){ bar.style.width='100%'; t=setTimeout(function(){ bar.style.opacity='0'; bar.style.width='0'; },300); }
+  document.addEventListener('click',function(e){
+    var a=e.target.closest('a[href]');
+    if(a && !a.target && !a.href.startsWith('mailto:') && !a.href.startsWith('#') && new URL(a.href,location.href).origin===location.origin){
+      start();
+    }
+  });
+  document.querySelectorAll('form').forEach(function(f){ f.addEventListener('submit',start); });
+  window.addEventListener('pageshow', done);
+})();
+
+// ── Profile dropdown (animated open + close) ──────────────────────────────────
+(function(){
+  var trigger  = document.getElementById('profile-trigger');
+  var dropdown = document.getElementById('profile-dropdown');
+  if (!trigger) return;
+
+  function closeDropdown() {
+    if (!dropdown.classList.contains('open')) return;
+    dropdown.classList.add('closing');
+    trigger.classList.remove('dropdown-open');
+    setTimeout(function(){ dropdown.classList.remove('open','closing'); }, 140);
+  }
+
+  trigger.addEventListener('click', function(e) {
+    e.stopPropagation();
+    if (dropdown.classList.contains('open')) {
+      closeDropdown();
+    } else {
+      dropdown.classList.remove('closing');
+      dropdown.classList.add('open');
+      trigger.classList.add('dropdown-open');
+    }
+  });
+
+  document.addEventListener('click', closeDropdown);
+})();
+
+// ── Mobile search overlay ─────────────────────────────────────────────────────
+(function(){
+  var open    = document.getElementById('open-mobile-search');
+  var overlay = document.getElementById('mobile-search-overlay');
+  var close   = document.getElementById('close-mobile-search');
+  var input   = document.getElementById('mobile-search-input');
+  if (!open) return;
+  open.addEventListener('click',  function(){ overlay.classList.add('open'); input.focus(); if (input.value) input.select(); });
+  close.addEventListener('click', function(){ overlay.classList.remove('open'); });
+  document.addEventListener('keydown', function(e) {
+    if (e.key === 'Escape' && overlay.classList.contains('open')) {
+      overlay.classList.remove('open');
+    }
+  });
+})();
+
+// ── Desktop search clear button ───────────────────────────────────────────────
+(function(){
+  var dSearch = document.querySelector('.desktop-search');
+  if (!dSearch) return;
+  var inp = dSearch.querySelector('input[name="q"]');
+  if (!inp) return;
+  var submitBtn = dSearch.querySelector('button[type="submit"]');
+  var cb = document.createElement('button');
+  cb.type = 'button'; cb.className = 'dsearch-clear'; cb.title = 'Clear search';
+  cb.innerHTML = '<i class="fas fa-times"></i>';
+  dSearch.appendChild(cb);
+  function sync() {
+    var has = !!inp.value.trim();
+    cb.style.display = has ? 'flex' : 'none';
+    submitBtn.style.display = has ? 'none' : '';
+    dSearch.classList.toggle('has-query', has);
+  }
+  cb.addEventListener('click', function(){ inp.value = ''; sync(); dSearch.submit(); });
+  inp.addEventListener('input', sync);
+  sync();
+})();
+
+// ── Search suggestions ────────────────────────────────────────────────────────
+(function(){
+  document.querySelectorAll('input[data-suggest-url]').forEach(function(inp, i){
+    var list = document.createElement('datalist');
+    list.id = 'search-suggestions-' + i;
+    inp.setAttribute('list', list.id);
+    inp.after(list);
+    var timer, pending, last = '';
+    inp.addEventListener('input', function(){
+      clearTimeout(timer);
+      timer = setTimeout(function(){
+        var text = inp.value.trim();
+        if (text === last) return;
+        last = text;
+        if (pending) pending.abort();
+        if (!text) { list.innerHTML = ''; return; }
+        pending = new AbortController();
+        fetch(inp.dataset.suggestUrl + '?q=' + encodeURIComponent(text), { signal: pending.signal })
+          .then(function(r){ return r.ok ? r.json() : null; })
+          .then(function(data){
+            if (!data || data.query !== text) return;
+            list.innerHTML = '';
+            data.suggestions.forEach(function(s){
+              var opt = document.createElement('option');
+              opt.value = s.text;
+              list.appendChild(opt);
+            });
+          })
+          .catch(function(){});
+      }, 120);
+    });
+  });
+})();
+
+// ── Toasts ────────────────────────────────────────────────────────────────────
+(function(){
+  document.querySelectorAll('.toast').forEach(function(t){
+    var delay = parseInt(t.dataset.autohide) || 5000;
+    var btn   = t.querySelector('.toast-close');
+    function hide(){ t.classList.add('hiding'); setTimeout(function(){ t.remove(); }, 260); }
+    if (btn) btn.addEventListener('click', hide);
+    setTimeout(hide, delay);
+  });
+})();
+
+// ── Scroll fade wrappers ──────────────────────────────────────────────────────
+(function(){
+  function initScrollFade(wrap) {
+    var scroller = wrap.querySelector('[data-scroll-inner]');
+    if (!scroller) return;
+    function update() {
+      var atStart = scroller.scrollLeft <= 4;
+      var atEnd   = scroller.scrollLeft + scroller.clientWidth >= scroller.scrollWidth - 4;
+      var noOvf   = scroller.scrollWidth <= scroller.clientWidth + 4;
+      wrap.classList.toggle('at-start',    atStart);
+      wrap.classList.toggle('at-end',      atEnd);
+      wrap.classList.toggle('no-overflow', noOvf);
+    }
+    scroller.addEventListener('scroll', update, { passive: true });
+    window.addEventListener('resize', update);
+    update();
+  }
+  document.querySelectorAll('.scroll-fade-wrap').forEach(initScrollFade);
+})();
+
+// ── Mobile nav: highlight current page ───────────────────────────────────────
+(function(){
+  var path = location.pathname;
+  document.querySelectorAll('.mobile-nav a[href]').forEach(function(a) {
+    try {
+      var href = new URL(a.href, location.href).pathname;
+      if (href === path || (href !== '/' && path.startsWith(href))) {
+        a.classList.add('active');
+      }
+    } catch(e) {}
+  });
+})();
+
+// ── Shared utilities ──────────────────────────────────────────────────────────
+function getCsrf() {
+  var c = document.cookie.split(';').find(function(s){ return s.trim().startsWith('csrftoken='); });
+  return c ? c.trim().split('=')[1] : '';
+}
+
+// ── Quick React strip ─────────────────────────────────────────────────────────
+var QR = {
+  EMOJIS: ['❤️','😂','🔥','💀','😭','🙏','👍'],
+  _el: null,
+  _cb: null,
+
+  build: function() {
+    if (QR._el) return;
+    var strip = document.createElement('div');
+    strip.id = 'qr-strip';
+    strip.className = 'qr-hidden';
+    QR.EMOJIS.forEach(function(e) {
+      var btn = document.createElement('button');
+      btn.type = 'button';
+      btn.className = 'qr-btn';
+      btn.textContent = e;
+      btn.onclick = function() { QR.close(); if (QR._cb) QR._cb(e); };
+      strip.appendChild(btn);
+    });
+    document.body.appendChild(strip);
+    QR._el = strip;
+    document.addEventListener('click', function(ev) {
+      if (QR._el && !QR._el.classList.contains('qr-hidden') &&
+          !QR._el.contains(ev.target) && !ev.target.closest('.rxn-add')) {
+        QR.close();
+      }
+    });
+    document.addEventListener('keydown', function(ev) {
+      if (ev.key === 'Escape') QR.close();
+    });
+  },
+
+  open: function(anchor, currentMine, callback) {
+    QR.build();
+    QR._cb = callback;
+    QR._el.querySelectorAll('.qr-btn').forEach(function(b) {
+      b.classList.toggle('selected', b.textContent === currentMine);
+    });
+    QR._el.classList.remove('qr-hidden');
+    var rect = anchor.getBoundingClientRect();
+    var sw = QR.EMOJIS.length * 44 + 20;
+    var left = Math.max(8, Math.min(rect.right - sw, window.innerWidth - sw - 8));
+    if (rect.top > 80) {
+      QR._el.style.bottom = (window.innerHeight - rect.top + 8) + 'px';
+      QR._el.style.top = 'auto';
+    } else {
+      QR._el.style.top = (rect.bottom + 8) + 'px';
+      QR._el.style.bottom = 'auto';
+    }
+    QR._el.style.left = left + 'px';
+  },
+
+  close: function() {
+    if (QR._el) QR._el.classList.add('qr-hidden');
+  }
+};
+
+// ── Theme toggle ──────────────────────────────────────────────────────────────
+(function(){
+  var btn  = document.getElementById('theme-toggle');
+  var icon = document.getElementById('theme-icon');
+  if (!btn) return;
+
+  function syncIcon(theme, animate) {
+    /* moon = you're in dark mode, sun = you're in light mode */
+    var cls = theme === 'dark' ? 'fas fa-moon' : 'fas fa-sun';
+    if (animate) {
+      icon.className = cls + ' icon-spin';
+      icon.addEventListener('animationend', function(){ icon.classList.remove('icon-spin'); }, { once: true });
+    } else {
+      icon.className = cls;
+    }
+  }
+
+  // Sync icon with the theme already applied by the init script
+  syncIcon(document.documentElement.getAttribute('data-theme') || 'dark', false);
+
+  btn.addEventListener('click', function(){
+    var next = document.documentElement.getAttribute('data-theme') === 'dark' ? 'light' : 'dark';
+
+    function apply() {
+      document.documentElement.setAttribute('data-theme', next);
+      localStorage.setItem('theme', next);
+      syncIcon(next, true);
+    }
+
+    // View Transitions API: circular ripple from the toggle button centre
+    if (!document.startViewTransition) { apply(); return; }
+    var r = btn.getBoundingClientRect();
+    document.documentElement.style.setProperty('--vt-x', (r.left + r.width / 2) + 'px');
+    document.documentElement.style.setProperty('--vt-y', (r.top  + r.height / 2) + 'px');
+    document.startViewTransition(apply);
+  });
+})();
+
+// ── Service worker ────────────────────────────────────────────────────────────
+if ('serviceWorker' in navigator) {
+  navigator.serviceWorker.register('/sw.js');
+}
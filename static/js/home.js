@@ -0,0 +1,223 @@
+// ── Reactions ─────────────────────────────────────────────────────────────────
+
+function renderCardReactions(itemId, data) {
+  var rb = document.getElementById('rb-' + itemId);
+  var rt = document.getElementById('rt-' + itemId);
+  var ra = document.getElementById('ra-' + itemId);
+  if (!rb) return;
+
+  rb.innerHTML = '';
+  (data.emojis || []).forEach(function(e) {
+    var span = document.createElement('span');
+    span.className = 'rxn-bubble';
+    span.textContent = e;
+    rb.appendChild(span);
+  });
+
+  rt.textContent = data.total > 0 ? data.total : '';
+
+  if (data.mine) {
+    ra.textContent = data.mine;
+    ra.classList.add('has-reacted');
+    ra.title = 'You reacted ' + data.mine + ' — click to change';
+  } else {
+    ra.textContent = '+';
+    ra.classList.remove('has-reacted');
+    ra.title = 'React';
+  }
+}
+
+// Init all cards
+Object.keys(REACTION_DATA).forEach(function(itemId) {
+  renderCardReactions(itemId, REACTION_DATA[itemId]);
+});
+
+function cardPickerOpen(event, itemId, btn) {
+  event.preventDefault();
+  event.stopPropagation();
+  var mine = (REACTION_DATA[String(itemId)] || {}).mine || null;
+  QR.open(btn, mine, function(emoji) {
+    cardReact(itemId, emoji);
+  });
+}
+
+function cardReact(itemId, emoji) {
+  fetch('/react/' + itemId + '/', {
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': getCsrf(),
+      'Content-Type': 'application/x-www-form-urlencoded',
+    },
+    body: 'emoji=' + encodeURIComponent(emoji),
+  })
+  .then(function(r) { return r.json(); })
+  .then(function(data) {
+    var updated = {
+      emojis: data.recent_emojis,
+      total: data.total,
+      mine: data.my_emoji,
+    };
+    REACTION_DATA[String(itemId)] = updated;
+    renderCardReactions(itemId, updated);
+    REACTORS_CACHE[String(itemId)] = data;
+  })
+  .catch(function() {});
+}
+
+// ── Reactors modal ────────────────────────────────────────────────────────────
+var REACTORS_CACHE = {};
+
+function renderModalData(data) {
+  var pills = document.getElementById('rxn-modal-pills');
+  var list = document.getElementById('rxn-modal-list');
+  var title = document.getElementById('rxn-modal-title');
+  var total = data.total || 0;
+
+  title.textContent = 'Reactions' + (total > 0 ? ' (' + total + ')' : '');
+
+  pills.innerHTML = '';
+  var eg = data.emoji_groups || {};
+  Object.keys(eg).forEach(function(emoji) {
+    var pill = document.createElement('span');
+    pill.className = 'rxn-modal-pill';
+    pill.innerHTML = emoji + ' <span class="rxn-modal-pill-cnt">' + eg[emoji].length + '</span>';
+    pills.appendChild(pill);
+  });
+
+  list.innerHTML = '';
+  var reactors = data.reactors || [];
+  if (reactors.length === 0) {
+    list.innerHTML = '<div class="rxn-modal-empty">No reactions yet — be first!</div>';
+  } else {
+    reactors.forEach(function(r) {
+      var row = document.createElement('div');
+      row.className = 'rxn-modal-row';
+      var avatarInner = r.avatar_url
+        ? '<img src="' + r.avatar_url + '" alt="' + r.name + '">'
+        : r.initial;
+      row.innerHTML =
+        '<div class="rxn-modal-avatar">' + avatarInner + '</div>' +
+        '<span class="rxn-modal-name">' + r.name + '</span>' +
+        '<span class="rxn-modal-emoji">' + r.emoji + '</span>';
+      list.appendChild(row);
+    });
+    if (total > 20) {
+      var more = document.createElement('div');
+      more.className = 'rxn-modal-more';
+      more.textContent = 'Showing 20 of ' + total + ' reactions';
+      list.appendChild(more);
+    }
+  }
+}
+
+function openReactorsModal(itemId) {
+  var key = String(itemId);
+  var backdrop = document.getElementById('rxn-modal-backdrop');
+  var list = document.getElementById('rxn-modal-list');
+
+  backdrop.classList.add('open');
+  document.body.style.overflow = 'hidden';
+
+  if (REACTORS_CACHE[key]) {
+    renderModalData(REACTORS_CACHE[key]);
+    return;
+  }
+
+  document.getElementById('rxn-modal-title').textContent = 'Reactions';
+  document.getElementById('rxn-modal-pills').innerHTML = '';
+  list.innerHTML = '<div class="rxn-modal-empty"><i class="fas fa-spinner fa-spin"></i></div>';
+
+  fetch('/react/' + itemId + '/', {
+    headers: { 'X-Requested-With': 'XMLHttpRequest' }
+  })
+  .then(function(r) { return r.json(); })
+  .then(function(data) {
+    REACTORS_CACHE[key] = data;
+    renderModalData(data);
+  })
+  .catch(function() {
+    list.innerHTML = '<div class="rxn-modal-empty">Couldn\'t load reactions.</div>';
+  });
+}
+
+function closeReactorsModal(event) {
+  if (event && document.getElementById('rxn-modal').contains(event.target)) return;
+  var backdrop = document.getElementById('rxn-modal-backdrop');
+  if (!backdrop.classList.contains('open')) return;
+  backdrop.classList.add('closing');
+  setTimeout(function() {
+    backdrop.classList.remove('open', 'closing');
+    document.body.style.overflow = '';
+  }, 200);
+}
+
+document.addEventListener('keydown', function(e) {
+  if (e.key === 'Escape') closeReactorsModal(null);
+});
+
+// ── Infinite scroll ───────────────────────────────────────────────────────────
+// Pages past the first are fetched as JSON batches from the feed endpoint; the
+// page links stay in the markup as the no-JS (and error) fallback.
+(function() {
+  var grid = document.getElementById('items-grid');
+  var sentinel = document.getElementById('feed-sentinel');
+  if (!grid || !sentinel || !grid.dataset.nextCursor || !('IntersectionObserver' in window)) return;
+
+  var pagination = document.querySelector('.pagination');
+  if (pagination) pagination.style.display = 'none';
+
+  var params = new URLSearchParams(window.location.search);
+  params.delete('page');
+  params.set('campus', grid.dataset.campus);
+  var cursor = grid.dataset.nextCursor;
+  var loading = false;
+
+  var observer = new IntersectionObserver(function(entries) {
+    if (entries[0].isIntersecting) loadMore();
+  }, { rootMargin: '600px 0px' });
+  observer.observe(sentinel);
+
+  function stop() {
+    observer.disconnect();
+    sentinel.parentNode.removeChild(sentinel);
+  }
+
+  function loadMore() {
+    if (loading || !cursor) return;
+    loading = true;
+    sentinel.classList.add('loading');
+    params.set('cursor', cursor);
+    fetch(grid.dataset.feedUrl + '?' + params.toString(), {
+      credentials: 'same-origin',
+      headers: { 'Accept': 'application/json' },
+    })
+      .then(function(r) {
+        if (!r.ok) throw new Error('HTTP ' + r.status);
+        return r.json();
+      })
+      .then(function(data) {
+        grid.insertAdjacentHTML('beforeend', data.cards.join(''));
+        Object.keys(data.reactions).forEach(function(itemId) {
+          REACTION_DATA[itemId] = data.reactions[itemId];
+          renderCardReactions(itemId, data.reactions[itemId]);
+        });
+        cursor = data.next_cursor;
+        loading = false;
+        sentinel.classList.remove('loading');
+        if (!cursor) return stop();
+        // Re-observing fires again straight away if the sentinel is still on screen.
+        observer.unobserve(sentinel);
+        observer.observe(sentinel);
+      })
+      .catch(function() {
+        stop();
+        if (pagination) pagination.style.display = '';
+      });
+  }
+})();
+
+// ── Auto-scroll active campus tab into view ───────────────────────────────────
+(function() {
+  var activeTab = document.querySelector('.campus-tab.active');
+  if (activeTab) activeTab.scrollIntoView({ behavior: 'instant', block: 'nearest', inline: 'center' });
+})();
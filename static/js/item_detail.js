@@ -0,0 +1,93 @@
+function switchImage(btn, src) {
+  document.getElementById('main-image').src = src;
+  document.querySelectorAll('.thumb-btn').forEach(function(b) { b.classList.remove('active'); });
+  btn.classList.add('active');
+}
+
+
+function detailReact(emoji) {
+  fetch('/react/' + DETAIL_ITEM_ID + '/', {
+    method: 'POST',
+    headers: {
+      'X-CSRFToken': getCsrf(),
+      'Content-Type': 'application/x-www-form-urlencoded',
+    },
+    body: 'emoji=' + encodeURIComponent(emoji),
+  })
+  .then(function(r) { return r.json(); })
+  .then(function(data) {
+    MY_EMOJI = data.my_emoji;
+    updateDetailReactions(data);
+  });
+}
+
+function updateDetailReactions(data) {
+  // Count badge
+  document.getElementById('drxn-count').textContent = data.total;
+
+  // Emoji group pills
+  var groups = document.getElementById('drxn-groups');
+  groups.innerHTML = '';
+  var eg = data.emoji_groups || {};
+  var keys = Object.keys(eg);
+  if (keys.length > 0) {
+    keys.forEach(function(emoji) {
+      var names = eg[emoji];
+      var btn = document.createElement('button');
+      btn.type = 'button';
+      btn.className = 'drxn-pill' + (emoji === MY_EMOJI ? ' mine' : '');
+      btn.dataset.emoji = emoji;
+      btn.title = names.join(', ');
+      btn.onclick = function() { detailReact(emoji); };
+      btn.innerHTML = '<span class="drxn-pill-e">' + emoji + '</span>' +
+                      '<span class="drxn-pill-cnt">' + names.length + '</span>';
+      groups.appendChild(btn);
+    });
+  } else {
+    groups.innerHTML = '<span style="font-size:.82rem;color:var(--muted);align-self:center">No reactions yet — be first!</span>';
+  }
+
+  // Update inline quick-react button highlights
+  document.querySelectorAll('.drxn-qbtn').forEach(function(b) {
+    b.classList.toggle('selected', b.textContent === MY_EMOJI);
+  });
+
+  // Reactors list
+  var oldList = document.getElementById('drxn-list');
+  if (oldList) oldList.remove();
+  if (data.reactors && data.reactors.length > 0) {
+    var list = document.createElement('div');
+    list.id = 'drxn-list';
+    list.className = 'drxn-list';
+    data.reactors.forEach(function(r) {
+      var row = document.createElement('div');
+      row.className = 'drxn-row';
+      var avatarInner = r.avatar_url
+        ? '<img src="' + r.avatar_url + '" alt="' + r.name + '">'
+        : r.initial;
+      row.innerHTML = '<div class="drxn-avatar">' + avatarInner + '</div>' +
+                      '<span class="drxn-name">' + r.name + '</span>' +
+                      '<span class="drxn-emo">' + r.emoji + '</span>';
+      list.appendChild(row);
+    });
+    if (data.total > 20) {
+      var note = document.createElement('div');
+      note.className = 'drxn-more';
+      note.textContent = 'Showing 20 of ' + data.total + ' reactions';
+      list.appendChild(note);
+    }
+    document.getElementById('reactions').appendChild(list);
+  }
+}
+
+// Hide sticky CTA when inline CTA is visible
+(function() {
+  var stickyCta = document.getElementById('sticky-cta');
+  var inlineCta = document.querySelector('.whatsapp-btn, .sold-msg');
+  if (!stickyCta || !inlineCta) return;
+  var obs = new IntersectionObserver(function(entries) {
+    stickyCta.style.opacity = entries[0].isIntersecting ? '0' : '1';
+    stickyCta.style.pointerEvents = entries[0].isIntersecting ? 'none' : '';
+  }, { threshold: 0.5 });
+  obs.observe(inlineCta);
+})();